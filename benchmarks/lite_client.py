@@ -0,0 +1,110 @@
+"""Compare the lite client with boto3 for startup, memory and parsing.
+
+Each client is created in a fresh interpreter, reporting the time to import
+the monitor and create an ECS client and the peak RSS. A DescribeServices
+response with a full event window is then parsed by both, without any
+network calls.
+
+    python benchmarks/lite_client.py
+"""
+import json
+import os
+import subprocess
+import sys
+from timeit import timeit
+
+
+STARTUP = '''
+import resource, sys, time
+start = time.perf_counter()
+import ecs_update_monitor.cli
+if sys.argv[1] == 'lite':
+    from ecs_update_monitor.lite import LiteSession as Session
+else:
+    from boto3 import Session
+Session(region_name='eu-west-1').client('ecs')
+elapsed = time.perf_counter() - start
+rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(elapsed, rss, 'boto3' in sys.modules)
+'''
+
+
+def startup(client):
+    environ = dict(
+        os.environ, AWS_ACCESS_KEY_ID='AKID', AWS_SECRET_ACCESS_KEY='secret'
+    )
+    output = subprocess.check_output(
+        [sys.executable, '-c', STARTUP, client], env=environ
+    ).decode('utf-8').split()
+    return float(output[0]), int(output[1]), output[2] == 'True'
+
+
+def describe_services_body():
+    return json.dumps({
+        'services': [{
+            'serviceName': 'app',
+            'status': 'ACTIVE',
+            'taskDefinition': 'arn:aws:ecs:eu-west-1:1:task-definition/app:2',
+            'deployments': [
+                {
+                    'id': 'ecs-svc/{}'.format(i),
+                    'status': 'PRIMARY' if i == 0 else 'ACTIVE',
+                    'taskDefinition':
+                        'arn:aws:ecs:eu-west-1:1:task-definition/app:2',
+                    'runningCount': 4, 'pendingCount': 0,
+                    'desiredCount': 4, 'createdAt': 1483705815.0 + i,
+                    'updatedAt': 1483705815.0 + i,
+                    'launchType': 'EC2',
+                }
+                for i in range(2)
+            ],
+            'events': [
+                {
+                    'id': 'event-{}'.format(i),
+                    'createdAt': 1483705815.0 + i,
+                    'message': '(service app) has started 1 tasks: '
+                               '(task {}).'.format(i),
+                }
+                for i in range(100)
+            ],
+        }],
+        'failures': [],
+    }).encode('utf-8')
+
+
+def parse_timings(body, number=200):
+    from botocore.parsers import create_parser
+    from botocore.session import get_session
+    from ecs_update_monitor.lite import parse_services
+
+    operation = get_session().get_service_model('ecs').operation_model(
+        'DescribeServices'
+    )
+    parser = create_parser('json')
+    response = {'status_code': 200, 'headers': {}, 'body': body}
+    boto3_seconds = timeit(
+        lambda: parser.parse(response, operation.output_shape), number=number
+    )
+    lite_seconds = timeit(
+        lambda: parse_services(json.loads(body.decode('utf-8'))),
+        number=number
+    )
+    return boto3_seconds / number, lite_seconds / number
+
+
+def main():
+    print('{:<6} {:>12} {:>14} {:>14}'.format(
+        'client', 'startup (ms)', 'peak RSS (MB)', 'imports boto3'
+    ))
+    for client in ('boto3', 'lite'):
+        seconds, rss, imports_boto3 = startup(client)
+        print('{:<6} {:>12.0f} {:>14.1f} {:>14}'.format(
+            client, seconds * 1000, rss / 1024.0, str(imports_boto3)
+        ))
+    boto3_seconds, lite_seconds = parse_timings(describe_services_body())
+    print('DescribeServices parse (100 events): boto3 {:.3f}ms, '
+          'lite {:.3f}ms'.format(boto3_seconds * 1000, lite_seconds * 1000))
+
+
+if __name__ == '__main__':
+    main()
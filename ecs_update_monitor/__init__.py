@@ -1,69 +1,416 @@
-from time import sleep, time
+from collections import Counter
+from ecs_update_monitor.bake import AlarmError, Bake
+from ecs_update_monitor.capacity import (
+    CapacityIndex, DEFAULT_MAXIMUM_PERCENT
+)
+from ecs_update_monitor.checkpoint import Checkpoint
+from ecs_update_monitor.completions import CompletionCache
+from ecs_update_monitor.clock import SystemClock
+from ecs_update_monitor.discovery import (
+    DiscoveryHealth, UnhealthyRegistrationError
+)
+from ecs_update_monitor.classifier import (
+    classifier, PLACEMENT_TAGS, STEADY_STATE, UNHEALTHY_TARGET
+)
+from ecs_update_monitor.errors import UserFacingError
 from ecs_update_monitor.logger import logger
+from ecs_update_monitor.logs import FailureLogs
+from ecs_update_monitor.notify import (
+    Notifier, PROGRESS, sink_for, STARTED
+)
+from ecs_update_monitor.retry import CircuitOpenError, is_retryable, Retrier
+from ecs_update_monitor.sidework import SideWork
+from ecs_update_monitor.taskdefs import TaskdefCache
+from ecs_update_monitor.tasks import TaskStartupTracker
+from ecs_update_monitor.timeline import DeploymentTimeline
+from ecs_update_monitor.tracer import tracer
 import datetime
 
 
 MAX_FAILURES = 3
 
 
-class UserFacingError(Exception):
-    pass
+def run(cluster, service, taskdef, boto_session, check_capacity=False,
+        summary_file=None, task_startup=False, taskdef_cache_dir=None,
+        notify=None, failure_logs=False, checkpoint_dir=None,
+        stall_timeout=None, wait_for_drain=True, rollback=False,
+        bake_alarms=None, bake_seconds=600, bake_datapoints=3,
+        completion_cache_dir=None, completion_cache_ttl=86400,
+        discovery_health=False):
+    clock = SystemClock()
+    retrier = Retrier(clock=clock)
+    checkpoint = Checkpoint(
+        checkpoint_dir, cluster, service, taskdef
+    ) if checkpoint_dir else None
+    completions = CompletionCache(
+        completion_cache_dir, cluster, service, taskdef,
+        ttl=completion_cache_ttl
+    ) if completion_cache_dir else None
+    notifier = Notifier(
+        [sink_for(target) for target in notify],
+        cluster=cluster, service=service, taskdef=taskdef
+    ) if notify else None
+    taskdef_cache = TaskdefCache(
+        boto_session, retrier=retrier, directory=taskdef_cache_dir
+    )
+    capacity_index = CapacityIndex(
+        boto_session, retrier=retrier, taskdef_cache=taskdef_cache,
+        clock=clock
+    ) if check_capacity else None
+    task_tracker = TaskStartupTracker(
+        cluster, boto_session, retrier=retrier, taskdef_cache=taskdef_cache
+    ) if task_startup else None
+    event_iterator = ECSEventIterator(
+        cluster, service, taskdef, boto_session,
+        capacity_index=capacity_index, retrier=retrier,
+        taskdef_cache=taskdef_cache, task_tracker=task_tracker,
+        checkpoint=checkpoint, wait_for_drain=wait_for_drain,
+        discovery=DiscoveryHealth(
+            cluster, boto_session, retrier=retrier
+        ) if discovery_health else None,
+        completions=completions, clock=clock
+    )
+    monitor = ECSMonitor(
+        event_iterator, cluster, boto_session, summary_file=summary_file,
+        retrier=retrier, clock=clock, notifier=notifier,
+        checkpoint=checkpoint,
+        stall_timeout=stall_timeout,
+        failure_logs=FailureLogs(
+            cluster, service, taskdef, boto_session, taskdef_cache
+        ) if failure_logs else None
+    )
+    bake = Bake(
+        bake_alarms, boto_session, bake_seconds, datapoints=bake_datapoints,
+        retrier=Retrier(clock=clock), clock=clock
+    ) if bake_alarms else None
+    try:
+        with tracer.span(
+            'run', cluster=cluster, service=service, taskdef=taskdef
+        ):
+            monitor.wait()
+            _settle(event_iterator, bake, completions)
+    except ROLLBACK_ERRORS as e:
+        if not rollback:
+            raise
+        roll_back(
+            cluster, service, event_iterator.previous_taskdef, boto_session,
+            e, discovery_health=discovery_health,
+            taskdef_cache=taskdef_cache, wait_for_drain=wait_for_drain,
+            clock=clock
+        )
+    finally:
+        if notifier is not None:
+            notifier.close()
+
+
+def _settle(event_iterator, bake, completions):
+    """Bake the deployment that just completed and record its completion.
+
+    Neither is repeated for a deployment that an earlier run recorded.
+    """
+    if event_iterator.completed_earlier:
+        return
+    if bake is not None:
+        bake.wait()
+    if completions is not None:
+        completions.record(event_iterator.deployment_id)
+
 
+def roll_back(cluster, service, taskdef, boto_session, error,
+              discovery_health=False, clock=None, **iterator_kwargs):
+    """Revert the service to `taskdef` after `error` and wait for it.
 
-def run(cluster, service, taskdef, boto_session):
-    event_iterator = ECSEventIterator(cluster, service, taskdef, boto_session)
-    monitor = ECSMonitor(event_iterator, cluster, boto_session)
-    monitor.wait()
+    The service is first polled an interval after the update, so that ECS
+    has made the rollback deployment PRIMARY by then.
+
+    Always raises: `RolledBackError` once the service is back on `taskdef`,
+    otherwise `RollbackFailedError`.
+    """
+    if taskdef is None:
+        raise RollbackFailedError(
+            error, taskdef, 'no previous task definition was seen'
+        )
+    logger.warning('{} - rolling back to {}'.format(error, taskdef))
+    clock = clock or SystemClock()
+    retrier = Retrier(clock=clock)
+    try:
+        with tracer.span('rollback', service=service, taskdef=taskdef):
+            retrier.call(
+                boto_session.client('ecs').update_service,
+                cluster=cluster, service=service, taskDefinition=taskdef
+            )
+            with tracer.span('sleep'):
+                clock.sleep(ECSMonitor._INTERVAL)
+            ECSMonitor(
+                ECSEventIterator(
+                    cluster, service, taskdef, boto_session, retrier=retrier,
+                    clock=clock, discovery=DiscoveryHealth(
+                        cluster, boto_session, retrier=retrier
+                    ) if discovery_health else None,
+                    **iterator_kwargs
+                ),
+                cluster, boto_session, retrier=retrier, clock=clock
+            ).wait()
+    except Exception as e:
+        raise RollbackFailedError(error, taskdef, e)
+    raise RolledBackError(error, taskdef)
 
 
 class ECSMonitor:
 
     _TIMEOUT = 600
     _INTERVAL = 15
+    _BURST_INTERVAL = 5
+    _MAX_FAILURES = MAX_FAILURES
 
-    def __init__(self, ecs_event_iterator, cluster, boto_session):
+    def __init__(self, ecs_event_iterator, cluster, boto_session,
+                 summary_file=None, retrier=None, clock=None, notifier=None,
+                 failure_logs=None, checkpoint=None, stall_timeout=None,
+                 side_work=None, name=None):
         self._ecs_event_iterator = ecs_event_iterator
+        self._name = name
+        self._clock = clock or SystemClock()
         self._previous_running_count = 0
         self._failed_count = 0
+        self._unhealthy_count = 0
         self._cluster = cluster
         self._boto_session = boto_session
+        self._summary_file = summary_file
+        self._notifier = notifier
+        self._failure_logs = failure_logs
+        self._checkpoint = checkpoint
+        self._checkpoint_restored = False
+        self._stall_timeout = stall_timeout
+        self._side_work = side_work or SideWork()
+        self._last_progress = None
+        self._last_state = None
+        self._retrier = retrier or Retrier(clock=self._clock)
+        # the side work thread gets its own client and retrier, as neither a
+        # boto3 session nor the retrier's counters are safe to share
+        self._side_retrier = Retrier(clock=self._clock)
+        self._cloudwatch = boto_session.client('cloudwatch')
+        self.timeline = DeploymentTimeline(clock=self._clock)
+        self.next_interval = self._INTERVAL
 
     def wait(self):
-        self._check_ecs_deploy_progress()
+        try:
+            self._check_ecs_deploy_progress()
+        except Exception as e:
+            final = isinstance(e, UserFacingError)
+            self.finish('failed', str(e), keep_checkpoint=not final)
+            if final:
+                self._show_failure_logs()
+            raise
+        self.finish('completed')
+
+    def begin(self):
+        self._events = iter(self._ecs_event_iterator)
+        self._start = self._clock.time()
+        self._deadline = self._retrier.deadline = \
+            self._side_retrier.deadline = self._start + self._TIMEOUT
+        self.timeline.start()
+        self._notify(STARTED)
+
+    def poll(self):
+        """Process the next event, returning True if the deploy is done."""
+        return self._process(next(self._events))
+
+    def finish(self, outcome, error=None, keep_checkpoint=False):
+        """Record the outcome. The checkpoint is kept when the run stopped
+        on an error that a re-run could get past, so that it resumes."""
+        self._side_work.close()
+        self.timeline.failed_tasks = self._failed_count
+        self.timeline.retries = dict(
+            self._retrier.stats + self._side_retrier.stats
+        )
+        self.timeline.api_calls.update(
+            getattr(self._ecs_event_iterator, 'api_calls', {})
+        )
+        self.timeline.task_startup = getattr(
+            self._ecs_event_iterator, 'task_startup', None
+        )
+        self.timeline.finish(outcome, error)
+        if self._checkpoint is not None and not keep_checkpoint:
+            self._checkpoint.clear()
+        self._notify(
+            outcome, error=error, duration=self.timeline.duration
+        )
+        for line in self.timeline.lines():
+            logger.info(line if self._name is None else '{}: {}'.format(
+                self._name, line
+            ))
+        if self._summary_file is not None:
+            self.timeline.write(self._summary_file)
 
     def _check_ecs_deploy_progress(self):
-        start = time()
-        for event in self._ecs_event_iterator:
-            self._show_deployment_progress(event)
-            self._check_for_failed_tasks(event)
-            if event.done:
+        self.begin()
+        next_poll = self._start
+        for event in self._polls():
+            if event is None:
+                self._check_deadline()
+            elif self._process(event):
                 return True
-            if event.new_instance:
-                self._trigger_new_instance_alarm()
-            if time() - start > self._TIMEOUT:
-                raise TimeoutError(
-                    'Deployment timed out - didn\'t complete '
-                    'within {} seconds'.format(self._TIMEOUT)
-                )
-            sleep(self._INTERVAL)
+            next_poll = self._schedule(next_poll)
+            with tracer.span('sleep'):
+                self._clock.sleep(max(0, next_poll - self._clock.time()))
+
+    def _polls(self):
+        """The events, with None for a poll that failed with an AWS error
+        that outlasted its retries or was rejected by the open circuit.
+
+        Such polls are skipped rather than failing the run, which only fails
+        once the deadline passes.
+        """
+        while True:
+            try:
+                yield next(self._events)
+            except StopIteration:
+                return
+            except Exception as e:
+                _skip_failed_poll(e)
+                yield None
+
+    def _schedule(self, previous_poll):
+        """Polls run at a fixed rate rather than a fixed gap after the work.
+
+        A poll that overran its interval moves the schedule along instead of
+        causing catch-up polls, and the last poll happens at the deadline.
+        """
+        next_poll = max(
+            previous_poll + self.next_interval, self._clock.time()
+        )
+        return min(next_poll, self._deadline)
+
+    def _process(self, event):
+        self._restore_checkpoint()
+        self._show_deployment_progress(event)
+        self.timeline.record(event)
+        self._notify(
+            PROGRESS, running=event.running, pending=event.pending,
+            desired=event.desired, previous_running=event.previous_running,
+            messages=event.messages
+        )
+        self._check_for_failed_tasks(event)
+        self._check_for_unhealthy_tasks(event)
+        self.next_interval = \
+            self._BURST_INTERVAL if event.burst else self._INTERVAL
+        if event.done:
+            return True
+        if event.new_instance:
+            self._trigger_new_instance_alarm()
+        self._check_for_stall(event)
+        self._check_deadline()
+        self._write_checkpoint()
+        return False
+
+    def _check_deadline(self):
+        if self._clock.time() >= self._deadline:
+            raise TimeoutError(
+                'Deployment timed out - didn\'t complete '
+                'within {} seconds'.format(self._TIMEOUT)
+            )
+
+    def _restore_checkpoint(self):
+        if self._checkpoint_restored or self._checkpoint is None:
+            return
+        self._checkpoint_restored = True
+        state = self._checkpoint.state.get('monitor')
+        if state is None:
+            return
+        self._start = self._clock.time() - state['elapsed'] - \
+            self._checkpoint.downtime
+        self._deadline = self._retrier.deadline = \
+            self._side_retrier.deadline = self._start + self._TIMEOUT
+        self._failed_count = state['failed_count']
+        self._unhealthy_count = state['unhealthy_count']
+        self._previous_running_count = state['previous_running_count']
+        logger.info('resuming after {:.0f}s from checkpoint'.format(
+            self._clock.time() - self._start
+        ))
+
+    def _write_checkpoint(self):
+        if self._checkpoint is None:
+            return
+        self._checkpoint.update('monitor', {
+            'elapsed': self._clock.time() - self._start,
+            'failed_count': self._failed_count,
+            'unhealthy_count': self._unhealthy_count,
+            'previous_running_count': self._previous_running_count,
+        })
+        self._checkpoint.write()
+
+    def _show_failure_logs(self):
+        if self._failure_logs is None:
+            return
+        try:
+            with tracer.span('failure_logs'):
+                lines = self._failure_logs.lines()
+        except Exception as e:
+            logger.warning('could not fetch logs of failed tasks: {}'.format(
+                e
+            ))
+            return
+        for line in lines:
+            logger.error(line)
+
+    def _notify(self, kind, **detail):
+        if self._notifier is not None:
+            self._notifier.notify(kind, **detail)
 
     def _show_deployment_progress(self, event):
-        for message in event.messages:
+        for message, tag in zip(event.messages, event.tags):
             logger.info(message)
+            tracer.event('ecs_service_event', message=message, tag=tag)
 
     def _check_for_failed_tasks(self, event):
         if event.running < self._previous_running_count:
             self._failed_count += self._previous_running_count - event.running
-            if self._failed_count >= MAX_FAILURES:
-                raise FailedTasksError
+            if self._failed_count >= self._MAX_FAILURES:
+                raise FailedTasksError(self._MAX_FAILURES)
         self._previous_running_count = event.running
 
+    def _check_for_unhealthy_tasks(self, event):
+        self._unhealthy_count += event.tags.count(UNHEALTHY_TARGET)
+        if self._unhealthy_count >= self._MAX_FAILURES:
+            raise UnhealthyTasksError(self._MAX_FAILURES)
+
+    def _check_for_stall(self, event):
+        """Fail once the counts and service events stop changing.
+
+        The window is extended by the service's health check grace period,
+        during which new tasks can legitimately make no visible progress.
+        Draining the previous deployment is only bounded by the timeout.
+        """
+        if self._stall_timeout is None:
+            return
+        state = (event.running, event.pending, event.previous_running)
+        now = self._clock.time()
+        if state != self._last_state or event.messages:
+            self._last_state = state
+            self._last_progress = now
+            return
+        window = self._stall_timeout + getattr(
+            self._ecs_event_iterator, 'health_check_grace_period', 0
+        )
+        if event.running != event.desired and \
+                now - self._last_progress > window:
+            raise StalledError(window, event)
+
     def _trigger_new_instance_alarm(self):
         logger.info("IN NEW INSTANCE TRIGGER CODE")
-        response = self._boto_session.client('cloudwatch').put_metric_data(
-            Namespace='Platform/ECS',
-            MetricData=[self._build_metric_data(self._cluster)]
+        self._side_work.submit(
+            'put_metric_data', self._put_metric_data,
+            metric_data=self._build_metric_data(self._cluster)
         )
+
+    def _put_metric_data(self, metric_data):
+        with tracer.span('put_metric_data', cluster=self._cluster):
+            response = self._side_retrier.call(
+                self._cloudwatch.put_metric_data,
+                Namespace='Platform/ECS',
+                MetricData=[metric_data]
+            )
+        self.timeline.api_calls['put_metric_data'] += 1
         logger.info(response)
 
     def _build_metric_data(self, cluster_name):
@@ -81,22 +428,54 @@ class ECSMonitor:
         }
 
 
+def _skip_failed_poll(error):
+    if not (is_retryable(error) or isinstance(error, CircuitOpenError)):
+        raise error
+    logger.warning('poll failed, trying again at the next poll: {}'.format(
+        error
+    ))
+
+
 class ECSEventIterator:
 
-    _INTERVAL = 15
     _NEW_SERVICE_GRACE_PERIOD = 60
-
-    def __init__(self, cluster, service, taskdef, boto_session):
+    _EVENT_WINDOW = 100
+    _BURST_EVENT_COUNT = 50
+
+    def __init__(self, cluster, service, taskdef, boto_session,
+                 capacity_index=None, retrier=None, describer=None,
+                 taskdef_cache=None, task_tracker=None, clock=None,
+                 checkpoint=None, wait_for_drain=True, discovery=None,
+                 completions=None):
         self._cluster = cluster
         self._service = service
         self._taskdef = taskdef
         self._boto_session = boto_session
         self._done = False
+        self.health_check_grace_period = 0
         self._seen_ecs_service_events = set()
         self._new_service_deployment = None
-        self._new_service_grace_period = self._NEW_SERVICE_GRACE_PERIOD
+        self._grace_period_end = None
+        self._clock = clock or SystemClock()
+        self._checkpoint = checkpoint
+        self._wait_for_drain = wait_for_drain
+        self._deployment_id = None
         self._ecs_client = None
-        self._taskdef_images = {}
+        self._taskdefs = taskdef_cache
+        self._task_tracker = task_tracker
+        self._discovery = discovery
+        self._completions = completions
+        self.previous_taskdef = None
+        self.deployment_id = None
+        self.completed_earlier = False
+        self._capacity_index = capacity_index
+        self._capacity_shortfall = False
+        self._steady_state = False
+        self._api_calls = Counter()
+        self._retrier = retrier or Retrier()
+        self._describer = describer
+        self._event_gap = False
+        self._burst = False
 
     def __iter__(self):
         return self
@@ -108,64 +487,230 @@ class ECSEventIterator:
         if self._done:
             raise StopIteration
 
-        ecs_service_data = self._ecs.describe_services(
+        with tracer.span('poll', service=self._service):
+            with tracer.span('describe_services', service=self._service):
+                ecs_service_data = self._describe_service()
+            return self._build_event(ecs_service_data)
+
+    def _describe_service(self):
+        # with a describer, this counts the shared calls that included the
+        # service
+        self._api_calls['describe_services'] += 1
+        if self._describer is not None:
+            return self._describer.describe(self._service)
+        return self._retrier.call(
+            self._ecs.describe_services,
             cluster=self._cluster,
             services=[self._service]
         )
 
-        deployments = self._get_deployments(ecs_service_data)
-        primary_deployment = self._get_primary_deployment(deployments)
-        self._check_taskdef(primary_deployment)
+    def _build_event(self, ecs_service_data):
+        """Only the parsing and classification are traced as CPU-bound
+        spans, as the capacity, task and discovery checks call AWS."""
+        with tracer.span('parse_events', cpu=True):
+            deployments = self._get_deployments(ecs_service_data)
+            primary_deployment = self._get_primary_deployment(deployments)
+            self._check_taskdef(primary_deployment)
+        self._resume(primary_deployment)
+        if self.previous_taskdef is None:
+            self.previous_taskdef = get_previous_taskdef(deployments)
+        self.health_check_grace_period = ecs_service_data['services'][0].get(
+            'healthCheckGracePeriodSeconds', 0
+        )
 
         running = primary_deployment['runningCount']
         pending = primary_deployment['pendingCount']
         desired = primary_deployment['desiredCount']
         previous_running = self._get_previous_running_count(deployments)
-        messages = self._get_task_event_messages(
-            ecs_service_data, primary_deployment
-        )
+        self.deployment_id = primary_deployment.get('id')
+        if self._still_settled(running, pending, desired, previous_running):
+            return self._settled_event(
+                running, pending, desired, previous_running
+            )
+        with tracer.span('parse_events', cpu=True):
+            messages = self._get_task_event_messages(
+                ecs_service_data, primary_deployment
+            )
 
         if self._new_service_deployment is None:
-            self._new_service_deployment = previous_running == 0
-
-        if self._need_new_instance(messages):
-            return NewInstanceEvent(
-                running, pending, desired, previous_running, messages
+            messages += self._start_deployment(
+                ecs_service_data, primary_deployment, previous_running
             )
+        if self._task_tracker is not None:
+            with tracer.span('task_startup', service=self._service):
+                messages += self._task_tracker.poll(primary_deployment['id'])
+        messages += self._poll_discovery(ecs_service_data, primary_deployment)
 
-        if self._deploy_in_progress(running, desired, previous_running):
-            return InProgressEvent(
-                running, pending, desired, previous_running, messages
-            )
+        with tracer.span('classify_events', cpu=True):
+            tags = classifier.classify_all(messages)
+        self._steady_state = self._steady_state or STEADY_STATE in tags
 
-        self._done = True
+        event_class = self._event_class(
+            tags, running, pending, desired, previous_running
+        )
+        self._update_checkpoint()
+        return event_class(
+            running, pending, desired, previous_running, messages, tags,
+            burst=self._burst
+        )
+
+    def _resume(self, primary_deployment):
+        if self._checkpoint is None or self._deployment_id is not None:
+            return
+        self._deployment_id = primary_deployment['id']
+        state = self._checkpoint.resume(self._deployment_id).get('iterator')
+        if state is None:
+            return
+        self._seen_ecs_service_events = set(state['seen_events'])
+        self._new_service_deployment = state['new_service_deployment']
+        self._steady_state = state['steady_state']
+        self.previous_taskdef = state.get('previous_taskdef')
+        if state['grace_remaining'] is not None:
+            self._grace_period_end = self._clock.time() + \
+                state['grace_remaining'] - self._checkpoint.downtime
+
+    def _update_checkpoint(self):
+        if self._checkpoint is None:
+            return
+        grace_remaining = None if self._grace_period_end is None else \
+            max(0, self._grace_period_end - self._clock.time())
+        self._checkpoint.update('iterator', {
+            'seen_events': sorted(self._seen_ecs_service_events),
+            'new_service_deployment': self._new_service_deployment,
+            'steady_state': self._steady_state,
+            'grace_remaining': grace_remaining,
+            'previous_taskdef': self.previous_taskdef,
+        })
+
+    def _still_settled(self, running, pending, desired, previous_running):
+        """Whether an earlier run saw this deployment complete and it is
+        still settled, so there is no need to wait out the new service grace
+        period again. Only checked on the first poll.
+        """
+        if self._completions is None or \
+                self._new_service_deployment is not None:
+            return False
+        return not self._rollout_in_progress(
+            running, pending, desired, previous_running
+        ) and self._completions.completed(self.deployment_id)
+
+    def _settled_event(self, running, pending, desired, previous_running):
+        self._done = self.completed_earlier = True
+        messages = ['deployment {} already completed and is still '
+                    'settled'.format(self.deployment_id)]
         return DoneEvent(
-            running, pending, desired, previous_running, messages
+            running, pending, desired, previous_running, messages,
+            classifier.classify_all(messages)
         )
 
+    def _poll_discovery(self, ecs_service_data, primary_deployment):
+        registry_arns = [
+            registry['registryArn'] for registry in
+            ecs_service_data['services'][0].get('serviceRegistries', [])
+        ]
+        if self._discovery is None or not registry_arns or \
+                primary_deployment['runningCount'] == 0:
+            return []
+        with tracer.span('service_discovery', service=self._service):
+            return self._discovery.poll(
+                registry_arns, primary_deployment['id']
+            )
+
+    def _event_class(self, tags, running, pending, desired, previous_running):
+        if self._need_new_instance(tags):
+            return NewInstanceEvent
+        if self._deploy_in_progress(
+            running, pending, desired, previous_running
+        ):
+            return InProgressEvent
+        self._done = True
+        return DoneEvent
+
     def _check_taskdef(self, primary_deployment):
         if primary_deployment['taskDefinition'] != self._taskdef:
             raise TaskdefDoesNotMatchError(
                 self._taskdef, primary_deployment['taskDefinition']
             )
 
-    def _need_new_instance(self, messages):
-        for msg in messages:
-            if "unable to place a task because no " \
-               "container instance met all of its requirements" in msg:
-                return True
-        return False
-
-    def _deploy_in_progress(self, running, desired, previous_running):
-        if running != desired or previous_running:
+    def _start_deployment(
+        self, ecs_service_data, primary_deployment, previous_running
+    ):
+        self._new_service_deployment = previous_running == 0
+        service = ecs_service_data['services'][0]
+        if self._capacity_index is None or \
+                service.get('launchType') == 'FARGATE':
+            return []
+        with tracer.span('capacity_forecast', cluster=self._cluster):
+            forecast = self._capacity_index.forecast(
+                self._cluster, self._taskdef,
+                primary_deployment['desiredCount'],
+                service.get('deploymentConfiguration', {}).get(
+                    'maximumPercent', DEFAULT_MAXIMUM_PERCENT
+                ),
+                primary_deployment['runningCount'] +
+                primary_deployment['pendingCount'],
+                previous_running
+            )
+        if forecast is None or \
+                forecast.tasks_to_place <= forecast.tasks_that_fit:
+            return []
+        self._capacity_shortfall = True
+        return [_capacity_shortfall_message(forecast)]
+
+    def _need_new_instance(self, tags):
+        if self._capacity_shortfall:
+            self._capacity_shortfall = False
             return True
-        elif (running == desired and self._new_service_deployment and
-                self._new_service_grace_period > 0):
-            self._new_service_grace_period -= self._INTERVAL
+        return not PLACEMENT_TAGS.isdisjoint(tags)
+
+    def _deploy_in_progress(self, running, pending, desired, previous_running):
+        if self._rollout_in_progress(
+            running, pending, desired, previous_running
+        ):
             return True
+        healthy = getattr(self._discovery, 'healthy', None)
+        if healthy is not None:
+            return healthy < desired
+        elif self._new_service_deployment and not self._steady_state:
+            return self._in_grace_period()
 
         return False
 
+    def _rollout_in_progress(self, running, pending, desired,
+                             previous_running):
+        """Without waiting for drain, the previous deployment's tasks are
+        not waited on, but none of the new tasks may still be pending."""
+        if self._wait_for_drain:
+            return deploy_in_progress(running, desired, previous_running)
+        return deploy_in_progress(running, desired, 0) or pending > 0
+
+    def _in_grace_period(self):
+        """New services are given time to settle after reaching desired.
+
+        Not used once Cloud Map reports the health of the new tasks.
+        """
+        now = self._clock.time()
+        if self._grace_period_end is None:
+            self._grace_period_end = now + self._NEW_SERVICE_GRACE_PERIOD
+        return now < self._grace_period_end
+
+    @property
+    def api_calls(self):
+        api_calls = Counter(self._api_calls)
+        for source in (
+            self._capacity_index, self._task_tracker, self._taskdefs,
+            self._discovery
+        ):
+            if source is not None:
+                api_calls.update(source.api_calls)
+        return api_calls
+
+    @property
+    def task_startup(self):
+        if self._task_tracker is None:
+            return None
+        return self._task_tracker.summary()
+
     @property
     def _ecs(self):
         if self._ecs_client is None:
@@ -173,25 +718,48 @@ class ECSEventIterator:
         return self._ecs_client
 
     def _get_new_ecs_service_events(self, ecs_service_data, since):
+        window = ecs_service_data['services'][0].get('events', [])
+        self._event_gap = self._missed_events(window, since)
         filtered_ecs_events = [
             event
-            for event in ecs_service_data['services'][0].get('events', [])
+            for event in window
             if event['id'] not in self._seen_ecs_service_events and
             event['createdAt'] > since
         ]
 
-        for event in filtered_ecs_events:
-            self._seen_ecs_service_events.add(event['id'])
+        # describe_services only returns the most recent events, so any event
+        # that has left the window will never be returned again
+        self._seen_ecs_service_events = set(event['id'] for event in window)
+        self._burst = self._event_gap or \
+            len(filtered_ecs_events) >= self._BURST_EVENT_COUNT
 
         return list(reversed(filtered_ecs_events))
 
+    def _missed_events(self, window, since):
+        return (
+            bool(self._seen_ecs_service_events) and
+            len(window) >= self._EVENT_WINDOW and
+            window[-1]['createdAt'] > since and
+            self._seen_ecs_service_events.isdisjoint(
+                event['id'] for event in window
+            )
+        )
+
     def _get_task_event_messages(self, ecs_service_data, primary_deployment):
-        return [
+        messages = [
             event['message']
             for event in self._get_new_ecs_service_events(
                 ecs_service_data, primary_deployment['createdAt']
             )
         ]
+        if self._event_gap:
+            messages.insert(0, (
+                'event gap: more than {} service events since the last '
+                'poll - earlier messages were missed'.format(
+                    self._EVENT_WINDOW
+                )
+            ))
+        return messages
 
     def _get_deployments(self, ecs_service_data):
         return [
@@ -200,30 +768,74 @@ class ECSEventIterator:
         ]
 
     def _get_primary_deployment(self, deployments):
-        deployments = [
-            deployment
-            for deployment in deployments
-            if deployment['status'] == 'PRIMARY'
-        ]
-        assert len(deployments) == 1, 'assume just one primary deployment'
-        return deployments[0]
+        return get_primary_deployment(deployments)
 
     def _get_previous_running_count(self, deployments):
-        return sum(
-            deployment['runningCount']
-            for deployment in deployments
-            if deployment['status'] != 'PRIMARY'
+        return get_previous_running_count(deployments)
+
+
+def get_primary_deployment(deployments):
+    deployments = [
+        deployment
+        for deployment in deployments
+        if deployment['status'] == 'PRIMARY'
+    ]
+    assert len(deployments) == 1, 'assume just one primary deployment'
+    return deployments[0]
+
+
+def get_previous_running_count(deployments):
+    return sum(
+        deployment['runningCount']
+        for deployment in deployments
+        if deployment['status'] != 'PRIMARY'
+    )
+
+
+def get_previous_taskdef(deployments):
+    """The taskdef of the ACTIVE deployment with the most running tasks."""
+    active = [
+        deployment
+        for deployment in deployments
+        if deployment['status'] == 'ACTIVE'
+    ]
+    if not active:
+        return None
+    return max(
+        active, key=lambda deployment: deployment['runningCount']
+    )['taskDefinition']
+
+
+def deploy_in_progress(running, desired, previous_running):
+    return running != desired or previous_running > 0
+
+
+def _capacity_shortfall_message(forecast):
+    if forecast.missing_instances is None:
+        missing = 'an unknown number of container instances are'
+    else:
+        missing = '{} container instance(s) are'.format(
+            forecast.missing_instances
         )
+    return (
+        'capacity forecast: deployment needs to place {} task(s) but the '
+        'cluster only has room for {} - {} missing'.format(
+            forecast.tasks_to_place, forecast.tasks_that_fit, missing
+        )
+    )
 
 
 class Event:
 
-    def __init__(self, running, pending, desired, previous_running, messages):
+    def __init__(self, running, pending, desired, previous_running, messages,
+                 tags=None, burst=False):
         self.running = running
         self.pending = pending
         self.desired = desired
         self.previous_running = previous_running
         self.messages = messages
+        self.tags = tags if tags is not None else [None] * len(messages)
+        self.burst = burst
 
 
 class NewInstanceEvent(Event):
@@ -275,8 +887,64 @@ class TimeoutError(UserFacingError):
     pass
 
 
+class StalledError(UserFacingError):
+    def __init__(self, window, event):
+        self._window = window
+        self._event = event
+
+    def __str__(self):
+        return 'Deployment stalled - no progress for {} seconds ' \
+            '(running {}, pending {}, desired {}, previous deployment ' \
+            'running {})'.format(
+                self._window, self._event.running, self._event.pending,
+                self._event.desired, self._event.previous_running
+            )
+
+
+class RolledBackError(UserFacingError):
+    exit_status = 2
+
+    def __init__(self, error, taskdef):
+        self._error = error
+        self._taskdef = taskdef
+
+    def __str__(self):
+        return '{} - rolled back to {}'.format(self._error, self._taskdef)
+
+
+class RollbackFailedError(UserFacingError):
+    def __init__(self, error, taskdef, reason):
+        self._error = error
+        self._taskdef = taskdef
+        self._reason = reason
+
+    def __str__(self):
+        return '{} - rollback to {} failed: {}'.format(
+            self._error, self._taskdef, self._reason
+        )
+
+
 class FailedTasksError(UserFacingError):
-    def __str__(_):
+    def __init__(self, threshold=MAX_FAILURES):
+        self._threshold = threshold
+
+    def __str__(self):
         return 'Deployment failed - {} new tasks have failed'.format(
-            MAX_FAILURES
+            self._threshold
         )
+
+
+class UnhealthyTasksError(UserFacingError):
+    def __init__(self, threshold=MAX_FAILURES):
+        self._threshold = threshold
+
+    def __str__(self):
+        return 'Deployment failed - {} health checks have failed'.format(
+            self._threshold
+        )
+
+
+ROLLBACK_ERRORS = (
+    AlarmError, FailedTasksError, StalledError, TimeoutError,
+    UnhealthyTasksError, UnhealthyRegistrationError,
+)
@@ -0,0 +1,193 @@
+import datetime
+import operator
+from collections import Counter
+
+from ecs_update_monitor.clock import SystemClock
+from ecs_update_monitor.errors import UserFacingError
+from ecs_update_monitor.logger import logger
+from ecs_update_monitor.retry import Retrier
+from ecs_update_monitor.tracer import tracer
+
+
+ALARM = 'ALARM'
+
+BREACHING = {
+    'GreaterThanThreshold': operator.gt,
+    'GreaterThanOrEqualToThreshold': operator.ge,
+    'LessThanThreshold': operator.lt,
+    'LessThanOrEqualToThreshold': operator.le,
+}
+
+
+class Bake:
+    """Watches CloudWatch alarms for a while after a deployment completes.
+
+    Each poll describes the alarms and fetches the datapoints of their
+    metrics since the bake started, in as few calls as the API limits allow.
+    The bake fails as soon as an alarm is in ALARM and passes early once
+    every alarm has `datapoints` datapoints within its threshold. Composite
+    and metric math alarms are only checked for their state, so the bake
+    runs for the whole `duration` if any are watched.
+    """
+
+    _INTERVAL = 60
+    _DESCRIBE_BATCH_SIZE = 100
+    _QUERY_BATCH_SIZE = 500
+
+    def __init__(self, alarm_names, boto_session, duration, datapoints=3,
+                 retrier=None, clock=None, now=datetime.datetime.utcnow):
+        self._alarm_names = sorted(set(alarm_names))
+        self._boto_session = boto_session
+        self._duration = duration
+        self._datapoints = datapoints
+        self._retrier = retrier or Retrier()
+        self._clock = clock or SystemClock()
+        self._now = now
+        self._cloudwatch_client = None
+        self.polls = 0
+        self.api_calls = Counter()
+
+    def wait(self):
+        start = self._clock.time()
+        deadline = start + self._duration
+        self._start_time = self._now()
+        logger.info('baking for up to {}s, watching {} alarm(s)'.format(
+            self._duration, len(self._alarm_names)
+        ))
+        while not self._poll():
+            now = self._clock.time()
+            if now >= deadline:
+                break
+            with tracer.span('sleep'):
+                self._clock.sleep(min(self._INTERVAL, deadline - now))
+        logger.info(
+            'bake passed after {:.0f}s ({} polls, {} API calls)'.format(
+                self._clock.time() - start, self.polls,
+                sum(self.api_calls.values())
+            )
+        )
+
+    def _poll(self):
+        """Check the alarms, returning True once they have enough data."""
+        self.polls += 1
+        with tracer.span('bake_poll'):
+            metric_alarms, composite_alarms = self._describe_alarms()
+            _check_states(metric_alarms + composite_alarms)
+            if composite_alarms or not all(
+                _countable(alarm) for alarm in metric_alarms
+            ):
+                return False
+            return self._clean(metric_alarms)
+
+    def _describe_alarms(self):
+        metric_alarms, composite_alarms = [], []
+        for offset in range(
+            0, len(self._alarm_names), self._DESCRIBE_BATCH_SIZE
+        ):
+            kwargs = {
+                'AlarmNames': self._alarm_names[
+                    offset:offset + self._DESCRIBE_BATCH_SIZE
+                ],
+                'AlarmTypes': ['MetricAlarm', 'CompositeAlarm'],
+            }
+            for response in self._pages('describe_alarms', kwargs):
+                metric_alarms.extend(response.get('MetricAlarms', []))
+                composite_alarms.extend(response.get('CompositeAlarms', []))
+        _check_found(self._alarm_names, metric_alarms + composite_alarms)
+        return metric_alarms, composite_alarms
+
+    def _clean(self, alarms):
+        values = self._metric_values(alarms)
+        clean = {
+            alarm['AlarmName']: sum(
+                not BREACHING[alarm['ComparisonOperator']](
+                    value, alarm['Threshold']
+                )
+                for value in values.get(index, [])
+            )
+            for index, alarm in enumerate(alarms)
+        }
+        return all(count >= self._datapoints for count in clean.values())
+
+    def _metric_values(self, alarms):
+        queries = [_query(index, alarm) for index, alarm in enumerate(alarms)]
+        values = {}
+        end_time = self._now()
+        for offset in range(0, len(queries), self._QUERY_BATCH_SIZE):
+            kwargs = {
+                'MetricDataQueries': queries[
+                    offset:offset + self._QUERY_BATCH_SIZE
+                ],
+                'StartTime': self._start_time,
+                'EndTime': end_time,
+            }
+            for response in self._pages('get_metric_data', kwargs):
+                for result in response['MetricDataResults']:
+                    values.setdefault(int(result['Id'][1:]), []).extend(
+                        result['Values']
+                    )
+        return values
+
+    def _pages(self, operation, kwargs):
+        while True:
+            self.api_calls[operation] += 1
+            response = self._retrier.call(
+                getattr(self._cloudwatch, operation), **kwargs
+            )
+            yield response
+            if not response.get('NextToken'):
+                return
+            kwargs = dict(kwargs, NextToken=response['NextToken'])
+
+    @property
+    def _cloudwatch(self):
+        if self._cloudwatch_client is None:
+            self._cloudwatch_client = self._boto_session.client('cloudwatch')
+        return self._cloudwatch_client
+
+
+def _countable(alarm):
+    return 'MetricName' in alarm and \
+        alarm.get('ComparisonOperator') in BREACHING
+
+
+def _query(index, alarm):
+    return {
+        'Id': 'm{}'.format(index),
+        'MetricStat': {
+            'Metric': {
+                'Namespace': alarm['Namespace'],
+                'MetricName': alarm['MetricName'],
+                'Dimensions': alarm.get('Dimensions', []),
+            },
+            'Period': alarm['Period'],
+            'Stat': alarm.get('Statistic') or alarm['ExtendedStatistic'],
+        },
+        'ReturnData': True,
+    }
+
+
+def _check_found(alarm_names, alarms):
+    missing = set(alarm_names) - set(alarm['AlarmName'] for alarm in alarms)
+    if missing:
+        raise UserFacingError('bake alarm(s) not found: {}'.format(
+            ', '.join(sorted(missing))
+        ))
+
+
+def _check_states(alarms):
+    firing = [alarm for alarm in alarms if alarm['StateValue'] == ALARM]
+    if firing:
+        raise AlarmError(firing)
+
+
+class AlarmError(UserFacingError):
+    def __init__(self, alarms):
+        self._alarms = alarms
+
+    def __str__(self):
+        return 'Deployment failed - alarm(s) fired during the bake: ' \
+            '{}'.format('; '.join(
+                '{} ({})'.format(alarm['AlarmName'], alarm.get('StateReason'))
+                for alarm in self._alarms
+            ))
@@ -0,0 +1,158 @@
+from collections import Counter, namedtuple
+
+from ecs_update_monitor.clock import SystemClock
+from ecs_update_monitor.retry import Retrier
+from ecs_update_monitor.taskdefs import TaskdefCache
+
+
+DESCRIBE_BATCH_SIZE = 100
+DEFAULT_MAXIMUM_PERCENT = 200
+
+
+Instance = namedtuple('Instance', [
+    'remaining_cpu', 'remaining_memory',
+    'registered_cpu', 'registered_memory',
+])
+
+Forecast = namedtuple('Forecast', [
+    'tasks_to_place', 'tasks_that_fit', 'missing_instances',
+])
+
+
+class CapacityIndex:
+
+    _TTL = 30
+
+    def __init__(self, boto_session, retrier=None, taskdef_cache=None,
+                 clock=None):
+        self._boto_session = boto_session
+        self._clock = clock or SystemClock()
+        self._retrier = retrier or Retrier(clock=self._clock)
+        self._taskdefs = taskdef_cache or TaskdefCache(
+            boto_session, retrier=self._retrier
+        )
+        self._ecs_client = None
+        self._cache = {}
+        self.api_calls = Counter()
+
+    def forecast(self, cluster, taskdef, desired, maximum_percent,
+                 placed, previous_running):
+        cpu, memory = task_resources(self._taskdefs.get(taskdef))
+        if not (cpu or memory):
+            return None
+        tasks_to_place = max(0, min(
+            desired, desired * maximum_percent // 100 - previous_running
+        ) - placed)
+        instances = self.instances(cluster)
+        tasks_that_fit = sum(
+            _tasks_per_instance(
+                instance.remaining_cpu, instance.remaining_memory,
+                cpu, memory
+            )
+            for instance in instances
+        )
+        return Forecast(
+            tasks_to_place, tasks_that_fit, _missing_instances(
+                instances, cpu, memory, tasks_to_place - tasks_that_fit
+            )
+        )
+
+    def instances(self, cluster):
+        cached = self._cache.get(cluster)
+        if cached is not None and self._clock.time() - cached[0] < self._TTL:
+            return cached[1]
+        instances = self._describe_instances(cluster)
+        self._cache[cluster] = (self._clock.time(), instances)
+        return instances
+
+    @property
+    def _ecs(self):
+        if self._ecs_client is None:
+            self._ecs_client = self._boto_session.client('ecs')
+        return self._ecs_client
+
+    def _list_instance_arns(self, cluster):
+        arns = []
+        kwargs = {
+            'cluster': cluster,
+            'status': 'ACTIVE',
+            'maxResults': DESCRIBE_BATCH_SIZE,
+        }
+        while True:
+            response = self._retrier.call(
+                self._ecs.list_container_instances, **kwargs
+            )
+            self.api_calls['list_container_instances'] += 1
+            arns.extend(response['containerInstanceArns'])
+            if not response.get('nextToken'):
+                return arns
+            kwargs['nextToken'] = response['nextToken']
+
+    def _describe_instances(self, cluster):
+        arns = self._list_instance_arns(cluster)
+        instances = []
+        for offset in range(0, len(arns), DESCRIBE_BATCH_SIZE):
+            response = self._retrier.call(
+                self._ecs.describe_container_instances,
+                cluster=cluster,
+                containerInstances=arns[offset:offset + DESCRIBE_BATCH_SIZE]
+            )
+            self.api_calls['describe_container_instances'] += 1
+            instances.extend(
+                _instance(description)
+                for description in response['containerInstances']
+            )
+        return instances
+
+
+def task_resources(taskdef_description):
+    containers = taskdef_description.get('containerDefinitions', [])
+    cpu = taskdef_description.get('cpu') or sum(
+        container.get('cpu', 0) for container in containers
+    )
+    memory = taskdef_description.get('memory') or sum(
+        container.get('memoryReservation') or container.get('memory') or 0
+        for container in containers
+    )
+    return int(cpu), int(memory)
+
+
+def _instance(description):
+    remaining = _resources(description['remainingResources'])
+    registered = _resources(description['registeredResources'])
+    return Instance(
+        remaining.get('CPU', 0), remaining.get('MEMORY', 0),
+        registered.get('CPU', 0), registered.get('MEMORY', 0),
+    )
+
+
+def _resources(resources):
+    return {
+        resource['name']: resource.get('integerValue', 0)
+        for resource in resources
+    }
+
+
+def _tasks_per_instance(available_cpu, available_memory, cpu, memory):
+    limits = [
+        available // required
+        for available, required in (
+            (available_cpu, cpu), (available_memory, memory)
+        )
+        if required > 0
+    ]
+    return min(limits) if limits else 0
+
+
+def _missing_instances(instances, cpu, memory, shortfall):
+    if shortfall <= 0:
+        return 0
+    per_instance = max([
+        _tasks_per_instance(
+            instance.registered_cpu, instance.registered_memory, cpu, memory
+        )
+        for instance in instances
+    ] or [0])
+    if per_instance == 0:
+        return None
+    return -(-shortfall // per_instance)
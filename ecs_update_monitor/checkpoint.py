@@ -0,0 +1,71 @@
+import json
+import os
+from time import time
+
+from ecs_update_monitor.logger import logger
+from ecs_update_monitor.taskdefs import key_path, write_atomically
+
+
+class Checkpoint:
+    """Monitor state persisted between runs for one deployment.
+
+    The state is keyed by cluster, service, taskdef and deployment id, so a
+    re-run for the same deployment resumes where the previous run stopped.
+    Times are saved as durations together with the wall-clock time of the
+    save, and the time the monitor was not running counts as elapsed. The
+    save time is read from `now`, a wall clock, as it is compared across
+    processes.
+    """
+
+    def __init__(self, directory, cluster, service, taskdef, now=time):
+        self._directory = directory
+        self._now = now
+        self._key = [cluster, service, taskdef]
+        self._path = None
+        self._saved_at = None
+        self.state = {}
+
+    def resume(self, deployment_id):
+        """Load the checkpoint for the deployment, returning its state.
+
+        A checkpoint that cannot be read is ignored and the run starts fresh.
+        """
+        self._path = key_path(self._directory, self._key + [deployment_id])
+        if not os.path.exists(self._path):
+            return self.state
+        try:
+            with open(self._path) as f:
+                checkpoint = json.load(f)
+            state = checkpoint['state']
+            saved_at = float(checkpoint['saved_at'])
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.warning('ignoring unreadable checkpoint {}: {}'.format(
+                self._path, e
+            ))
+            return self.state
+        self.state, self._saved_at = state, saved_at
+        return self.state
+
+    @property
+    def resumed(self):
+        return self._saved_at is not None
+
+    @property
+    def downtime(self):
+        """Seconds between the last save and the resume."""
+        if self._saved_at is None:
+            return 0
+        return max(0, self._now() - self._saved_at)
+
+    def update(self, name, state):
+        self.state[name] = state
+
+    def write(self):
+        if self._path is not None:
+            write_atomically(self._path, {
+                'key': self._key, 'saved_at': self._now(), 'state': self.state,
+            })
+
+    def clear(self):
+        if self._path is not None and os.path.exists(self._path):
+            os.remove(self._path)
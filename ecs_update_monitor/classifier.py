@@ -0,0 +1,95 @@
+import re
+
+
+STEADY_STATE = 'steady_state'
+PLACEMENT_CPU = 'placement_cpu'
+PLACEMENT_MEMORY = 'placement_memory'
+PLACEMENT_PORTS = 'placement_ports'
+PLACEMENT_ATTRIBUTES = 'placement_attributes'
+PLACEMENT = 'placement'
+UNHEALTHY_TARGET = 'unhealthy_target'
+DEREGISTERED_TARGETS = 'deregistered_targets'
+TASK_START_FAILURE = 'task_start_failure'
+DRAINING = 'draining'
+TASKS_STARTED = 'tasks_started'
+TASKS_STOPPED = 'tasks_stopped'
+
+PLACEMENT_TAGS = frozenset([
+    PLACEMENT_CPU, PLACEMENT_MEMORY, PLACEMENT_PORTS, PLACEMENT_ATTRIBUTES,
+    PLACEMENT,
+])
+
+_PLACEMENT_FAILURE = (
+    r'was unable to place a task because no container instance met all of '
+    r'its requirements'
+)
+
+# Each pattern starts with the verb of the messages it matches, and is only
+# tried against messages with that verb. Within a verb, more specific
+# patterns must come before the more general ones that share their prefix,
+# as the first pattern to match wins.
+PATTERNS = [
+    (STEADY_STATE, r'has reached a steady state'),
+    (PLACEMENT_CPU, _PLACEMENT_FAILURE + r'.*insufficient CPU'),
+    (PLACEMENT_MEMORY, _PLACEMENT_FAILURE + r'.*insufficient memory'),
+    (PLACEMENT_PORTS, _PLACEMENT_FAILURE + r'.*already using a port'),
+    (PLACEMENT_ATTRIBUTES, _PLACEMENT_FAILURE + r'.*missing an attribute'),
+    (PLACEMENT, _PLACEMENT_FAILURE),
+    (UNHEALTHY_TARGET, r'is unhealthy in \(target-group'),
+    (UNHEALTHY_TARGET, r'failed (?:ELB|container) health checks'),
+    (DEREGISTERED_TARGETS, r'deregistered \d+ targets'),
+    (TASK_START_FAILURE, (
+        r'is unable to consistently start tasks successfully'
+    )),
+    (TASK_START_FAILURE, r'failed to launch a task'),
+    (TASK_START_FAILURE, r'deployment .*tasks? failed to start'),
+    (DRAINING, r'has begun draining connections'),
+    (TASKS_STARTED, r'has started \d+ tasks'),
+    (TASKS_STOPPED, r'has stopped \d+ running tasks'),
+]
+
+# ECS service event messages are a run of parenthesised subjects, such as
+# "(service app) (port 80)", followed by a verb phrase.
+_VERB = re.compile(r'(?:\([^)]*\)\s*)*(\w+)')
+
+
+class MessageClassifier:
+    """Tags messages with the first of the patterns that they match.
+
+    The patterns are grouped by their verb, and a message is only tried
+    against the patterns for its own verb, so the cost per message does not
+    grow with the number of patterns for other kinds of message.
+    """
+
+    def __init__(self, patterns):
+        self._patterns = {}
+        for tag, pattern in patterns:
+            verb = re.match(r'\w+', pattern)
+            if verb is None:
+                raise ValueError(
+                    'pattern must start with a verb: {}'.format(pattern)
+                )
+            self._patterns.setdefault(verb.group(), []).append(
+                (tag, re.compile(pattern, re.DOTALL))
+            )
+
+    def candidates(self, message):
+        """The (tag, pattern) pairs that the message is tried against, and
+        the position of its verb."""
+        match = _VERB.match(message)
+        if match is None:
+            return [], 0
+        return self._patterns.get(match.group(1), []), match.start(1)
+
+    def classify(self, message):
+        candidates, start = self.candidates(message)
+        for tag, pattern in candidates:
+            if pattern.match(message, start):
+                return tag
+        return None
+
+    def classify_all(self, messages):
+        return [self.classify(message) for message in messages]
+
+
+classifier = MessageClassifier(PATTERNS)
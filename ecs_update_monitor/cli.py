@@ -1,11 +1,19 @@
 import argparse
+import os
 import sys
 from re import match
-
-from boto3 import Session
+from socket import gethostname
 
 from ecs_update_monitor import run, UserFacingError
+from ecs_update_monitor.lite import LiteSession
 from ecs_update_monitor.logger import logger
+from ecs_update_monitor.multi import MultiServiceMonitor, read_manifest
+from ecs_update_monitor.otel import exporter_for, OpenTelemetryBackend
+from ecs_update_monitor.release import read_release, ReleaseMonitor
+from ecs_update_monitor.shard import SQLiteCoordinator, ShardedWatcher
+from ecs_update_monitor.simulator import simulate, table
+from ecs_update_monitor.tracer import tracer
+from ecs_update_monitor.watch import ClusterWatcher
 
 
 def parse_args(argv):
@@ -20,10 +28,207 @@ def parse_args(argv):
     parser.add_argument(
         '--caller-arn', help='ARN of caller.', required=False
     )
+    parser.add_argument(
+        '--check-capacity', action='store_true',
+        help='Check up front whether the cluster has room for the '
+             'deployment and signal a scale-out if it does not.'
+    )
+    parser.add_argument(
+        '--trace-file', required=False,
+        help='Write a Chrome trace-event JSON file of the run.'
+    )
+    parser.add_argument(
+        '--profile-file', required=False,
+        help='Write a cProfile dump of the event processing.'
+    )
+    parser.add_argument(
+        '--summary-file', required=False,
+        help='Write a JSON summary of the deployment timeline.'
+    )
+    parser.add_argument(
+        '--task-startup', action='store_true',
+        help='Report image pull, start and health check timings of the '
+             'new tasks.'
+    )
+    parser.add_argument(
+        '--taskdef-cache-dir', required=False,
+        help='Directory to keep task definition descriptions in between '
+             'runs.'
+    )
+    parser.add_argument(
+        '--no-wait-for-drain', dest='wait_for_drain', action='store_false',
+        help='Finish once the new tasks are all running, without waiting '
+             'for the previous deployment\'s tasks to drain.'
+    )
+    parser.add_argument(
+        '--discovery-health', action='store_true',
+        help='For services registered in Cloud Map, complete once the new '
+             'tasks are healthy in their registries and fail if they stay '
+             'unhealthy.'
+    )
+    parser.add_argument(
+        '--rollback', action='store_true',
+        help='If the deployment fails, update the service back to the '
+             'previous task definition and wait for it. Exits with status 2 '
+             'if the rollback succeeds.'
+    )
+    parser.add_argument(
+        '--bake-alarm', action='append', dest='bake_alarms',
+        metavar='ALARM_NAME',
+        help='After the deployment completes, fail if this CloudWatch alarm '
+             'fires during the bake period. Can be given more than once.'
+    )
+    parser.add_argument(
+        '--bake-seconds', type=int, default=600,
+        help='Maximum length of the bake period (default: 600).'
+    )
+    parser.add_argument(
+        '--bake-datapoints', type=int, default=3,
+        help='End the bake early once every alarm\'s metric has this many '
+             'datapoints within its threshold (default: 3).'
+    )
+    parser.add_argument(
+        '--client', choices=sorted(SESSIONS), default='boto3',
+        help='AWS client to use. "lite" avoids importing boto3 but only '
+             'reads credentials from the environment.'
+    )
+    parser.add_argument(
+        '--stall-timeout', type=int, required=False,
+        help='Fail if the deployment makes no progress for this many '
+             'seconds plus the service health check grace period.'
+    )
+    parser.add_argument(
+        '--checkpoint-dir', required=False,
+        help='Save progress in this directory so that a re-run for the '
+             'same deployment resumes where an interrupted run stopped.'
+    )
+    parser.add_argument(
+        '--completion-cache-dir', required=False,
+        help='Record completed deployments in this directory so that a '
+             're-run for a deployment that already completed only checks '
+             'that it is still settled.'
+    )
+    parser.add_argument(
+        '--completion-cache-ttl', type=int, default=86400,
+        help='Seconds a recorded completion is trusted for (default: '
+             '86400).'
+    )
+    parser.add_argument(
+        '--failure-logs', action='store_true',
+        help='When the deployment fails, print the last log lines of the '
+             'newest stopped tasks (awslogs only).'
+    )
+    parser.add_argument(
+        '--notify', action='append', metavar='URL_OR_PATH',
+        help='Send deployment start, progress, failure and completion '
+             'notifications to a webhook URL or append them to a file. '
+             'Can be given more than once.'
+    )
+    parser.add_argument(
+        '--otel-exporter', required=False,
+        help='Export OpenTelemetry spans to "stdout", "otlp" or a file '
+             'path. The trace context is read from TRACEPARENT.'
+    )
     return parser.parse_args(argv)
 
 
-def switch_role(sts, caller_arn, region):
+def parse_watch_args(argv):
+    parser = argparse.ArgumentParser(
+        description='Continuously watch every service in an ECS cluster.',
+        prog='ecs_update_monitor watch',
+    )
+    parser.add_argument(
+        '--cluster', action='append', required=True,
+        help='ECS cluster name. Can be given more than once with '
+             '--coordinator.'
+    )
+    parser.add_argument('--region', help='AWS region.', required=True)
+    parser.add_argument(
+        '--caller-arn', help='ARN of caller.', required=False
+    )
+    parser.add_argument(
+        '--ticks', type=int, required=False,
+        help='Stop after this many polls (default: run forever).'
+    )
+    parser.add_argument(
+        '--coordinator', required=False, metavar='PATH',
+        help='SQLite database shared by several watchers, which split the '
+             'services between them.'
+    )
+    parser.add_argument(
+        '--node-id', default='{}:{}'.format(gethostname(), os.getpid()),
+        help='Name of this watcher in the coordinator (default: '
+             'hostname:pid).'
+    )
+    args = parser.parse_args(argv)
+    if len(args.cluster) > 1 and args.coordinator is None:
+        parser.error('watching several clusters requires --coordinator')
+    return args
+
+
+def parse_multi_args(argv):
+    parser = argparse.ArgumentParser(
+        description='Monitor updates to several ECS services in a cluster.',
+        prog='ecs_update_monitor multi',
+    )
+    parser.add_argument('--cluster', help='ECS cluster name.', required=True)
+    parser.add_argument(
+        '--manifest', required=True,
+        help='File of "<service> <taskdef>" lines to wait for.'
+    )
+    parser.add_argument('--region', help='AWS region.', required=True)
+    parser.add_argument(
+        '--caller-arn', help='ARN of caller.', required=False
+    )
+    parser.add_argument(
+        '--check-capacity', action='store_true',
+        help='Check up front whether the cluster has room for the '
+             'deployments and signal a scale-out if it does not.'
+    )
+    return parser.parse_args(argv)
+
+
+def parse_release_args(argv):
+    parser = argparse.ArgumentParser(
+        description='Roll out ECS services that depend on each other, each '
+                    'as soon as its dependencies have completed.',
+        prog='ecs_update_monitor release',
+    )
+    parser.add_argument('--cluster', help='ECS cluster name.', required=True)
+    parser.add_argument(
+        '--manifest', required=True,
+        help='File of "<service> <taskdef> [<dependency>...]" lines.'
+    )
+    parser.add_argument('--region', help='AWS region.', required=True)
+    parser.add_argument(
+        '--caller-arn', help='ARN of caller.', required=False
+    )
+    parser.add_argument(
+        '--check-capacity', action='store_true',
+        help='Check whether the cluster has room for each deployment as it '
+             'starts and signal a scale-out if it does not.'
+    )
+    return parser.parse_args(argv)
+
+
+def parse_simulate_args(argv):
+    parser = argparse.ArgumentParser(
+        description='Compare monitor policies against simulated ECS '
+                    'deployments.',
+        prog='ecs_update_monitor simulate',
+    )
+    parser.add_argument(
+        '--runs', type=int, default=1000,
+        help='Deployments to simulate per scenario (default: 1000).'
+    )
+    parser.add_argument(
+        '--seed', type=int, default=0,
+        help='Seed of the first deployment, for repeatable results.'
+    )
+    return parser.parse_args(argv)
+
+
+def switch_role(sts, caller_arn, region, session_class=None):
     m = match(
         r'arn:aws:sts::(\d+):assumed-role/'
         r'([\w+=,.@_/-]{1,64})/([\w=,.@-]{0,64})$',
@@ -34,11 +239,12 @@ def switch_role(sts, caller_arn, region):
             'IAM caller did not match terraform, but caller arn did not '
             'match expected pattern ("{}")'.format(caller_arn)
         )
-    response = sts.assume_role(
-        RoleArn='arn:aws:iam::{}:role/{}'.format(m.group(1), m.group(2)),
-        RoleSessionName=m.group(3)
-    )
-    return Session(
+    with tracer.span('switch_role'):
+        response = sts.assume_role(
+            RoleArn='arn:aws:iam::{}:role/{}'.format(m.group(1), m.group(2)),
+            RoleSessionName=m.group(3)
+        )
+    return (session_class or Session)(
         aws_access_key_id=response['Credentials']['AccessKeyId'],
         aws_secret_access_key=response['Credentials']['SecretAccessKey'],
         aws_session_token=response['Credentials']['SessionToken'],
@@ -47,14 +253,131 @@ def switch_role(sts, caller_arn, region):
 
 
 def main(argv):
+    command = COMMANDS.get(argv[0]) if argv else None
+    if command is None:
+        wait_for_deployment(argv)
+    else:
+        command(argv[1:])
+
+
+def wait_for_deployment(argv):
     args = parse_args(argv)
-    session = Session(region_name=args.region)
+    if args.trace_file is not None or args.profile_file is not None:
+        tracer.enable(profile=args.profile_file is not None)
+    try:
+        if args.otel_exporter is not None:
+            tracer.add_backend(
+                OpenTelemetryBackend(exporter_for(args.otel_exporter))
+            )
+        monitor(args)
+    except UserFacingError as e:
+        logger.error(str(e))
+        sys.exit(getattr(e, 'exit_status', 1))
+    finally:
+        tracer.write(args.trace_file, args.profile_file)
+        tracer.close()
+
+
+def Session(**kwargs):
+    """A boto3 session, importing boto3 only when it is used."""
+    from boto3 import Session
+    return Session(**kwargs)
+
+
+def create_session(region, caller_arn, client='boto3'):
+    session_class = SESSIONS[client]
+    session = session_class(region_name=region)
     sts = session.client('sts')
-    caller = sts.get_caller_identity()
-    if caller['Arn'] != args.caller_arn:
-        session = switch_role(sts, args.caller_arn, args.region)
+    with tracer.span('get_caller_identity'):
+        caller = sts.get_caller_identity()
+    if caller['Arn'] != caller_arn:
+        session = switch_role(sts, caller_arn, region, session_class)
+    return session
+
+
+def monitor(args):
+    session = create_session(args.region, args.caller_arn, args.client)
+    run(
+        args.cluster, args.service, args.taskdef, session,
+        check_capacity=args.check_capacity,
+        summary_file=args.summary_file,
+        task_startup=args.task_startup,
+        taskdef_cache_dir=args.taskdef_cache_dir,
+        notify=args.notify,
+        failure_logs=args.failure_logs,
+        checkpoint_dir=args.checkpoint_dir,
+        stall_timeout=args.stall_timeout,
+        wait_for_drain=args.wait_for_drain,
+        rollback=args.rollback,
+        bake_alarms=args.bake_alarms,
+        bake_seconds=args.bake_seconds,
+        bake_datapoints=args.bake_datapoints,
+        completion_cache_dir=args.completion_cache_dir,
+        completion_cache_ttl=args.completion_cache_ttl,
+        discovery_health=args.discovery_health
+    )
+
+
+def watch(argv):
+    args = parse_watch_args(argv)
+    session = create_session(args.region, args.caller_arn)
+    if args.coordinator is None:
+        ClusterWatcher(args.cluster[0], session).watch(args.ticks)
+        return
+    ShardedWatcher(
+        args.cluster, session,
+        SQLiteCoordinator(args.coordinator, args.node_id)
+    ).watch(args.ticks)
+
+
+def monitor_services(argv):
+    args = parse_multi_args(argv)
     try:
-        run(args.cluster, args.service, args.taskdef, session)
+        targets = read_manifest(args.manifest)
+        if not targets:
+            logger.info('no service deployments to wait for')
+            return
+        session = create_session(args.region, args.caller_arn)
+        MultiServiceMonitor(
+            args.cluster, targets, session,
+            check_capacity=args.check_capacity
+        ).wait()
     except UserFacingError as e:
         logger.error(str(e))
         sys.exit(1)
+
+
+def release(argv):
+    args = parse_release_args(argv)
+    try:
+        targets, dependencies = read_release(args.manifest)
+        if not targets:
+            logger.info('no service deployments to release')
+            return
+        session = create_session(args.region, args.caller_arn)
+        ReleaseMonitor(
+            args.cluster, targets, dependencies, session,
+            check_capacity=args.check_capacity
+        ).wait()
+    except UserFacingError as e:
+        logger.error(str(e))
+        sys.exit(1)
+
+
+def simulate_policies(argv):
+    args = parse_simulate_args(argv)
+    for line in table(simulate(runs=args.runs, seed=args.seed)):
+        logger.info(line)
+
+
+COMMANDS = {
+    'watch': watch,
+    'multi': monitor_services,
+    'release': release,
+    'simulate': simulate_policies,
+}
+
+SESSIONS = {
+    'boto3': lambda **kwargs: Session(**kwargs),
+    'lite': lambda **kwargs: LiteSession(**kwargs),
+}
@@ -0,0 +1,29 @@
+from time import monotonic, sleep
+
+
+class SystemClock:
+    """Monotonic time and real sleeps."""
+
+    def time(self):
+        return monotonic()
+
+    def sleep(self, seconds):
+        sleep(seconds)
+
+
+class VirtualClock:
+    """A clock that only moves when slept, for tests and simulations."""
+
+    def __init__(self, start=0):
+        self._now = start
+        self.sleeps = []
+
+    def time(self):
+        return self._now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.advance(seconds)
+
+    def advance(self, seconds):
+        self._now += max(0, seconds)
@@ -0,0 +1,43 @@
+import json
+import os
+from time import time
+
+from ecs_update_monitor.taskdefs import key_path, write_atomically
+
+
+class CompletionCache:
+    """Deployments that an earlier run saw complete.
+
+    Entries are keyed by cluster, service, taskdef and ECS deployment id and
+    expire after `ttl` seconds, so a re-run for a deployment that already
+    completed only has to check that it is still settled.
+    """
+
+    def __init__(self, directory, cluster, service, taskdef, ttl=86400,
+                 now=time):
+        self._directory = directory
+        self._key = [cluster, service, taskdef]
+        self._ttl = ttl
+        self._now = now
+
+    def completed(self, deployment_id):
+        path = self._path(deployment_id)
+        if not os.path.exists(path):
+            return False
+        try:
+            with open(path) as f:
+                completed_at = json.load(f)['completed_at']
+            if self._now() - completed_at < self._ttl:
+                return True
+        except (ValueError, KeyError, TypeError):
+            pass
+        os.remove(path)
+        return False
+
+    def record(self, deployment_id):
+        write_atomically(self._path(deployment_id), {
+            'key': self._key + [deployment_id], 'completed_at': self._now(),
+        })
+
+    def _path(self, deployment_id):
+        return key_path(self._directory, self._key + [deployment_id])
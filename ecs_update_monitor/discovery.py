@@ -0,0 +1,145 @@
+from collections import Counter
+
+from ecs_update_monitor.errors import UserFacingError
+from ecs_update_monitor.logger import logger
+from ecs_update_monitor.retry import Retrier
+from ecs_update_monitor.tasks import list_tasks
+
+
+HEALTHY = 'HEALTHY'
+UNHEALTHY = 'UNHEALTHY'
+
+
+class DiscoveryHealth:
+    """Health of a deployment's tasks in its Cloud Map service registries.
+
+    ECS registers each task under its task ID, so a single paged
+    `get_instances_health_status` call per registry covers every new task.
+    `healthy` is the number of tasks healthy in all of the registries, or
+    None until Cloud Map reports a health status for any of them.
+    """
+
+    _PAGE_SIZE = 100
+    _UNHEALTHY_POLLS = 3
+
+    def __init__(self, cluster, boto_session, retrier=None):
+        self._cluster = cluster
+        self._boto_session = boto_session
+        self._retrier = retrier or Retrier()
+        self._ecs_client = None
+        self._discovery_client = None
+        self._statuses = {}
+        self._unhealthy_polls = Counter()
+        self._disabled = False
+        self.healthy = None
+        self.api_calls = Counter()
+
+    def poll(self, registry_arns, deployment_id):
+        if self._disabled:
+            return []
+        service_ids = sorted(set(
+            arn.split('/')[-1] for arn in registry_arns
+        ))
+        try:
+            task_ids = [
+                arn.split('/')[-1] for arn in list_tasks(
+                    self._ecs, self._retrier, self.api_calls, self._cluster,
+                    deployment_id
+                )
+            ]
+            statuses = {
+                service_id: self._health_statuses(service_id)
+                for service_id in service_ids
+            }
+        except Exception as e:
+            if _error_code(e) != 'AccessDeniedException':
+                raise
+            logger.warning(
+                'not checking Cloud Map health, access denied: {}'.format(e)
+            )
+            self._disabled = True
+            return []
+        return self._update(task_ids, statuses)
+
+    def _health_statuses(self, service_id):
+        statuses = {}
+        kwargs = {'ServiceId': service_id, 'MaxResults': self._PAGE_SIZE}
+        while True:
+            self.api_calls['get_instances_health_status'] += 1
+            response = self._retrier.call(
+                self._discovery.get_instances_health_status, **kwargs
+            )
+            statuses.update(response.get('Status', {}))
+            if not response.get('NextToken'):
+                return statuses
+            kwargs['NextToken'] = response['NextToken']
+
+    def _update(self, task_ids, statuses):
+        messages = []
+        unhealthy_polls = Counter()
+        for task_id in task_ids:
+            for service_id, status in sorted(statuses.items()):
+                key = (task_id, service_id)
+                messages.extend(self._transition(key, status.get(task_id)))
+                if status.get(task_id) == UNHEALTHY:
+                    unhealthy_polls[key] = self._unhealthy_polls[key] + 1
+        self._unhealthy_polls = unhealthy_polls
+        self._check_unhealthy()
+        self.healthy = self._count_healthy(task_ids, statuses)
+        return messages
+
+    def _transition(self, key, status):
+        previous = self._statuses.get(key)
+        self._statuses[key] = status
+        if status is None or status == previous:
+            return []
+        return ['task {}: Cloud Map {} health {} -> {}'.format(
+            key[0], key[1], previous or 'UNKNOWN', status
+        )]
+
+    def _check_unhealthy(self):
+        for (task_id, service_id), polls in self._unhealthy_polls.items():
+            if polls >= self._UNHEALTHY_POLLS:
+                raise UnhealthyRegistrationError(task_id, service_id, polls)
+
+    def _count_healthy(self, task_ids, statuses):
+        if not any(
+            task_id in status
+            for task_id in task_ids for status in statuses.values()
+        ):
+            return None
+        return sum(
+            all(status.get(task_id) == HEALTHY for status in statuses.values())
+            for task_id in task_ids
+        )
+
+    @property
+    def _ecs(self):
+        if self._ecs_client is None:
+            self._ecs_client = self._boto_session.client('ecs')
+        return self._ecs_client
+
+    @property
+    def _discovery(self):
+        if self._discovery_client is None:
+            self._discovery_client = self._boto_session.client(
+                'servicediscovery'
+            )
+        return self._discovery_client
+
+
+def _error_code(error):
+    return getattr(error, 'response', {}).get('Error', {}).get('Code')
+
+
+class UnhealthyRegistrationError(UserFacingError):
+    def __init__(self, task_id, service_id, polls):
+        self._task_id = task_id
+        self._service_id = service_id
+        self._polls = polls
+
+    def __str__(self):
+        return 'Deployment failed - task {} has been unhealthy in Cloud Map ' \
+            'service {} for {} polls'.format(
+                self._task_id, self._service_id, self._polls
+            )
@@ -0,0 +1,441 @@
+"""A minimal AWS client using only the standard library.
+
+Supports just the operations the monitor needs, signs requests with SigV4,
+keeps one connection per endpoint alive and returns plain dicts shaped like
+boto3's responses (timestamps as timezone aware datetimes).
+"""
+import datetime
+import hashlib
+import hmac
+import json
+import os
+from functools import partial
+from http.client import HTTPSConnection
+from urllib.parse import quote
+from xml.etree import ElementTree
+
+from ecs_update_monitor.errors import UserFacingError
+
+
+ALGORITHM = 'AWS4-HMAC-SHA256'
+
+
+class LiteClientError(Exception):
+    """An error response, with `response` shaped like botocore's."""
+
+    def __init__(self, operation, status, code, message):
+        self.response = {
+            'Error': {'Code': code, 'Message': message},
+            'ResponseMetadata': {'HTTPStatusCode': status},
+        }
+        super(LiteClientError, self).__init__(
+            'An error occurred ({}) when calling the {} operation: {}'.format(
+                code, operation, message
+            )
+        )
+
+
+class LiteSession:
+    """Drop-in for the parts of `boto3.Session` the monitor uses.
+
+    Credentials are taken from the arguments or from the `AWS_ACCESS_KEY_ID`,
+    `AWS_SECRET_ACCESS_KEY` and `AWS_SESSION_TOKEN` environment variables.
+    """
+
+    def __init__(self, aws_access_key_id=None, aws_secret_access_key=None,
+                 aws_session_token=None, region_name=None, environ=os.environ):
+        if aws_access_key_id is None:
+            aws_access_key_id = environ.get('AWS_ACCESS_KEY_ID')
+            aws_secret_access_key = environ.get('AWS_SECRET_ACCESS_KEY')
+            aws_session_token = environ.get('AWS_SESSION_TOKEN')
+        if not (aws_access_key_id and aws_secret_access_key):
+            raise UserFacingError(
+                'the lite client needs AWS credentials in the '
+                'AWS_ACCESS_KEY_ID and AWS_SECRET_ACCESS_KEY environment '
+                'variables'
+            )
+        self._credentials = (
+            aws_access_key_id, aws_secret_access_key, aws_session_token
+        )
+        self.region_name = region_name or environ.get('AWS_REGION') or \
+            environ.get('AWS_DEFAULT_REGION')
+
+    def client(self, service_name, region_name=None):
+        if service_name not in CLIENTS:
+            raise UserFacingError(
+                'the lite client does not support {}'.format(service_name)
+            )
+        client_class, options = CLIENTS[service_name]
+        return client_class(
+            region_name or self.region_name, self._credentials, **options
+        )
+
+
+class Client:
+
+    def __init__(self, region, credentials, operations, endpoint):
+        self._service = endpoint
+        self._region = region
+        self._credentials = credentials
+        self._operations = operations
+        self._host = '{}.{}.amazonaws.com'.format(endpoint, region)
+        self._connection = None
+
+    def __getattr__(self, name):
+        if name.startswith('_') or name not in self._operations:
+            raise AttributeError(name)
+        return partial(
+            self._invoke, _pascal_case(name), self._operations[name]
+        )
+
+    def _request(self, body, headers):
+        headers = dict(headers, host=self._host)
+        headers.update(sign(
+            'POST', self._host, '/', body, headers, self._service,
+            self._region, self._credentials, datetime.datetime.utcnow()
+        ))
+        if self._connection is None:
+            self._connection = HTTPSConnection(self._host, timeout=30)
+        try:
+            self._connection.request('POST', '/', body, headers)
+            response = self._connection.getresponse()
+            return response.status, response.read()
+        except Exception:
+            self._connection.close()
+            self._connection = None
+            raise
+
+
+class JSONClient(Client):
+    """Services using the JSON 1.1 protocol, e.g. ECS."""
+
+    def __init__(self, region, credentials, operations, endpoint,
+                 target_prefix):
+        super(JSONClient, self).__init__(
+            region, credentials, operations, endpoint
+        )
+        self._target_prefix = target_prefix
+
+    def _invoke(self, operation, parse, **params):
+        status, body = self._request(json.dumps(params).encode('utf-8'), {
+            'content-type': 'application/x-amz-json-1.1',
+            'x-amz-target': '{}.{}'.format(self._target_prefix, operation),
+        })
+        if status >= 300:
+            raise _json_error(operation, status, body)
+        return parse(json.loads(body.decode('utf-8')) if body else {})
+
+
+class QueryClient(Client):
+    """Services using the query protocol with XML responses, e.g. STS."""
+
+    def __init__(self, region, credentials, operations, endpoint, version):
+        super(QueryClient, self).__init__(
+            region, credentials, operations, endpoint
+        )
+        self._version = version
+
+    def _invoke(self, operation, parse, **params):
+        fields = [('Action', operation), ('Version', self._version)]
+        fields.extend(_flatten(params))
+        status, body = self._request(
+            '&'.join(
+                '{}={}'.format(quote(key, safe=''), quote(value, safe=''))
+                for key, value in fields
+            ).encode('utf-8'),
+            {'content-type': 'application/x-www-form-urlencoded'}
+        )
+        if status >= 300:
+            raise _xml_error(operation, status, body)
+        root = ElementTree.fromstring(body)
+        result = [
+            element for element in root
+            if _tag(element) == '{}Result'.format(operation)
+        ]
+        return parse(_xml_to_dict(result[0]) if result else {})
+
+
+def _json_error(operation, status, body):
+    try:
+        data = json.loads(body.decode('utf-8'))
+        code = data.get('__type', 'Unknown').split('#')[-1]
+        message = data.get('message', data.get('Message', ''))
+    except (ValueError, AttributeError):
+        return _unparsed_error(operation, status, body)
+    return LiteClientError(operation, status, code, message)
+
+
+def _xml_error(operation, status, body):
+    try:
+        root = ElementTree.fromstring(body)
+    except ElementTree.ParseError:
+        return _unparsed_error(operation, status, body)
+    return LiteClientError(
+        operation, status, _find_text(root, 'Code'),
+        _find_text(root, 'Message')
+    )
+
+
+def _unparsed_error(operation, status, body):
+    """An error whose body is not an AWS error response, e.g. an HTML page
+    from a proxy. As with botocore, the code is the HTTP status, so 5xx
+    errors are still retried."""
+    return LiteClientError(
+        operation, status, str(status),
+        body.decode('utf-8', 'replace')[:200]
+    )
+
+
+def sign(method, host, path, body, headers, service, region, credentials,
+         now):
+    """Return the SigV4 headers to add to a request."""
+    access_key, secret_key, session_token = credentials
+    amz_date = now.strftime('%Y%m%dT%H%M%SZ')
+    date = now.strftime('%Y%m%d')
+    headers = dict(
+        {key.lower(): value for key, value in headers.items()},
+        host=host
+    )
+    headers['x-amz-date'] = amz_date
+    if session_token:
+        headers['x-amz-security-token'] = session_token
+    signed_headers = ';'.join(sorted(headers))
+    canonical_request = '\n'.join([
+        method, path, '',
+        ''.join(
+            '{}:{}\n'.format(key, ' '.join(str(headers[key]).split()))
+            for key in sorted(headers)
+        ),
+        signed_headers,
+        hashlib.sha256(body).hexdigest(),
+    ])
+    scope = '{}/{}/{}/aws4_request'.format(date, region, service)
+    string_to_sign = '\n'.join([
+        ALGORITHM, amz_date, scope,
+        hashlib.sha256(canonical_request.encode('utf-8')).hexdigest(),
+    ])
+    key = ('AWS4' + secret_key).encode('utf-8')
+    for part in (date, region, service, 'aws4_request'):
+        key = _hmac(key, part)
+    signature = hmac.new(
+        key, string_to_sign.encode('utf-8'), hashlib.sha256
+    ).hexdigest()
+    signature_headers = {
+        'x-amz-date': amz_date,
+        'authorization': '{} Credential={}/{}, SignedHeaders={}, '
+                         'Signature={}'.format(
+                             ALGORITHM, access_key, scope, signed_headers,
+                             signature
+                         ),
+    }
+    if session_token:
+        signature_headers['x-amz-security-token'] = session_token
+    return signature_headers
+
+
+def parse_services(data):
+    """Keep only the parts of `DescribeServices` the monitor reads."""
+    return {
+        'services': [
+            {
+                'serviceName': service.get('serviceName'),
+                'status': service.get('status'),
+                'launchType': service.get('launchType'),
+                'taskDefinition': service.get('taskDefinition'),
+                'deploymentConfiguration': service.get(
+                    'deploymentConfiguration', {}
+                ),
+                'healthCheckGracePeriodSeconds': service.get(
+                    'healthCheckGracePeriodSeconds', 0
+                ),
+                'serviceRegistries': service.get('serviceRegistries', []),
+                'deployments': [
+                    _deployment(deployment)
+                    for deployment in service.get('deployments', [])
+                ],
+                'events': [
+                    {
+                        'id': event['id'],
+                        'createdAt': _datetime(event['createdAt']),
+                        'message': event['message'],
+                    }
+                    for event in service.get('events', [])
+                ],
+            }
+            for service in data.get('services', [])
+        ],
+        'failures': data.get('failures', []),
+    }
+
+
+def parse_timestamps(data):
+    """Convert every numeric `...At` field to a datetime, like boto3."""
+    if isinstance(data, list):
+        return [parse_timestamps(item) for item in data]
+    if not isinstance(data, dict):
+        return data
+    return {
+        key: _datetime(value)
+        if key.endswith('At') and isinstance(value, (int, float))
+        else parse_timestamps(value)
+        for key, value in data.items()
+    }
+
+
+def parse_alarms(data):
+    """Give `DescribeAlarms` the types boto3 would, from query XML."""
+    return {
+        'MetricAlarms': [
+            _metric_alarm(alarm) for alarm in data.get('MetricAlarms') or []
+        ],
+        'CompositeAlarms': data.get('CompositeAlarms') or [],
+        'NextToken': data.get('NextToken'),
+    }
+
+
+def parse_metric_data(data):
+    """Keep the ids and (numeric) values of `GetMetricData` results."""
+    return {
+        'MetricDataResults': [
+            {
+                'Id': result['Id'],
+                'Values': [
+                    float(value) for value in result.get('Values') or []
+                ],
+            }
+            for result in data.get('MetricDataResults') or []
+        ],
+        'NextToken': data.get('NextToken'),
+    }
+
+
+def _metric_alarm(alarm):
+    parsed = dict(alarm, Dimensions=alarm.get('Dimensions') or [])
+    for key, convert in (
+        ('Threshold', float), ('Period', int), ('EvaluationPeriods', int),
+    ):
+        if key in alarm:
+            parsed[key] = convert(alarm[key])
+    return parsed
+
+
+def _deployment(deployment):
+    parsed = {
+        key: deployment.get(key)
+        for key in (
+            'id', 'status', 'taskDefinition', 'runningCount', 'pendingCount',
+            'desiredCount',
+        )
+    }
+    parsed['createdAt'] = _datetime(deployment['createdAt'])
+    return parsed
+
+
+def _datetime(timestamp):
+    return datetime.datetime.fromtimestamp(
+        timestamp, datetime.timezone.utc
+    )
+
+
+def _hmac(key, message):
+    return hmac.new(key, message.encode('utf-8'), hashlib.sha256).digest()
+
+
+def _pascal_case(name):
+    return ''.join(part.capitalize() for part in name.split('_'))
+
+
+def _flatten(value, prefix=''):
+    """Flatten parameters into query protocol fields."""
+    if isinstance(value, dict):
+        items = [(_join(prefix, key), value[key]) for key in sorted(value)]
+    elif isinstance(value, list):
+        items = [
+            (_join(prefix, 'member.{}'.format(index)), item)
+            for index, item in enumerate(value, 1)
+        ]
+    else:
+        return [(prefix, _query_value(value))]
+    return [field for key, item in items for field in _flatten(item, key)]
+
+
+def _query_value(value):
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, datetime.datetime):
+        return value.strftime('%Y-%m-%dT%H:%M:%SZ')
+    return str(value)
+
+
+def _join(prefix, key):
+    return '{}.{}'.format(prefix, key) if prefix else key
+
+
+def _tag(element):
+    return element.tag.split('}')[-1]
+
+
+def _find_text(root, tag):
+    for element in root.iter():
+        if _tag(element) == tag:
+            return element.text
+    return None
+
+
+def _xml_to_dict(element):
+    children = list(element)
+    if not children:
+        return element.text
+    if all(_tag(child) == 'member' for child in children):
+        return [_xml_to_dict(child) for child in children]
+    return {_tag(child): _xml_to_dict(child) for child in children}
+
+
+def _identity(data):
+    return data
+
+
+ECS_OPERATIONS = {
+    'describe_services': parse_services,
+    'list_services': _identity,
+    'list_tasks': _identity,
+    'describe_tasks': parse_timestamps,
+    'describe_task_definition': parse_timestamps,
+    'list_container_instances': _identity,
+    'describe_container_instances': parse_timestamps,
+    'update_service': _identity,
+}
+
+CLIENTS = {
+    'ecs': (JSONClient, {
+        'operations': ECS_OPERATIONS,
+        'endpoint': 'ecs',
+        'target_prefix': 'AmazonEC2ContainerServiceV20141113',
+    }),
+    'logs': (JSONClient, {
+        'operations': {'get_log_events': parse_timestamps},
+        'endpoint': 'logs',
+        'target_prefix': 'Logs_20140328',
+    }),
+    'servicediscovery': (JSONClient, {
+        'operations': {'get_instances_health_status': _identity},
+        'endpoint': 'servicediscovery',
+        'target_prefix': 'Route53AutoNaming_v20170314',
+    }),
+    'sts': (QueryClient, {
+        'operations': {
+            'get_caller_identity': _identity, 'assume_role': _identity,
+        },
+        'endpoint': 'sts',
+        'version': '2011-06-15',
+    }),
+    'cloudwatch': (QueryClient, {
+        'operations': {
+            'put_metric_data': _identity,
+            'describe_alarms': parse_alarms,
+            'get_metric_data': parse_metric_data,
+        },
+        'endpoint': 'monitoring',
+        'version': '2010-08-01',
+    }),
+}
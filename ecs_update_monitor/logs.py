@@ -0,0 +1,210 @@
+import threading
+from collections import deque
+
+from ecs_update_monitor.clock import SystemClock
+from ecs_update_monitor.retry import Retrier
+
+
+class FailureLogs:
+    """Fetches the last log lines of the newest stopped tasks of a service.
+
+    Reads the awslogs configuration of each container from the task
+    definition and fetches the streams concurrently on daemon threads, so a
+    hung call holds up neither the run nor the process exiting. Streams that
+    have not arrived within `_TIME_BUDGET` seconds are skipped, and fetching
+    and output stop once `_BYTE_BUDGET` bytes have been fetched.
+    """
+
+    _TASKS = 3
+    _LINES = 20
+    _TIME_BUDGET = 10
+    _BYTE_BUDGET = 16 * 1024
+    _WORKERS = 8
+
+    def __init__(self, cluster, service, taskdef, boto_session,
+                 taskdef_cache, clock=None):
+        self._cluster = cluster
+        self._service = service
+        self._taskdef = taskdef
+        self._boto_session = boto_session
+        self._taskdefs = taskdef_cache
+        self._clock = clock or SystemClock()
+
+    def lines(self):
+        deadline = self._clock.time() + self._TIME_BUDGET
+        retrier = Retrier(deadline=deadline, clock=self._clock)
+        tasks = self._stopped_tasks(retrier)
+        lines = []
+        for task in tasks:
+            lines.append('task {} stopped: {}'.format(
+                _task_id(task), task.get('stoppedReason', 'unknown reason')
+            ))
+        streams = self._log_streams(tasks)
+        lines.extend(self._fetch(
+            streams, deadline - self._clock.time(),
+            self._BYTE_BUDGET - sum(len(line) + 1 for line in lines)
+        ))
+        return _truncate(lines, self._BYTE_BUDGET)
+
+    def _stopped_tasks(self, retrier):
+        ecs = self._boto_session.client('ecs')
+        arns = retrier.call(
+            ecs.list_tasks, cluster=self._cluster, serviceName=self._service,
+            desiredStatus='STOPPED'
+        )['taskArns']
+        if not arns:
+            return []
+        tasks = [
+            task
+            for task in retrier.call(
+                ecs.describe_tasks, cluster=self._cluster, tasks=arns[:100]
+            )['tasks']
+            if task['taskDefinitionArn'] == self._taskdef and
+            task.get('stoppedAt')
+        ]
+        tasks.sort(key=lambda task: task['stoppedAt'], reverse=True)
+        return tasks[:self._TASKS]
+
+    def _log_streams(self, tasks):
+        containers = self._taskdefs.get(self._taskdef).get(
+            'containerDefinitions', []
+        )
+        return [
+            stream
+            for task in tasks
+            for stream in (
+                _log_stream(container, task) for container in containers
+            )
+            if stream is not None
+        ]
+
+    def _fetch(self, streams, timeout, budget):
+        if not streams or budget <= 0:
+            return []
+        clients = {
+            region: self._boto_session.client('logs', region_name=region)
+            for region in set(stream[0] for stream in streams)
+        }
+        fetcher = _StreamFetcher(
+            lambda region, group, stream: self._get_log_events(
+                clients[region], group, stream
+            ),
+            streams, budget
+        )
+        fetcher.start(min(self._WORKERS, len(streams)))
+        results = fetcher.wait(max(0, timeout))
+        return [
+            line
+            for index, stream in enumerate(streams)
+            for line in _stream_lines(results.get(index), stream)
+        ]
+
+    def _get_log_events(self, logs, group, stream):
+        return [
+            event['message'].rstrip()
+            for event in logs.get_log_events(
+                logGroupName=group, logStreamName=stream,
+                limit=self._LINES, startFromHead=False
+            )['events']
+        ]
+
+
+class _StreamFetcher:
+    """Fetches streams in order on daemon threads until the byte budget is
+    spent. Streams not fetched by then are left out."""
+
+    def __init__(self, fetch, streams, budget):
+        self._fetch = fetch
+        self._queue = deque(enumerate(streams))
+        self._budget = budget
+        self._running = 0
+        self._results = {}
+        self._condition = threading.Condition()
+
+    def start(self, workers):
+        for _ in range(workers):
+            worker = threading.Thread(target=self._work)
+            worker.daemon = True
+            worker.start()
+
+    def wait(self, timeout):
+        """Results so far by stream index, once done or after `timeout`."""
+        with self._condition:
+            self._condition.wait_for(self._done, timeout)
+            return dict(self._results)
+
+    def _done(self):
+        return not self._queue and self._running == 0
+
+    def _work(self):
+        while True:
+            item = self._next()
+            if item is None:
+                return
+            index, stream = item
+            try:
+                result = self._fetch(*stream)
+            except Exception as e:
+                result = e
+            self._finished(index, stream, result)
+
+    def _next(self):
+        with self._condition:
+            if self._budget <= 0:
+                self._queue.clear()
+            if not self._queue:
+                self._condition.notify_all()
+                return None
+            self._running += 1
+            return self._queue.popleft()
+
+    def _finished(self, index, stream, result):
+        with self._condition:
+            self._running -= 1
+            self._results[index] = result
+            self._budget -= sum(
+                len(line) + 1 for line in _stream_lines(result, stream)
+            )
+            self._condition.notify_all()
+
+
+def _task_id(task):
+    return task['taskArn'].split('/')[-1]
+
+
+def _log_stream(container, task):
+    configuration = container.get('logConfiguration') or {}
+    options = configuration.get('options', {})
+    if configuration.get('logDriver') != 'awslogs' or \
+            'awslogs-stream-prefix' not in options:
+        return None
+    return (
+        options.get('awslogs-region'),
+        options['awslogs-group'],
+        '{}/{}/{}'.format(
+            options['awslogs-stream-prefix'], container['name'],
+            _task_id(task)
+        ),
+    )
+
+
+def _stream_lines(result, stream):
+    """`result` is the stream's lines, the error fetching it or None if it
+    was not fetched."""
+    header = 'logs {}:'.format(stream[2])
+    if result is None:
+        return [header, '  (timed out)']
+    if isinstance(result, Exception):
+        return [header, '  ({})'.format(result)]
+    return [header] + ['  ' + line for line in result]
+
+
+def _truncate(lines, budget):
+    kept = []
+    for line in lines:
+        budget -= len(line) + 1
+        if budget < 0:
+            kept.append('... output truncated')
+            break
+        kept.append(line)
+    return kept
@@ -0,0 +1,165 @@
+from collections import Counter, OrderedDict
+
+from ecs_update_monitor import (
+    ECSEventIterator, ECSMonitor, TaskdefDoesNotMatchError, UserFacingError
+)
+from ecs_update_monitor.capacity import CapacityIndex
+from ecs_update_monitor.clock import SystemClock
+from ecs_update_monitor.logger import logger
+from ecs_update_monitor.retry import Retrier
+from ecs_update_monitor.taskdefs import TaskdefCache
+from ecs_update_monitor.tracer import tracer
+
+
+def read_manifest(path):
+    """Read `<service> <taskdef>` lines, the last line for a service wins."""
+    targets = OrderedDict()
+    with open(path) as f:
+        for line in f:
+            fields = line.split()
+            if not fields:
+                continue
+            if len(fields) != 2:
+                raise UserFacingError(
+                    'invalid manifest line (expected "<service> <taskdef>"): '
+                    '{}'.format(line.strip())
+                )
+            targets.pop(fields[0], None)
+            targets[fields[0]] = fields[1]
+    return list(targets.items())
+
+
+class ServiceDescriber:
+    """Describes a set of services ten at a time, once per poll."""
+
+    _BATCH_SIZE = 10
+
+    def __init__(self, cluster, boto_session, retrier):
+        self._cluster = cluster
+        self._boto_session = boto_session
+        self._retrier = retrier
+        self._ecs_client = None
+        self._services = {}
+        self.api_calls = Counter()
+
+    def refresh(self, services):
+        self._services = {}
+        for offset in range(0, len(services), self._BATCH_SIZE):
+            with tracer.span('describe_services', cluster=self._cluster):
+                response = self._retrier.call(
+                    self._ecs.describe_services,
+                    cluster=self._cluster,
+                    services=services[offset:offset + self._BATCH_SIZE]
+                )
+            self.api_calls['describe_services'] += 1
+            self._services.update(
+                (service['serviceName'], service)
+                for service in response['services']
+            )
+
+    def describe(self, service):
+        if service not in self._services:
+            raise UserFacingError(
+                'service {} not found in cluster {}'.format(
+                    service, self._cluster
+                )
+            )
+        return {'services': [self._services[service]]}
+
+    @property
+    def _ecs(self):
+        if self._ecs_client is None:
+            self._ecs_client = self._boto_session.client('ecs')
+        return self._ecs_client
+
+
+class MultiServiceMonitor:
+    """Waits for the deployments of several services in one cluster.
+
+    All services are polled together with batched `describe_services` calls,
+    each through its own `ECSEventIterator` and `ECSMonitor`.
+    """
+
+    _INTERVAL = 15
+
+    def __init__(self, cluster, targets, boto_session, check_capacity=False,
+                 clock=None):
+        self._clock = clock or SystemClock()
+        self._retrier = retrier = Retrier(clock=self._clock)
+        taskdef_cache = TaskdefCache(boto_session, retrier=retrier)
+        capacity_index = CapacityIndex(
+            boto_session, retrier=retrier, taskdef_cache=taskdef_cache,
+            clock=self._clock
+        ) if check_capacity else None
+        self._describer = ServiceDescriber(cluster, boto_session, retrier)
+        self._monitors = OrderedDict(
+            (service, ECSMonitor(
+                ECSEventIterator(
+                    cluster, service, taskdef, boto_session,
+                    capacity_index=capacity_index, retrier=retrier,
+                    describer=self._describer, taskdef_cache=taskdef_cache,
+                    clock=self._clock
+                ),
+                cluster, boto_session, retrier=retrier, clock=self._clock,
+                name=service
+            ))
+            for service, taskdef in targets
+        )
+        self.results = OrderedDict()
+
+    def wait(self):
+        for monitor in self._monitors.values():
+            monitor.begin()
+        pending = list(self._monitors)
+        while pending:
+            self._describer.refresh(pending)
+            pending = [
+                service for service in pending if not self._poll(service)
+            ]
+            if pending:
+                with tracer.span('sleep'):
+                    self._clock.sleep(self._next_interval(pending))
+        self._report()
+
+    def _next_interval(self, pending):
+        return min(
+            [self._INTERVAL] +
+            [self._monitors[service].next_interval for service in pending]
+        )
+
+    def _poll(self, service):
+        """Poll one service, returning True once it has finished."""
+        monitor = self._monitors[service]
+        try:
+            done = monitor.poll()
+        except (UserFacingError, TaskdefDoesNotMatchError) as e:
+            monitor.finish('failed', str(e))
+            self.results[service] = str(e)
+            return True
+        if done:
+            monitor.finish('completed')
+            self.results[service] = None
+        return done
+
+    def _report(self):
+        logger.info('{} describe_services calls shared by {} services'.format(
+            self._describer.api_calls['describe_services'], len(self.results)
+        ))
+        for service, error in self.results.items():
+            logger.info('{}: {}'.format(service, error or 'completed'))
+        failed = [
+            service for service, error in self.results.items() if error
+        ]
+        if failed:
+            raise ServicesFailedError(failed, len(self.results))
+
+
+class ServicesFailedError(UserFacingError):
+    def __init__(self, failed, total):
+        self._failed = failed
+        self._total = total
+
+    def __str__(self):
+        return '{} of {} service deployments failed: {}'.format(
+            len(self._failed), self._total, ', '.join(self._failed)
+        )
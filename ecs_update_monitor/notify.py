@@ -0,0 +1,136 @@
+import datetime
+import json
+import threading
+from collections import Counter, deque
+from urllib.request import Request, urlopen
+
+from ecs_update_monitor.logger import logger
+
+
+STARTED = 'started'
+PROGRESS = 'progress'
+COMPLETED = 'completed'
+FAILED = 'failed'
+
+
+class WebhookSink:
+    """POSTs each batch as `{"notifications": [...]}` JSON to a URL."""
+
+    _TIMEOUT = 5
+
+    def __init__(self, url):
+        self._url = url
+
+    def send(self, notifications):
+        request = Request(
+            self._url,
+            data=json.dumps({'notifications': notifications}).encode('utf-8'),
+            headers={'Content-Type': 'application/json'},
+        )
+        urlopen(request, timeout=self._TIMEOUT).close()
+
+
+class FileSink:
+    """Appends one JSON notification per line to a file."""
+
+    def __init__(self, path):
+        self._path = path
+
+    def send(self, notifications):
+        with open(self._path, 'a') as f:
+            for notification in notifications:
+                f.write(json.dumps(notification, sort_keys=True) + '\n')
+
+
+def sink_for(target):
+    if target.startswith('http://') or target.startswith('https://'):
+        return WebhookSink(target)
+    return FileSink(target)
+
+
+def _coalesce(earlier, later):
+    """The later progress update, with the messages of both."""
+    if 'messages' not in earlier:
+        return later
+    return dict(
+        later, messages=earlier['messages'] + later.get('messages', [])
+    )
+
+
+class Notifier:
+    """Delivers notifications to sinks from a background thread.
+
+    `notify` never blocks on a sink. Notifications wait in a bounded buffer
+    where consecutive progress updates are coalesced into the latest one,
+    keeping the service event messages of all of them, and once the buffer
+    is full further progress updates are dropped. Start,
+    failure and completion notifications are always kept.
+    """
+
+    _CAPACITY = 100
+    _BATCH_SIZE = 20
+    _CLOSE_TIMEOUT = 10
+
+    def __init__(self, sinks, **context):
+        self._sinks = sinks
+        self._context = context
+        self._buffer = deque()
+        self._condition = threading.Condition()
+        self._closed = False
+        self.stats = Counter()
+        self._worker = threading.Thread(target=self._deliver)
+        self._worker.daemon = True
+        self._worker.start()
+
+    def notify(self, kind, **detail):
+        notification = dict(self._context, kind=kind, **detail)
+        notification['time'] = datetime.datetime.utcnow().isoformat()
+        with self._condition:
+            self._add(notification)
+            self._condition.notify()
+
+    def close(self):
+        """Deliver what is buffered, waiting at most `_CLOSE_TIMEOUT`."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        self._worker.join(self._CLOSE_TIMEOUT)
+        if self._worker.is_alive():
+            logger.warning('gave up waiting for notifications to be sent')
+
+    def _add(self, notification):
+        if notification['kind'] != PROGRESS:
+            self._buffer.append(notification)
+        elif self._buffer and self._buffer[-1]['kind'] == PROGRESS:
+            self._buffer[-1] = _coalesce(self._buffer[-1], notification)
+            self.stats['coalesced'] += 1
+        elif len(self._buffer) >= self._CAPACITY:
+            self.stats['dropped'] += 1
+        else:
+            self._buffer.append(notification)
+
+    def _deliver(self):
+        while True:
+            batch = self._next_batch()
+            if not batch:
+                return
+            for sink in self._sinks:
+                self._send(sink, batch)
+
+    def _next_batch(self):
+        with self._condition:
+            while not self._buffer and not self._closed:
+                self._condition.wait()
+            return [
+                self._buffer.popleft()
+                for _ in range(min(self._BATCH_SIZE, len(self._buffer)))
+            ]
+
+    def _send(self, sink, batch):
+        try:
+            sink.send(batch)
+        except Exception as e:
+            self.stats['failed'] += len(batch)
+            logger.warning('failed to send notifications: {}'.format(e))
+        else:
+            self.stats['sent'] += len(batch)
@@ -0,0 +1,108 @@
+import os
+from contextlib import contextmanager
+
+from ecs_update_monitor import UserFacingError
+
+try:
+    from opentelemetry import context, propagate, trace
+    from opentelemetry.sdk.resources import Resource
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import (
+        ConsoleSpanExporter, SimpleSpanProcessor
+    )
+except ImportError:  # pragma: no cover - optional dependency
+    trace = None
+else:
+    class FileSpanExporter(ConsoleSpanExporter):
+        """Appends spans as JSON lines to a file, closed on shutdown."""
+
+        def __init__(self, path):
+            self._file = open(path, 'a')
+            super(FileSpanExporter, self).__init__(
+                out=self._file,
+                formatter=lambda span: span.to_json(indent=None) + os.linesep
+            )
+
+        def shutdown(self):
+            super(FileSpanExporter, self).shutdown()
+            self._file.close()
+
+
+# Environment variables used to carry the caller's trace context, as used by
+# CI systems and the OpenTelemetry environment carrier convention.
+CONTEXT_ENVIRONMENT_VARIABLES = {
+    'traceparent': 'TRACEPARENT',
+    'tracestate': 'TRACESTATE',
+    'baggage': 'BAGGAGE',
+}
+
+
+class OpenTelemetryBackend:
+
+    def __init__(self, exporter, environ=os.environ):
+        if trace is None:
+            raise UserFacingError(
+                'OpenTelemetry tracing requires the opentelemetry-sdk package'
+            )
+        self._provider = TracerProvider(resource=Resource.create({
+            'service.name': 'ecs_update_monitor',
+        }))
+        self._provider.add_span_processor(SimpleSpanProcessor(exporter))
+        self._tracer = self._provider.get_tracer('ecs_update_monitor')
+        self._token = context.attach(
+            propagate.extract(_environment_carrier(environ))
+        )
+
+    @contextmanager
+    def span(self, name, **attributes):
+        with self._tracer.start_as_current_span(
+            name, attributes=_attributes(attributes)
+        ):
+            yield
+
+    def event(self, name, **attributes):
+        trace.get_current_span().add_event(name, _attributes(attributes))
+
+    def close(self):
+        context.detach(self._token)
+        self._provider.shutdown()
+
+
+def exporter_for(destination):
+    if trace is None:
+        raise UserFacingError(
+            'OpenTelemetry tracing requires the opentelemetry-sdk package'
+        )
+    if destination == 'stdout':
+        return ConsoleSpanExporter()
+    if destination == 'otlp':
+        return _otlp_exporter()
+    return FileSpanExporter(destination)
+
+
+def _otlp_exporter():
+    try:
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import (
+            OTLPSpanExporter
+        )
+    except ImportError:
+        raise UserFacingError(
+            'the otlp exporter requires the '
+            'opentelemetry-exporter-otlp-proto-http package'
+        )
+    return OTLPSpanExporter()
+
+
+def _environment_carrier(environ):
+    return {
+        key: environ[variable]
+        for key, variable in CONTEXT_ENVIRONMENT_VARIABLES.items()
+        if variable in environ
+    }
+
+
+def _attributes(attributes):
+    return {
+        key: value if isinstance(value, (bool, int, float)) else str(value)
+        for key, value in attributes.items()
+    }
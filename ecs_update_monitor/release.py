@@ -0,0 +1,212 @@
+from collections import OrderedDict
+
+from ecs_update_monitor.errors import UserFacingError
+from ecs_update_monitor.logger import logger
+from ecs_update_monitor.multi import MultiServiceMonitor
+from ecs_update_monitor.tracer import tracer
+
+
+def read_release(path):
+    """Read `<service> <taskdef> [<dependency>...]` lines.
+
+    Returns the targets, as `(service, taskdef)` pairs, and a dict of the
+    services each service depends on.
+    """
+    dependencies = OrderedDict()
+    targets = OrderedDict()
+    with open(path) as f:
+        for line in f:
+            fields = line.split()
+            if not fields:
+                continue
+            if len(fields) < 2:
+                raise UserFacingError(
+                    'invalid release line (expected "<service> <taskdef> '
+                    '[<dependency>...]"): {}'.format(line.strip())
+                )
+            targets[fields[0]] = fields[1]
+            dependencies[fields[0]] = fields[2:]
+    check_dependencies(dependencies)
+    return list(targets.items()), dependencies
+
+
+def check_dependencies(dependencies):
+    unknown = sorted(set(
+        dependency for upstream in dependencies.values()
+        for dependency in upstream if dependency not in dependencies
+    ))
+    if unknown:
+        raise UserFacingError('unknown dependencies: {}'.format(
+            ', '.join(unknown)
+        ))
+    remaining = dict(dependencies)
+    while remaining:
+        ready = [
+            service for service, upstream in remaining.items()
+            if not any(dependency in remaining for dependency in upstream)
+        ]
+        if not ready:
+            raise UserFacingError('dependency cycle between: {}'.format(
+                ', '.join(sorted(remaining))
+            ))
+        for service in ready:
+            del remaining[service]
+
+
+class ReleaseMonitor(MultiServiceMonitor):
+    """Rolls out services that depend on each other, in dependency order.
+
+    Each service is updated to its taskdef and waited on as soon as every
+    service it depends on has completed, with the services being waited on
+    polled together, so the release takes about as long as its critical
+    path. Services that depend on a failed deployment are not started.
+
+    A service is first polled an interval after its update, so that ECS has
+    made the new deployment PRIMARY by then.
+    """
+
+    def __init__(self, cluster, targets, dependencies, boto_session,
+                 check_capacity=False, clock=None):
+        super(ReleaseMonitor, self).__init__(
+            cluster, targets, boto_session, check_capacity=check_capacity,
+            clock=clock
+        )
+        check_dependencies(dependencies)
+        self._cluster = cluster
+        self._boto_session = boto_session
+        self._ecs_client = None
+        self._taskdefs = OrderedDict(targets)
+        self._dependencies = dependencies
+        self._started = {}
+        self._finished = {}
+
+    def wait(self):
+        self._release_start = self._clock.time()
+        pending, running, due = list(self._monitors), [], []
+        while pending or running:
+            pending = self._cancel_blocked(pending)
+            ready = [
+                service for service in pending if self._can_start(service)
+            ]
+            pending = [service for service in pending if service not in ready]
+            running += self._start(ready)
+            self._describer.refresh(due)
+            finished = [service for service in due if self._poll(service)]
+            running = [
+                service for service in running if service not in finished
+            ]
+            if self._can_progress(pending):
+                # start the newly unblocked services straight away, without
+                # polling the others early or the new ones before an interval
+                due = []
+                continue
+            if running:
+                with tracer.span('sleep'):
+                    self._clock.sleep(self._next_interval(running))
+            due = list(running)
+        self._report_critical_path()
+        self._report()
+
+    def critical_path(self):
+        """The chain of completed services that the release waited on."""
+        if not self._finished:
+            return []
+        path = [max(self._finished, key=self._finished.get)]
+        while True:
+            upstream = [
+                dependency for dependency in self._dependencies[path[0]]
+                if dependency in self._finished
+            ]
+            if not upstream:
+                return path
+            path.insert(0, max(upstream, key=self._finished.get))
+
+    def _can_start(self, service):
+        return all(
+            self.results.get(dependency, '') is None
+            for dependency in self._dependencies[service]
+        )
+
+    def _failed_dependency(self, service):
+        for dependency in self._dependencies[service]:
+            if self.results.get(dependency):
+                return dependency
+        return None
+
+    def _can_progress(self, pending):
+        """Whether a pending service can be started or cancelled now."""
+        return any(
+            self._can_start(service) or self._failed_dependency(service)
+            for service in pending
+        )
+
+    def _cancel_blocked(self, pending):
+        still_pending = []
+        for service in pending:
+            dependency = self._failed_dependency(service)
+            if dependency is None:
+                still_pending.append(service)
+                continue
+            self.results[service] = 'cancelled - {} failed'.format(
+                dependency
+            )
+            logger.info('{}: not starting, {} failed'.format(
+                service, dependency
+            ))
+        return still_pending
+
+    def _start(self, services):
+        started = []
+        for service in services:
+            self._started[service] = self._clock.time() - self._release_start
+            logger.info('{}: starting deployment of {}'.format(
+                service, self._taskdefs[service]
+            ))
+            try:
+                with tracer.span('update_service', service=service):
+                    self._retrier.call(
+                        self._ecs.update_service, cluster=self._cluster,
+                        service=service,
+                        taskDefinition=self._taskdefs[service]
+                    )
+            except Exception as e:
+                self.results[service] = 'update failed - {}'.format(e)
+                continue
+            self._monitors[service].begin()
+            started.append(service)
+        return started
+
+    def _poll(self, service):
+        done = super(ReleaseMonitor, self)._poll(service)
+        if done and self.results[service] is None:
+            self._finished[service] = \
+                self._clock.time() - self._release_start
+        return done
+
+    def _report_critical_path(self):
+        path = self.critical_path()
+        if not path:
+            return
+        logger.info(
+            'release took {:.0f}s ({:.0f}s if run in sequence), critical '
+            'path: {}'.format(
+                self._clock.time() - self._release_start,
+                sum(
+                    self._finished[service] - self._started[service]
+                    for service in self._finished
+                ),
+                ' -> '.join(
+                    '{} ({:.0f}s-{:.0f}s)'.format(
+                        service, self._started[service],
+                        self._finished[service]
+                    )
+                    for service in path
+                )
+            )
+        )
+
+    @property
+    def _ecs(self):
+        if self._ecs_client is None:
+            self._ecs_client = self._boto_session.client('ecs')
+        return self._ecs_client
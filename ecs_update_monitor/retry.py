@@ -0,0 +1,142 @@
+import random
+import socket
+import sys
+from collections import Counter
+from http.client import HTTPException
+
+from ecs_update_monitor.clock import SystemClock
+from ecs_update_monitor.errors import UserFacingError
+from ecs_update_monitor.logger import logger
+
+
+RETRYABLE_ERROR_CODES = frozenset([
+    'Throttling',
+    'ThrottlingException',
+    'ThrottledException',
+    'RequestThrottledException',
+    'TooManyRequestsException',
+    'RequestLimitExceeded',
+    'ServiceUnavailable',
+    'ServiceUnavailableException',
+    'InternalError',
+    'InternalFailure',
+    'ServerException',
+    'RequestTimeout',
+    'RequestTimeoutException',
+])
+
+
+class Retrier:
+    """Retries throttled and transient AWS API failures.
+
+    Uses capped exponential backoff with full jitter, never sleeping past
+    `deadline` (a `clock.time()` value, if set). The circuit breaker spans
+    calls: after `_BREAKER_THRESHOLD` consecutive failed attempts it opens
+    and calls fail immediately for `_COOL_DOWN` seconds. After that a single
+    trial attempt is let through (half-open), which closes the circuit if it
+    succeeds and opens it again if it fails.
+    """
+
+    _BASE_DELAY = 0.5
+    _MAX_DELAY = 20
+    _MAX_ATTEMPTS = 6
+    _BREAKER_THRESHOLD = 10
+    _COOL_DOWN = 60
+
+    def __init__(self, deadline=None, clock=None):
+        self.deadline = deadline
+        self._clock = clock or SystemClock()
+        self.stats = Counter()
+        self._consecutive_failures = 0
+        self._opened_at = None
+        self._last_error = None
+
+    def call(self, function, **kwargs):
+        self._check_circuit()
+        attempt = 0
+        while True:
+            self.stats['attempts'] += 1
+            try:
+                result = function(**kwargs)
+            except Exception as e:
+                delay = self._failed(e, attempt)
+                if delay is None:
+                    raise
+                self._clock.sleep(delay)
+                attempt += 1
+                continue
+            self._consecutive_failures = 0
+            self._opened_at = None
+            return result
+
+    def _check_circuit(self):
+        if self._opened_at is None:
+            return
+        remaining = self._opened_at + self._COOL_DOWN - self._clock.time()
+        if remaining > 0:
+            self.stats['rejected'] += 1
+            raise CircuitOpenError(
+                self._consecutive_failures, self._last_error, remaining
+            )
+
+    def _failed(self, error, attempt):
+        if not is_retryable(error):
+            self.stats['errors'] += 1
+            return None
+        self._consecutive_failures += 1
+        self._last_error = error
+        if self._consecutive_failures >= self._BREAKER_THRESHOLD:
+            self._opened_at = self._clock.time()
+        delay = self._delay(attempt)
+        if delay is None:
+            self.stats['gave_up'] += 1
+            return None
+        self.stats['retries'] += 1
+        logger.info('retrying after {} ({:.1f}s)'.format(error, delay))
+        return delay
+
+    def _delay(self, attempt):
+        if attempt + 1 >= self._MAX_ATTEMPTS or self._opened_at is not None:
+            return None
+        delay = random.uniform(
+            0, min(self._MAX_DELAY, self._BASE_DELAY * 2 ** attempt)
+        )
+        if self.deadline is not None and \
+                self._clock.time() + delay >= self.deadline:
+            return None
+        return delay
+
+
+def is_retryable(error):
+    if isinstance(error, _connection_errors()):
+        return True
+    # botocore's ClientError and the lite client's errors both carry the
+    # parsed error response
+    response = getattr(error, 'response', None)
+    if not isinstance(response, dict):
+        return False
+    code = response.get('Error', {}).get('Code')
+    status = response.get('ResponseMetadata', {}).get('HTTPStatusCode', 0)
+    return code in RETRYABLE_ERROR_CODES or status >= 500
+
+
+def _connection_errors():
+    """Connection errors of the stdlib and, if it is in use, botocore."""
+    errors = (ConnectionError, socket.timeout, HTTPException)
+    exceptions = sys.modules.get('botocore.exceptions')
+    if exceptions is None:
+        return errors
+    return errors + (exceptions.ConnectionError, exceptions.HTTPClientError)
+
+
+class CircuitOpenError(UserFacingError):
+    def __init__(self, failures, last_error, remaining):
+        self._failures = failures
+        self._last_error = last_error
+        self._remaining = remaining
+
+    def __str__(self):
+        return 'AWS API calls failing - not calling for {:.0f}s after {} ' \
+            'consecutive errors (last: {})'.format(
+                self._remaining, self._failures, self._last_error
+            )
@@ -0,0 +1,206 @@
+import hashlib
+import json
+import sqlite3
+from bisect import bisect
+from collections import OrderedDict
+from time import time
+
+from ecs_update_monitor.clock import SystemClock
+from ecs_update_monitor.logger import logger
+from ecs_update_monitor.watch import ClusterWatcher
+
+
+class HashRing:
+    """Consistent hashing of keys onto nodes.
+
+    Each node is placed on the ring at `replicas` points, so adding or
+    removing a node only moves about 1/N of the keys, all of them to or from
+    that node.
+    """
+
+    def __init__(self, nodes, replicas=100):
+        self.nodes = sorted(nodes)
+        points = sorted(
+            (_hash('{}#{}'.format(node, replica)), node)
+            for node in self.nodes for replica in range(replicas)
+        )
+        self._hashes = [point for point, _ in points]
+        self._nodes = [node for _, node in points]
+
+    def owner(self, key):
+        if not self._nodes:
+            return None
+        index = bisect(self._hashes, _hash(key)) % len(self._hashes)
+        return self._nodes[index]
+
+
+def _hash(key):
+    return int(hashlib.md5(key.encode('utf-8')).hexdigest()[:16], 16)
+
+
+class SQLiteCoordinator:
+    """Shard membership kept in a SQLite database shared by the nodes.
+
+    Every node heartbeats each poll, and nodes that have not heartbeated
+    within `ttl` seconds are treated as gone. With each heartbeat a node
+    acknowledges the ring of the live nodes it is moving to. The database
+    also holds the latest service listing of each cluster. Any backend with
+    the same methods can be used instead.
+    """
+
+    def __init__(self, path, node_id, ttl=60, now=time):
+        self.node_id = node_id
+        self._ttl = ttl
+        self._now = now
+        self._db = sqlite3.connect(path, timeout=30)
+        with self._db:
+            self._db.execute(
+                'CREATE TABLE IF NOT EXISTS nodes (node_id TEXT PRIMARY KEY, '
+                'heartbeat REAL NOT NULL, ring TEXT NOT NULL)'
+            )
+            self._db.execute(
+                'CREATE TABLE IF NOT EXISTS listings '
+                '(cluster TEXT PRIMARY KEY, arns TEXT NOT NULL)'
+            )
+
+    def heartbeat(self):
+        """Record this node as alive and acknowledge the live nodes' ring.
+
+        Returns the live nodes and the rings acknowledged by them. This runs
+        as one transaction, so the nodes see each other's acknowledgements
+        in a single order.
+        """
+        now = self._now()
+        with self._db:
+            self._db.execute(
+                'INSERT INTO nodes (node_id, heartbeat, ring) '
+                'VALUES (?, ?, \'[]\') ON CONFLICT (node_id) '
+                'DO UPDATE SET heartbeat = excluded.heartbeat',
+                (self.node_id, now)
+            )
+            self._db.execute(
+                'DELETE FROM nodes WHERE heartbeat < ?', (now - self._ttl,)
+            )
+            nodes = sorted(
+                row[0] for row in
+                self._db.execute('SELECT node_id FROM nodes').fetchall()
+            )
+            self._db.execute(
+                'UPDATE nodes SET ring = ? WHERE node_id = ?',
+                (json.dumps(nodes), self.node_id)
+            )
+            rings = self._db.execute(
+                'SELECT DISTINCT ring FROM nodes'
+            ).fetchall()
+        return nodes, sorted(json.loads(row[0]) for row in rings)
+
+    def publish(self, cluster, arns):
+        with self._db:
+            self._db.execute(
+                'INSERT OR REPLACE INTO listings (cluster, arns) '
+                'VALUES (?, ?)', (cluster, json.dumps(arns))
+            )
+
+    def listing(self, cluster):
+        row = self._db.execute(
+            'SELECT arns FROM listings WHERE cluster = ?', (cluster,)
+        ).fetchone()
+        return [] if row is None else json.loads(row[0])
+
+    def leave(self):
+        with self._db:
+            self._db.execute(
+                'DELETE FROM nodes WHERE node_id = ?', (self.node_id,)
+            )
+        self._db.close()
+
+
+class ShardWatcher(ClusterWatcher):
+    """Watches the services of a cluster that are owned by this node.
+
+    The cluster is listed by one node, which publishes the listing through
+    the coordinator for the others.
+    """
+
+    def __init__(self, cluster, boto_session, shards):
+        super(ShardWatcher, self).__init__(cluster, boto_session)
+        self._shards = shards
+
+    def _list_service_arns(self):
+        return [
+            arn for arn in self._shards.listing(
+                self._cluster,
+                super(ShardWatcher, self)._list_service_arns
+            )
+            if self._shards.owns(self._cluster, arn.rsplit('/', 1)[-1])
+        ]
+
+
+class ShardedWatcher:
+    """Watches the share of the services in several clusters owned by this
+    node, with the (cluster, service) pairs split between the live nodes by
+    a consistent hash ring.
+
+    While the membership changes, the live nodes can be on different rings.
+    A node only polls a service that it owns in every ring acknowledged by a
+    live node, so a service that is moving is polled by neither node, rather
+    than by both, until every node has moved to the new ring.
+    """
+
+    _INTERVAL = ClusterWatcher._INTERVAL
+
+    def __init__(self, clusters, boto_session, coordinator, clock=None):
+        self._coordinator = coordinator
+        self._clock = clock or SystemClock()
+        self._ring = HashRing([])
+        self._rings = []
+        self.watchers = OrderedDict(
+            (cluster, ShardWatcher(cluster, boto_session, self))
+            for cluster in clusters
+        )
+
+    def owns(self, cluster, service):
+        key = '{}/{}'.format(cluster, service)
+        return all(
+            ring.owner(key) == self._coordinator.node_id
+            for ring in self._rings
+        )
+
+    def listing(self, cluster, list_service_arns):
+        """The cluster's services, listed here if this node is its lister."""
+        if self._ring.owner(cluster) != self._coordinator.node_id:
+            return self._coordinator.listing(cluster)
+        arns = list_service_arns()
+        self._coordinator.publish(cluster, arns)
+        return arns
+
+    def watch(self, ticks=None):
+        count = 0
+        try:
+            while ticks is None or count < ticks:
+                if count:
+                    self._clock.sleep(self._INTERVAL)
+                for cluster, report in self.tick():
+                    logger.info('{}/{}: {} - {}'.format(cluster, *report))
+                count += 1
+        finally:
+            self._coordinator.leave()
+
+    def tick(self):
+        self._rebalance()
+        return [
+            (cluster, report)
+            for cluster, watcher in self.watchers.items()
+            for report in watcher.tick()
+        ]
+
+    def _rebalance(self):
+        nodes, rings = self._coordinator.heartbeat()
+        if nodes != self._ring.nodes:
+            self._ring = HashRing(nodes)
+            logger.info('shard {}: {} node(s) in the ring: {}'.format(
+                self._coordinator.node_id, len(nodes), ', '.join(nodes)
+            ))
+        self._rings = [
+            self._ring if ring == nodes else HashRing(ring) for ring in rings
+        ]
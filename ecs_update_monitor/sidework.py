@@ -0,0 +1,89 @@
+import threading
+from collections import Counter, deque
+
+from ecs_update_monitor.logger import logger
+
+
+class SideWork:
+    """Runs work such as metric writes off the polling loop.
+
+    At most `_CAPACITY` jobs are queued or running at once, further jobs are
+    dropped rather than queued, so slow side work can neither delay a poll
+    nor pile up. The workers are daemon threads, so a hung call cannot hold
+    up the process exiting once `close` has given up on it.
+    """
+
+    _WORKERS = 2
+    _CAPACITY = 10
+    _CLOSE_TIMEOUT = 10
+
+    def __init__(self):
+        self._jobs = None
+        self._pending = 0
+        self._slots = threading.BoundedSemaphore(self._CAPACITY)
+        self._condition = threading.Condition()
+        self.stats = Counter()
+
+    def submit(self, name, function, **kwargs):
+        if not self._slots.acquire(False):
+            self.stats['dropped'] += 1
+            logger.warning('dropped {}, too much side work queued'.format(
+                name
+            ))
+            return
+        with self._condition:
+            if self._jobs is None:
+                self._jobs = deque()
+                self._start(self._jobs)
+            self._jobs.append((name, function, kwargs))
+            self._pending += 1
+            self._condition.notify()
+
+    def close(self):
+        """Wait at most `_CLOSE_TIMEOUT` for outstanding work, then drop any
+        jobs not yet started and let the workers go."""
+        with self._condition:
+            if self._jobs is None:
+                return
+            self._condition.wait_for(
+                lambda: self._pending == 0, self._CLOSE_TIMEOUT
+            )
+            for _ in range(len(self._jobs)):
+                self._jobs.popleft()
+                self._job_done()
+            self._jobs = None
+            self._condition.notify_all()
+
+    def _start(self, jobs):
+        for _ in range(self._WORKERS):
+            worker = threading.Thread(target=self._work, args=(jobs,))
+            worker.daemon = True
+            worker.start()
+
+    def _work(self, jobs):
+        while True:
+            with self._condition:
+                self._condition.wait_for(
+                    lambda: jobs or jobs is not self._jobs
+                )
+                if not jobs:
+                    return
+                name, function, kwargs = jobs.popleft()
+            self._run(name, function, kwargs)
+
+    def _run(self, name, function, kwargs):
+        try:
+            function(**kwargs)
+        except Exception as e:
+            self.stats['failed'] += 1
+            logger.warning('{} failed: {}'.format(name, e))
+        else:
+            self.stats['done'] += 1
+        finally:
+            with self._condition:
+                self._job_done()
+
+    def _job_done(self):
+        self._pending -= 1
+        self._slots.release()
+        self._condition.notify_all()
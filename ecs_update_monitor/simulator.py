@@ -0,0 +1,441 @@
+"""Discrete-event simulation of ECS rolling deployments.
+
+`SimulatedService` models the ECS scheduler replacing a service's tasks and
+answers `describe_services` at the time of a `VirtualClock`, so the real
+`ECSEventIterator` and `ECSMonitor` can be run against thousands of
+deployments in seconds. `simulate` uses this to compare monitor policies.
+"""
+import datetime
+import heapq
+import math
+import random
+from collections import Counter, namedtuple
+from itertools import count
+from time import perf_counter
+
+from ecs_update_monitor import ECSEventIterator, ECSMonitor, UserFacingError
+from ecs_update_monitor.clock import VirtualClock
+from ecs_update_monitor.logger import logger
+from ecs_update_monitor.retry import Retrier
+
+
+TASKDEF = 'arn:aws:ecs:eu-west-1:1:task-definition/app:2'
+PREVIOUS_TASKDEF = 'arn:aws:ecs:eu-west-1:1:task-definition/app:1'
+EPOCH = datetime.datetime(2017, 1, 6, 10, 0, 0)
+
+# How long after the monitor stops the simulated deployment is run on for,
+# to find out whether it would have completed.
+HORIZON = 3600
+
+PLACEMENT_FAILURE = (
+    '(service app) was unable to place a task because no container instance '
+    'met all of its requirements. Reason: No Container Instances were found '
+    'in your cluster.'
+)
+
+# `completed_at` is when the deployment last became complete, or None if a
+# task crashed after that.
+Result = namedtuple('Result', [
+    'outcome', 'detected_at', 'completed_at', 'api_calls', 'seconds',
+])
+
+
+class Scenario:
+    """How a simulated deployment behaves.
+
+    Task start latencies are lognormal around `start_median` seconds. Each
+    new task crashes with probability `crash_rate` between `crash_after`
+    seconds after it starts, and each placement fails with probability
+    `placement_failure_rate`, holding up placements for `placement_retry`
+    seconds. Old tasks drain for `drain_seconds` before they stop. ECS sends
+    the steady state message `steady_state_delay` seconds after the service
+    converges, if it is still converged then.
+    """
+
+    def __init__(self, name, desired=4, previous=None,
+                 minimum_healthy_percent=100, maximum_percent=200,
+                 start_median=30, start_sigma=0.5, crash_rate=0.0,
+                 crash_after=(5, 60), placement_failure_rate=0.0,
+                 placement_retry=30, drain_seconds=30,
+                 steady_state_delay=120):
+        self.name = name
+        self.desired = desired
+        self.previous = desired if previous is None else previous
+        self.minimum_healthy_percent = minimum_healthy_percent
+        self.maximum_percent = maximum_percent
+        self.start_median = start_median
+        self.start_sigma = start_sigma
+        self.crash_rate = crash_rate
+        self.crash_after = crash_after
+        self.placement_failure_rate = placement_failure_rate
+        self.placement_retry = placement_retry
+        self.drain_seconds = drain_seconds
+        self.steady_state_delay = steady_state_delay
+
+
+class Policy:
+    """Monitor settings to try, applied to subclasses of the real classes."""
+
+    def __init__(self, name, interval=15, timeout=600, max_failures=3,
+                 grace_period=60, stall_timeout=None):
+        self.name = name
+        self.stall_timeout = stall_timeout
+        self.monitor_class = type('SimulatedMonitor', (ECSMonitor,), {
+            '_INTERVAL': interval,
+            '_TIMEOUT': timeout,
+            '_MAX_FAILURES': max_failures,
+        })
+        self.iterator_class = type(
+            'SimulatedEventIterator', (ECSEventIterator,),
+            {'_NEW_SERVICE_GRACE_PERIOD': grace_period}
+        )
+
+
+SCENARIOS = [
+    Scenario('healthy'),
+    Scenario('slow start', start_median=120, start_sigma=0.8),
+    Scenario('flaky', crash_rate=0.2),
+    Scenario('placement', placement_failure_rate=0.3),
+    Scenario('rolling', minimum_healthy_percent=50, maximum_percent=100),
+    Scenario('new service', previous=0),
+    Scenario('flaky new service', previous=0, crash_rate=0.1),
+    Scenario('broken', crash_rate=1.0, crash_after=(1, 20)),
+]
+
+POLICIES = [
+    Policy('default'),
+    Policy('fast polling', interval=5),
+    Policy('tolerant', max_failures=5, timeout=900),
+    Policy('short grace', grace_period=15),
+    Policy('stall 90s', stall_timeout=90),
+]
+
+
+class SimulatedService:
+    """An ECS service being updated from `previous` tasks to `desired`.
+
+    Also stands in for the boto session and the ECS and CloudWatch clients
+    the monitor uses, counting the API calls made.
+    """
+
+    _EVENT_WINDOW = 100
+
+    def __init__(self, scenario, clock, rng):
+        self._scenario = scenario
+        self._clock = clock
+        self._rng = rng
+        self._queue = []
+        self._sequence = count()
+        self._event_ids = count()
+        self._now = 0
+        self._placement_blocked = False
+        self.pending = 0
+        self.running = 0
+        self.old_running = scenario.previous
+        self.old_draining = 0
+        self.events = []
+        self.completed_at = None
+        self.api_calls = Counter()
+        self._reconcile()
+
+    def client(self, name):
+        return self
+
+    def describe_services(self, cluster, services):
+        self.api_calls['describe_services'] += 1
+        self.advance(self._clock.time())
+        deployments = [self._deployment(
+            'PRIMARY', TASKDEF, self.running, self.pending,
+            self._scenario.desired
+        )]
+        if self.old_running + self.old_draining:
+            deployments.append(self._deployment(
+                'ACTIVE', PREVIOUS_TASKDEF,
+                self.old_running + self.old_draining, 0, self.old_running
+            ))
+        return {'services': [{
+            'serviceName': 'app',
+            'deployments': deployments,
+            'events': list(self.events),
+        }]}
+
+    def put_metric_data(self, **kwargs):
+        self.api_calls['put_metric_data'] += 1
+
+    def advance(self, until):
+        """Run the scheduler's events up to `until` seconds."""
+        while self._queue and self._queue[0][0] <= until:
+            self._now, _, action = heapq.heappop(self._queue)
+            action()
+        self._now = max(self._now, until)
+
+    def _deployment(self, status, taskdef, running, pending, desired):
+        return {
+            'id': 'ecs-svc/{}'.format(status.lower()),
+            'status': status,
+            'taskDefinition': taskdef,
+            'runningCount': running,
+            'pendingCount': pending,
+            'desiredCount': desired,
+            'createdAt': EPOCH - datetime.timedelta(seconds=1),
+        }
+
+    def _schedule(self, delay, action):
+        heapq.heappush(
+            self._queue, (self._now + delay, next(self._sequence), action)
+        )
+
+    def _event(self, message):
+        self.events.insert(0, {
+            'id': str(next(self._event_ids)),
+            'createdAt': EPOCH + datetime.timedelta(seconds=self._now),
+            'message': message,
+        })
+        del self.events[self._EVENT_WINDOW:]
+
+    def _reconcile(self):
+        self._stop_old_tasks()
+        self._start_new_tasks()
+        if self.completed_at is None and \
+                self.running == self._scenario.desired and \
+                self.old_running + self.old_draining == 0:
+            self.completed_at = self._now
+            self._schedule(
+                self._scenario.steady_state_delay,
+                lambda completed_at=self._now: self._steady_state(
+                    completed_at
+                )
+            )
+
+    def _steady_state(self, completed_at):
+        if self.completed_at == completed_at:
+            self._event('(service app) has reached a steady state.')
+
+    def _stop_old_tasks(self):
+        minimum = int(math.ceil(
+            self._scenario.desired *
+            self._scenario.minimum_healthy_percent / 100.0
+        ))
+        stopping = min(
+            self.old_running, self.running + self.old_running - minimum
+        )
+        if stopping <= 0:
+            return
+        self.old_running -= stopping
+        self.old_draining += stopping
+        self._event(
+            '(service app) has begun draining connections on {} '
+            'tasks.'.format(stopping)
+        )
+        for _ in range(stopping):
+            self._schedule(self._scenario.drain_seconds, self._old_stopped)
+
+    def _start_new_tasks(self):
+        scenario = self._scenario
+        room = min(
+            scenario.desired * scenario.maximum_percent // 100 -
+            self.pending - self.running - self.old_running -
+            self.old_draining,
+            scenario.desired - self.pending - self.running
+        )
+        started = 0
+        while started < room and not self._placement_blocked:
+            if self._rng.random() < scenario.placement_failure_rate:
+                self._placement_failed()
+            else:
+                self._start_task()
+                started += 1
+        if started:
+            self._event('(service app) has started {} tasks: (task '
+                        '...).'.format(started))
+
+    def _placement_failed(self):
+        self._placement_blocked = True
+        self._event(PLACEMENT_FAILURE)
+        self._schedule(self._scenario.placement_retry, self._retry_placement)
+
+    def _retry_placement(self):
+        self._placement_blocked = False
+        self._reconcile()
+
+    def _start_task(self):
+        self.pending += 1
+        self._schedule(
+            self._rng.lognormvariate(
+                math.log(self._scenario.start_median),
+                self._scenario.start_sigma
+            ),
+            self._task_started
+        )
+
+    def _task_started(self):
+        self.pending -= 1
+        self.running += 1
+        if self._rng.random() < self._scenario.crash_rate:
+            self._schedule(
+                self._rng.uniform(*self._scenario.crash_after),
+                self._task_crashed
+            )
+        self._reconcile()
+
+    def _task_crashed(self):
+        self.running -= 1
+        self.completed_at = None
+        self._event('(service app) has stopped 1 running tasks: (task ...).')
+        self._reconcile()
+
+    def _old_stopped(self):
+        self.old_draining -= 1
+        self._event('(service app) has stopped 1 running tasks: (task ...).')
+        self._reconcile()
+
+
+class InlineSideWork:
+    """Runs side work straight away, keeping simulations deterministic."""
+
+    def submit(self, name, function, **kwargs):
+        function(**kwargs)
+
+    def close(self):
+        pass
+
+
+def run_deployment(scenario, policy, seed):
+    """Monitor one simulated deployment, then run it on to the horizon."""
+    started = perf_counter()
+    clock = VirtualClock()
+    service = SimulatedService(scenario, clock, random.Random(seed))
+    retrier = Retrier(clock=clock)
+    monitor = policy.monitor_class(
+        policy.iterator_class(
+            'cluster', 'app', TASKDEF, service, retrier=retrier, clock=clock
+        ),
+        'cluster', service, retrier=retrier, clock=clock,
+        stall_timeout=policy.stall_timeout, side_work=InlineSideWork()
+    )
+    try:
+        monitor.wait()
+        outcome = 'completed'
+    except UserFacingError:
+        outcome = 'failed'
+    detected_at = clock.time()
+    end = detected_at + HORIZON
+    service.advance(end)
+    completed_at = service.completed_at
+    if completed_at is not None and \
+            completed_at + scenario.crash_after[1] > end:
+        # Too close to the horizon to know whether its tasks will crash.
+        completed_at = None
+    return Result(
+        outcome, detected_at, completed_at,
+        sum(service.api_calls.values()), perf_counter() - started
+    )
+
+
+class Report:
+    """How a policy did across the runs of a scenario.
+
+    A false failure is a deployment the monitor failed that went on to
+    complete, a missed failure one it reported as completed that did not
+    stay complete. Completion lag is how long after completing a deployment
+    was reported as completed, failure detection how long a deployment that
+    never completes took to be reported as failed.
+    """
+
+    def __init__(self, scenario, policy, results):
+        self.scenario = scenario.name
+        self.policy = policy.name
+        self.runs = len(results)
+        self.false_failures = sum(
+            result.outcome == 'failed' and result.completed_at is not None
+            for result in results
+        )
+        self.missed_failures = sum(
+            result.outcome == 'completed' and not _stayed_complete(result)
+            for result in results
+        )
+        self.completion_lag = [
+            result.detected_at - result.completed_at
+            for result in results
+            if result.outcome == 'completed' and _stayed_complete(result)
+        ]
+        self.failure_detection = [
+            result.detected_at
+            for result in results if result.completed_at is None
+        ]
+        self.api_calls = _mean([result.api_calls for result in results])
+        self.milliseconds = _mean(
+            [result.seconds * 1000 for result in results]
+        )
+
+    @property
+    def false_failure_rate(self):
+        return self.false_failures / float(self.runs)
+
+    @property
+    def missed_failure_rate(self):
+        return self.missed_failures / float(self.runs)
+
+    def row(self):
+        return [
+            self.scenario, self.policy,
+            '{:.1%}'.format(self.false_failure_rate),
+            '{:.1%}'.format(self.missed_failure_rate),
+            _summary(self.completion_lag), _summary(self.failure_detection),
+            '{:.1f}'.format(self.api_calls),
+            '{:.2f}'.format(self.milliseconds),
+        ]
+
+
+HEADINGS = [
+    'scenario', 'policy', 'false failures', 'missed failures',
+    'completion lag (mean/p95)',
+    'failure detection (mean/p95)', 'API calls', 'ms/run',
+]
+
+
+def simulate(scenarios=SCENARIOS, policies=POLICIES, runs=1000, seed=0):
+    """Run every policy against the same `runs` deployments per scenario."""
+    disabled, logger.disabled = logger.disabled, True
+    try:
+        return [
+            Report(scenario, policy, [
+                run_deployment(scenario, policy, seed + run)
+                for run in range(runs)
+            ])
+            for scenario in scenarios for policy in policies
+        ]
+    finally:
+        logger.disabled = disabled
+
+
+def table(reports):
+    rows = [HEADINGS] + [report.row() for report in reports]
+    widths = [max(len(row[column]) for row in rows) for column in range(
+        len(HEADINGS)
+    )]
+    return [
+        '  '.join(cell.ljust(width) for cell, width in zip(row, widths))
+        .rstrip()
+        for row in rows
+    ]
+
+
+def _stayed_complete(result):
+    return result.completed_at is not None and \
+        result.completed_at <= result.detected_at
+
+
+def _mean(values):
+    return sum(values) / float(len(values)) if values else None
+
+
+def _percentile(values, percent):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, len(ordered) * percent // 100)]
+
+
+def _summary(values):
+    if not values:
+        return '-'
+    return '{:.0f}s/{:.0f}s'.format(_mean(values), _percentile(values, 95))
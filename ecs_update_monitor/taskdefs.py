@@ -0,0 +1,80 @@
+import hashlib
+import json
+import os
+from collections import Counter
+from re import search
+
+from ecs_update_monitor.retry import Retrier
+
+
+class TaskdefCache:
+    """Task definition descriptions, fetched once per ARN.
+
+    A task definition revision never changes once registered, so entries for
+    revisioned ARNs never expire and can optionally be persisted to
+    `directory` for use by later runs.
+    """
+
+    def __init__(self, boto_session, retrier=None, directory=None):
+        self._boto_session = boto_session
+        self._retrier = retrier or Retrier()
+        self._directory = directory
+        self._ecs_client = None
+        self._taskdefs = {}
+        self.api_calls = Counter()
+
+    def get(self, taskdef):
+        if taskdef not in self._taskdefs:
+            self._taskdefs[taskdef] = self._load(taskdef)
+        return self._taskdefs[taskdef]
+
+    def _load(self, taskdef):
+        path = self._path(taskdef)
+        if path is not None and os.path.exists(path):
+            with open(path) as f:
+                return json.load(f)
+        description = self._describe(taskdef)
+        if path is not None:
+            write_atomically(path, description)
+        return description
+
+    def _describe(self, taskdef):
+        self.api_calls['describe_task_definition'] += 1
+        return self._retrier.call(
+            self._ecs.describe_task_definition, taskDefinition=taskdef
+        )['taskDefinition']
+
+    def _path(self, taskdef):
+        if self._directory is None or not _is_immutable(taskdef):
+            return None
+        return os.path.join(self._directory, '{}.json'.format(
+            hashlib.sha1(taskdef.encode('utf-8')).hexdigest()
+        ))
+
+    @property
+    def _ecs(self):
+        if self._ecs_client is None:
+            self._ecs_client = self._boto_session.client('ecs')
+        return self._ecs_client
+
+
+def _is_immutable(taskdef):
+    """Only `family:revision` references always name the same taskdef."""
+    return search(r':\d+$', taskdef) is not None
+
+
+def write_atomically(path, data):
+    directory = os.path.dirname(path)
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    temporary = '{}.{}.tmp'.format(path, os.getpid())
+    with open(temporary, 'w') as f:
+        json.dump(data, f, default=str)
+    os.rename(temporary, path)
+
+
+def key_path(directory, key):
+    """The path in `directory` of the JSON file for a list of strings."""
+    return os.path.join(directory, '{}.json'.format(
+        hashlib.sha1(json.dumps(key).encode('utf-8')).hexdigest()
+    ))
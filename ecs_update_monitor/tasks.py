@@ -0,0 +1,139 @@
+from collections import Counter
+
+from ecs_update_monitor.retry import Retrier
+
+
+DESCRIBE_BATCH_SIZE = 100
+
+
+class TaskState:
+
+    def __init__(self):
+        self.pull_seconds = None
+        self.start_seconds = None
+        self.health = None
+
+
+class TaskStartupTracker:
+    """Reports image pull, start and health transitions of new tasks.
+
+    Tasks started by the deployment are described in batches each poll until
+    they are healthy or have stopped.
+    """
+
+    def __init__(self, cluster, boto_session, retrier=None,
+                 taskdef_cache=None):
+        self._cluster = cluster
+        self._boto_session = boto_session
+        self._retrier = retrier or Retrier()
+        self._taskdefs = taskdef_cache
+        self._ecs_client = None
+        self._tasks = {}
+        self._finished = set()
+        self.api_calls = Counter()
+
+    def poll(self, deployment_id):
+        arns = [
+            arn for arn in list_tasks(
+                self._ecs, self._retrier, self.api_calls, self._cluster,
+                deployment_id
+            )
+            if arn not in self._finished
+        ]
+        messages = []
+        for task in self._describe_tasks(arns):
+            messages.extend(self._update(task))
+        return messages
+
+    def summary(self):
+        pulls = [
+            task.pull_seconds for task in self._tasks.values()
+            if task.pull_seconds is not None
+        ]
+        starts = [
+            task.start_seconds for task in self._tasks.values()
+            if task.start_seconds is not None
+        ]
+        return {
+            'tasks': len(self._tasks),
+            'max_pull_seconds': max(pulls) if pulls else None,
+            'max_start_seconds': max(starts) if starts else None,
+        }
+
+    def _describe_tasks(self, arns):
+        for offset in range(0, len(arns), DESCRIBE_BATCH_SIZE):
+            self.api_calls['describe_tasks'] += 1
+            response = self._retrier.call(
+                self._ecs.describe_tasks,
+                cluster=self._cluster,
+                tasks=arns[offset:offset + DESCRIBE_BATCH_SIZE]
+            )
+            for task in response['tasks']:
+                yield task
+
+    def _update(self, task):
+        state = self._tasks.setdefault(task['taskArn'], TaskState())
+        name = 'task {}'.format(task['taskArn'].split('/')[-1])
+        messages = []
+        if state.pull_seconds is None and task.get('pullStoppedAt'):
+            state.pull_seconds = _seconds(
+                task['pullStartedAt'], task['pullStoppedAt']
+            )
+            messages.append('{}: image pull took {:.1f}s{}'.format(
+                name, state.pull_seconds, self._images(task)
+            ))
+        if state.start_seconds is None and task.get('startedAt'):
+            state.start_seconds = _seconds(
+                task['createdAt'], task['startedAt']
+            )
+            messages.append('{}: started {:.1f}s after it was created'.format(
+                name, state.start_seconds
+            ))
+        messages.extend(self._health_transition(task, state, name))
+        return messages
+
+    def _health_transition(self, task, state, name):
+        health = task.get('healthStatus', 'UNKNOWN')
+        previous, state.health = state.health, health
+        if health == 'HEALTHY' or task.get('lastStatus') == 'STOPPED':
+            self._finished.add(task['taskArn'])
+        if previous is None or previous == health:
+            return []
+        return ['{}: health {} -> {}'.format(name, previous, health)]
+
+    def _images(self, task):
+        if self._taskdefs is None:
+            return ''
+        containers = self._taskdefs.get(
+            task['taskDefinitionArn']
+        ).get('containerDefinitions', [])
+        return ' ({})'.format(
+            ', '.join(container['image'] for container in containers)
+        )
+
+    @property
+    def _ecs(self):
+        if self._ecs_client is None:
+            self._ecs_client = self._boto_session.client('ecs')
+        return self._ecs_client
+
+
+def list_tasks(ecs, retrier, api_calls, cluster, deployment_id):
+    """Return the ARNs of the running tasks started by a deployment."""
+    arns = []
+    kwargs = {
+        'cluster': cluster,
+        'startedBy': deployment_id,
+        'maxResults': DESCRIBE_BATCH_SIZE,
+    }
+    while True:
+        api_calls['list_tasks'] += 1
+        response = retrier.call(ecs.list_tasks, **kwargs)
+        arns.extend(response['taskArns'])
+        if not response.get('nextToken'):
+            return arns
+        kwargs['nextToken'] = response['nextToken']
+
+
+def _seconds(start, end):
+    return (end - start).total_seconds()
@@ -0,0 +1,100 @@
+import json
+from collections import Counter
+
+from ecs_update_monitor.clock import SystemClock
+
+
+# Phases of a rollout, each reached the first time its predicate holds for an
+# event. Tasks can go from pending to running between polls, so a running
+# task also implies the first pending task has been seen.
+PHASES = [
+    ('first_pending', lambda event: event.pending > 0 or event.running > 0),
+    ('first_running', lambda event: event.running > 0),
+    ('reached_desired', lambda event: event.running == event.desired),
+    ('previous_drained', lambda event: event.previous_running == 0),
+]
+
+
+class DeploymentTimeline:
+    """Times are measured from `start`, called when monitoring begins."""
+
+    def __init__(self, clock=None):
+        self._clock = clock or SystemClock()
+        self._start = None
+        self.phases = {}
+        self.polls = 0
+        self.api_calls = Counter()
+        self.failed_tasks = 0
+        self.retries = {}
+        self.task_startup = None
+        self.still_draining = 0
+        self.outcome = None
+        self.error = None
+        self.duration = None
+
+    def start(self):
+        self._start = self._clock.time()
+
+    def record(self, event):
+        elapsed = self._clock.time() - self._start
+        self.polls += 1
+        self.still_draining = event.previous_running
+        for name, reached in PHASES:
+            if name not in self.phases and reached(event):
+                self.phases[name] = elapsed
+
+    def finish(self, outcome, error=None):
+        self.outcome = outcome
+        self.error = error
+        self.duration = self._clock.time() - self._start
+
+    def summary(self):
+        summary = {
+            'outcome': self.outcome,
+            'error': self.error,
+            'duration': self.duration,
+            'phases': {
+                name: self.phases.get(name) for name, _ in PHASES
+            },
+            'polls': self.polls,
+            'api_calls': dict(self.api_calls),
+            'failed_tasks': self.failed_tasks,
+            'retries': self.retries,
+        }
+        if self.task_startup is not None:
+            summary['task_startup'] = self.task_startup
+        if self.still_draining:
+            summary['still_draining'] = self.still_draining
+        return summary
+
+    def lines(self):
+        summary = self.summary()
+        yield 'deployment {} after {:.1f}s ({} polls, {} API calls, ' \
+            '{} retries, {} failed tasks)'.format(
+                summary['outcome'], summary['duration'], summary['polls'],
+                sum(summary['api_calls'].values()),
+                summary['retries'].get('retries', 0), summary['failed_tasks']
+            )
+        for name, elapsed in summary['phases'].items():
+            yield '  {}: {}'.format(
+                name.replace('_', ' '),
+                'not reached' if elapsed is None else '{:.1f}s'.format(
+                    elapsed
+                )
+            )
+        if self.still_draining:
+            yield '  {} task(s) of the previous deployment still ' \
+                'draining'.format(self.still_draining)
+        if self.task_startup is not None:
+            yield '  slowest image pull: {}, slowest task start: {}'.format(
+                _seconds(self.task_startup['max_pull_seconds']),
+                _seconds(self.task_startup['max_start_seconds'])
+            )
+
+    def write(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.summary(), f, indent=2, sort_keys=True)
+
+
+def _seconds(seconds):
+    return 'unknown' if seconds is None else '{:.1f}s'.format(seconds)
@@ -0,0 +1,97 @@
+import cProfile
+import json
+import os
+import threading
+from contextlib import contextmanager, ExitStack
+from time import perf_counter
+
+
+class Tracer:
+    """Records timed spans and writes them as Chrome trace-event JSON.
+
+    Spans and events are also forwarded to any backends added with
+    `add_backend` (e.g. OpenTelemetry). Until `enable` is called or a
+    backend is added, spans cost nothing beyond the context manager itself.
+    """
+
+    def __init__(self):
+        self._spans = None
+        self._origin = None
+        self._profiler = None
+        self._backends = []
+
+    def enable(self, profile=False):
+        self._spans = []
+        self._origin = perf_counter()
+        self._profiler = cProfile.Profile() if profile else None
+
+    def add_backend(self, backend):
+        self._backends.append(backend)
+
+    @property
+    def enabled(self):
+        return self._spans is not None or bool(self._backends)
+
+    @contextmanager
+    def span(self, name, cpu=False, **args):
+        with ExitStack() as stack:
+            for backend in self._backends:
+                stack.enter_context(backend.span(name, **args))
+            with self._chrome_span(name, cpu, args):
+                yield
+
+    def event(self, name, **args):
+        for backend in self._backends:
+            backend.event(name, **args)
+        if self._spans is not None:
+            self._spans.append(dict(
+                self._trace_event(name, perf_counter(), args),
+                ph='i', s='t'
+            ))
+
+    def write(self, trace_file=None, profile_file=None):
+        if trace_file is not None and self._spans is not None:
+            with open(trace_file, 'w') as f:
+                json.dump({
+                    'traceEvents': self._spans,
+                    'displayTimeUnit': 'ms',
+                }, f)
+        if profile_file is not None and self._profiler is not None:
+            self._profiler.dump_stats(profile_file)
+
+    def close(self):
+        for backend in self._backends:
+            backend.close()
+
+    @contextmanager
+    def _chrome_span(self, name, cpu, args):
+        if self._spans is None:
+            yield
+            return
+        profiler = self._profiler if cpu else None
+        start = perf_counter()
+        if profiler is not None:
+            profiler.enable()
+        try:
+            yield
+        finally:
+            if profiler is not None:
+                profiler.disable()
+            end = perf_counter()
+            self._spans.append(dict(
+                self._trace_event(name, start, args),
+                ph='X', dur=(end - start) * 1e6
+            ))
+
+    def _trace_event(self, name, start, args):
+        return {
+            'name': name,
+            'cat': 'ecs_update_monitor',
+            'ts': (start - self._origin) * 1e6,
+            'pid': os.getpid(),
+            'tid': threading.current_thread().ident,
+            'args': {key: str(value) for key, value in args.items()},
+        }
+
+
+tracer = Tracer()
@@ -0,0 +1,254 @@
+from array import array
+from collections import namedtuple
+
+from ecs_update_monitor import (
+    deploy_in_progress, ECSMonitor, get_previous_running_count,
+    get_primary_deployment, MAX_FAILURES
+)
+from ecs_update_monitor.clock import SystemClock
+from ecs_update_monitor.logger import logger
+
+
+IN_PROGRESS = 'in progress'
+DONE = 'done'
+FAILING = 'failing'
+
+FLAPPING = 'flapping'
+STUCK = 'stuck'
+TASKDEF_DRIFT = 'taskdef drift'
+
+_REPORTED_FLAPPING = 1
+_REPORTED_STUCK = 2
+
+COLUMNS = (
+    'running', 'pending', 'desired', 'previous', 'last_running',
+    'failed', 'in_progress_ticks', 'reported',
+)
+
+
+Report = namedtuple('Report', ['service', 'kind', 'detail'])
+
+
+class ServiceTable:
+    """Per-service watch state held column-wise in parallel arrays.
+
+    Each service is assigned a slot (a row index into every column). Slots of
+    services that disappear from the cluster are reused, so memory is bounded
+    by the largest number of services seen at once.
+    """
+
+    def __init__(self):
+        self._slots = {}
+        self._free = []
+        self.names = []
+        self.taskdefs = []
+        self.columns = {name: array('l') for name in COLUMNS}
+
+    def __len__(self):
+        return len(self._slots)
+
+    def __contains__(self, name):
+        return name in self._slots
+
+    def slot(self, name, taskdef):
+        if name not in self._slots:
+            self._slots[name] = self._allocate(name, taskdef)
+        return self._slots[name]
+
+    def release(self, name):
+        slot = self._slots.pop(name)
+        self.names[slot] = None
+        self.taskdefs[slot] = None
+        self._free.append(slot)
+
+    def update(self, slot, running, pending, desired, previous):
+        columns = self.columns
+        columns['last_running'][slot] = columns['running'][slot]
+        columns['running'][slot] = running
+        columns['pending'][slot] = pending
+        columns['desired'][slot] = desired
+        columns['previous'][slot] = previous
+
+    def evaluate(self, tick_limit):
+        """Advance the failure and tick counters and return each slot's state.
+
+        Evaluates every slot in one pass over the columns.
+        """
+        columns = self.columns
+        in_progress = [
+            deploy_in_progress(running, desired, previous)
+            for running, desired, previous in zip(
+                columns['running'], columns['desired'], columns['previous']
+            )
+        ]
+        columns['failed'] = array('l', (
+            failed + max(0, last_running - running) if active else 0
+            for failed, last_running, running, active in zip(
+                columns['failed'], columns['last_running'],
+                columns['running'], in_progress
+            )
+        ))
+        columns['in_progress_ticks'] = array('l', (
+            ticks + 1 if active else 0
+            for ticks, active in zip(
+                columns['in_progress_ticks'], in_progress
+            )
+        ))
+        return [
+            _state(name, active, failed, ticks, tick_limit)
+            for name, active, failed, ticks in zip(
+                self.names, in_progress, columns['failed'],
+                columns['in_progress_ticks']
+            )
+        ]
+
+    def _allocate(self, name, taskdef):
+        if not self._free:
+            self.names.append(name)
+            self.taskdefs.append(taskdef)
+            for column in self.columns.values():
+                column.append(0)
+            return len(self.names) - 1
+        slot = self._free.pop()
+        self.names[slot] = name
+        self.taskdefs[slot] = taskdef
+        for column in self.columns.values():
+            column[slot] = 0
+        return slot
+
+
+def _state(name, active, failed, ticks, tick_limit):
+    if name is None:
+        return None
+    if failed >= MAX_FAILURES or ticks > tick_limit:
+        return FAILING
+    return IN_PROGRESS if active else DONE
+
+
+class ClusterWatcher:
+
+    _INTERVAL = 15
+    _LIST_PAGE_SIZE = 100
+    _DESCRIBE_BATCH_SIZE = 10
+
+    def __init__(self, cluster, boto_session, clock=None):
+        self._cluster = cluster
+        self._boto_session = boto_session
+        self._clock = clock or SystemClock()
+        self._ecs_client = None
+        self._table = ServiceTable()
+        self.states = {}
+
+    def watch(self, ticks=None):
+        count = 0
+        while ticks is None or count < ticks:
+            if count:
+                self._clock.sleep(self._INTERVAL)
+            for report in self.tick():
+                logger.info('{}: {} - {}'.format(*report))
+            count += 1
+
+    def tick(self):
+        services = self._describe_all_services()
+        for name in set(self._table.names) - set(services) - {None}:
+            self._table.release(name)
+        reports = self._update(services)
+        tick_limit = ECSMonitor._TIMEOUT // self._INTERVAL
+        states = self._table.evaluate(tick_limit)
+        self.states = {
+            name: state
+            for name, state in zip(self._table.names, states)
+            if name is not None
+        }
+        return reports + self._failure_reports(states, tick_limit)
+
+    @property
+    def _ecs(self):
+        if self._ecs_client is None:
+            self._ecs_client = self._boto_session.client('ecs')
+        return self._ecs_client
+
+    def _list_service_arns(self):
+        arns = []
+        kwargs = {'cluster': self._cluster, 'maxResults': self._LIST_PAGE_SIZE}
+        while True:
+            response = self._ecs.list_services(**kwargs)
+            arns.extend(response['serviceArns'])
+            if not response.get('nextToken'):
+                return arns
+            kwargs['nextToken'] = response['nextToken']
+
+    def _describe_all_services(self):
+        arns = self._list_service_arns()
+        services = {}
+        for offset in range(0, len(arns), self._DESCRIBE_BATCH_SIZE):
+            response = self._ecs.describe_services(
+                cluster=self._cluster,
+                services=arns[offset:offset + self._DESCRIBE_BATCH_SIZE]
+            )
+            services.update(
+                (service['serviceName'], service)
+                for service in response['services']
+            )
+        return services
+
+    def _update(self, services):
+        reports = []
+        for name, service in services.items():
+            deployments = service['deployments']
+            primary = get_primary_deployment(deployments)
+            reports.extend(self._check_drift(name, primary['taskDefinition']))
+            self._table.update(
+                self._table.slot(name, primary['taskDefinition']),
+                primary['runningCount'], primary['pendingCount'],
+                primary['desiredCount'],
+                get_previous_running_count(deployments)
+            )
+        return reports
+
+    def _check_drift(self, name, taskdef):
+        if name not in self._table:
+            return []
+        slot = self._table.slot(name, taskdef)
+        previous_taskdef = self._table.taskdefs[slot]
+        if previous_taskdef == taskdef:
+            return []
+        self._table.taskdefs[slot] = taskdef
+        self._table.columns['reported'][slot] = 0
+        return [Report(name, TASKDEF_DRIFT, '{} -> {}'.format(
+            previous_taskdef, taskdef
+        ))]
+
+    def _failure_reports(self, states, tick_limit):
+        columns = self._table.columns
+        reports = []
+        for slot, state in enumerate(states):
+            if state != FAILING:
+                columns['reported'][slot] = 0
+                continue
+            reports.extend(self._report_failure(slot, tick_limit))
+        return reports
+
+    def _report_failure(self, slot, tick_limit):
+        columns = self._table.columns
+        name = self._table.names[slot]
+        reports = []
+        if columns['failed'][slot] >= MAX_FAILURES and \
+                not columns['reported'][slot] & _REPORTED_FLAPPING:
+            columns['reported'][slot] |= _REPORTED_FLAPPING
+            reports.append(Report(name, FLAPPING, '{} tasks failed'.format(
+                columns['failed'][slot]
+            )))
+        if columns['in_progress_ticks'][slot] > tick_limit and \
+                not columns['reported'][slot] & _REPORTED_STUCK:
+            columns['reported'][slot] |= _REPORTED_STUCK
+            reports.append(Report(name, STUCK, _stuck_detail(columns, slot)))
+        return reports
+
+
+def _stuck_detail(columns, slot):
+    return 'in progress for {} ticks - running: {} desired: {} ' \
+        'previous: {}'.format(
+            columns['in_progress_ticks'][slot], columns['running'][slot],
+            columns['desired'][slot], columns['previous'][slot]
+        )
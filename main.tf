@@ -13,6 +13,48 @@ variable "taskdef" {
   type        = "string"
 }
 
+variable "wait_for_drain" {
+  description = "Set to \"false\" to finish once the new tasks are running, without waiting for the previous deployment's tasks to drain."
+  type        = "string"
+  default     = "true"
+}
+
+variable "discovery_health" {
+  description = "Set to \"true\" to complete once the new tasks are healthy in their Cloud Map service registries."
+  type        = "string"
+  default     = "false"
+}
+
+variable "rollback" {
+  description = "Set to \"true\" to update the service back to the previous task definition if the deployment fails."
+  type        = "string"
+  default     = "false"
+}
+
+variable "bake_alarms" {
+  description = "CloudWatch alarms that must not fire during a bake period after the deployment completes."
+  type        = "list"
+  default     = []
+}
+
+variable "bake_seconds" {
+  description = "Maximum length of the bake period."
+  type        = "string"
+  default     = "600"
+}
+
+variable "checkpoint_dir" {
+  description = "Directory to save the monitor's progress in, so that a re-apply after an interrupted run resumes it."
+  type        = "string"
+  default     = ""
+}
+
+variable "completion_cache_dir" {
+  description = "Directory to record completed deployments in, so that re-applies for an already completed deployment finish straight away."
+  type        = "string"
+  default     = ""
+}
+
 data "aws_region" "current" {
 }
 
@@ -28,6 +70,6 @@ resource "null_resource" "ecs_update_monitor" {
   }
 
   provisioner "local-exec" {
-    command = "${path.module}/provision.sh '${path.module}' '${var.cluster}' '${var.service}' '${var.taskdef}' '${data.aws_region.current.name}' '${data.aws_caller_identity.current.arn}'"
+    command = "${path.module}/provision.sh '${path.module}' '${var.cluster}' '${var.service}' '${var.taskdef}' '${data.aws_region.current.name}' '${data.aws_caller_identity.current.arn}' ${var.wait_for_drain == "true" ? "" : "--no-wait-for-drain"} ${var.discovery_health == "true" ? "--discovery-health" : ""} ${var.rollback == "true" ? "--rollback" : ""} --bake-seconds '${var.bake_seconds}' ${join(" ", formatlist("--bake-alarm '%s'", var.bake_alarms))} ${var.checkpoint_dir == "" ? "" : "--checkpoint-dir '${var.checkpoint_dir}'"} ${var.completion_cache_dir == "" ? "" : "--completion-cache-dir '${var.completion_cache_dir}'"}"
   }
 }
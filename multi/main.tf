@@ -0,0 +1,48 @@
+variable "cluster" {
+  description = "The ECS cluster that the services are deployed to."
+  type        = "string"
+}
+
+variable "services" {
+  description = "Map of ECS service name to the task definition ARN that the service is being updated to."
+  type        = "map"
+}
+
+data "aws_region" "current" {
+}
+
+data "aws_caller_identity" "current" {}
+
+locals {
+  service_names = "${sort(keys(var.services))}"
+  manifest      = "${path.module}/.manifest-${md5(var.cluster)}"
+}
+
+# One cheap resource per service records the services whose taskdef changed
+# in the manifest, so that only those are waited on.
+resource "null_resource" "ecs_service_update" {
+  count = "${length(local.service_names)}"
+
+  triggers {
+    cluster = "${var.cluster}"
+    service = "${element(local.service_names, count.index)}"
+    taskdef = "${lookup(var.services, element(local.service_names, count.index))}"
+  }
+
+  provisioner "local-exec" {
+    command = "echo '${element(local.service_names, count.index)} ${lookup(var.services, element(local.service_names, count.index))}' >> '${local.manifest}'"
+  }
+}
+
+resource "null_resource" "ecs_update_monitor" {
+  triggers {
+    cluster         = "${var.cluster}"
+    service_updates = "${join(",", null_resource.ecs_service_update.*.id)}"
+    caller_arn      = "${data.aws_caller_identity.current.arn}"
+    region          = "${data.aws_region.current.name}"
+  }
+
+  provisioner "local-exec" {
+    command = "${path.module}/provision.sh '${path.module}/..' '${var.cluster}' '${local.manifest}' '${data.aws_region.current.name}' '${data.aws_caller_identity.current.arn}'"
+  }
+}
@@ -0,0 +1,26 @@
+#!/bin/sh
+
+set -e
+
+if [ "$#" != "5" ]; then
+    echo 'Usage: provision.sh <package-root> <cluster> <manifest> <region> <caller-arn>' >&2
+    exit 1
+fi
+
+manifest="$(cd "$(dirname "$3")" && pwd)/$(basename "$3")"
+
+if [ ! -f "$manifest" ]; then
+    echo 'no service deployments to wait for' >&2
+    exit 0
+fi
+
+cd "$1"
+
+python -m ecs_update_monitor multi --cluster    "$2" \
+                                   --manifest   "$manifest" \
+                                   --region     "$4" \
+                                   --caller-arn "$5"
+
+# only consumed once every deployment has completed, so that a failed run is
+# waited on again when terraform retries it
+rm -f "$manifest"
@@ -2,15 +2,22 @@
 
 set -e
 
-if [ "$#" != "6" ]; then
-    echo 'Usage: provision.sh <module-root> <cluster> <service> <taskdef> <region> <caller-arn>' >&2
+if [ "$#" -lt "6" ]; then
+    echo 'Usage: provision.sh <module-root> <cluster> <service> <taskdef> <region> <caller-arn> [<option>...]' >&2
     exit 1
 fi
 
 cd "$1"
+cluster=$2
+service=$3
+taskdef=$4
+region=$5
+caller_arn=$6
+shift 6
 
-python -m ecs_update_monitor --cluster    "$2" \
-                             --service    "$3" \
-                             --taskdef    "$4" \
-                             --region     "$5" \
-                             --caller-arn "$6"
+python -m ecs_update_monitor --cluster    "$cluster" \
+                             --service    "$service" \
+                             --taskdef    "$taskdef" \
+                             --region     "$region" \
+                             --caller-arn "$caller_arn" \
+                             "$@"
@@ -0,0 +1,90 @@
+# Builders for ECS API responses and a fake ECS client, shared by the tests.
+import datetime
+import shutil
+import tempfile
+import unittest
+
+from mock import Mock
+
+
+def deployment(taskdef, running, pending=0, desired=2, status='PRIMARY'):
+    return {
+        'id': 'ecs-svc/{}'.format(taskdef),
+        'status': status,
+        'taskDefinition': taskdef,
+        'runningCount': running,
+        'pendingCount': pending,
+        'desiredCount': desired,
+        'createdAt': datetime.datetime(
+            2017, 1, 6 if status == 'PRIMARY' else 5
+        ),
+    }
+
+
+def service(name, taskdef, running, desired=2, previous=0, pending=None,
+            previous_taskdef='old'):
+    """A service updated to `taskdef`, with `running` of the `desired` new
+    tasks running (the rest pending) and `previous` tasks of the previous
+    deployment still running."""
+    if pending is None:
+        pending = desired - running
+    deployments = [deployment(taskdef, running, pending, desired)]
+    if previous:
+        deployments.append(deployment(
+            previous_taskdef, previous, desired=desired, status='ACTIVE'
+        ))
+    return {'serviceName': name, 'deployments': deployments}
+
+
+def service_data(service, events=(), **fields):
+    """A `describe_services` response for one service."""
+    return {'services': [dict(service, events=list(events), **fields)]}
+
+
+def session_for(client):
+    boto_session = Mock()
+    boto_session.client.return_value = client
+    return boto_session
+
+
+class FakeECS:
+    """ECS client for the services of a cluster, keyed by name.
+
+    Services are listed as ARNs, a page at a time, and `describe_calls`
+    records the services asked for in each `describe_services` call.
+    """
+
+    def __init__(self, services=None):
+        self.services = services or {}
+        self.list_calls = 0
+        self.describe_calls = []
+
+    def list_services(self, cluster, maxResults, nextToken=None):
+        self.list_calls += 1
+        names = sorted(self.services)
+        offset = int(nextToken or 0)
+        response = {'serviceArns': [
+            'arn:aws:ecs:eu-west-1:123:service/{}/{}'.format(cluster, name)
+            for name in names[offset:offset + maxResults]
+        ]}
+        if offset + maxResults < len(names):
+            response['nextToken'] = str(offset + maxResults)
+        return response
+
+    def describe_services(self, cluster, services):
+        self.describe_calls.append(list(services))
+        return {'services': [
+            self.describe(service.rsplit('/', 1)[-1]) for service in services
+        ]}
+
+    def describe(self, name):
+        return self.services[name]
+
+
+class TempDirTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
@@ -0,0 +1,122 @@
+import unittest
+
+from mock import Mock
+
+from ecs_update_monitor import UserFacingError
+from ecs_update_monitor.bake import AlarmError, Bake
+from ecs_update_monitor.clock import VirtualClock
+
+
+def metric_alarm(name, state='OK'):
+    return {
+        'AlarmName': name,
+        'StateValue': state,
+        'StateReason': 'Threshold Crossed' if state == 'ALARM' else 'ok',
+        'Namespace': 'AWS/ApplicationELB',
+        'MetricName': 'HTTPCode_Target_5XX_Count',
+        'Dimensions': [{'Name': 'LoadBalancer', 'Value': 'app/lb/1'}],
+        'Period': 60,
+        'Statistic': 'Sum',
+        'ComparisonOperator': 'GreaterThanThreshold',
+        'Threshold': 10.0,
+    }
+
+
+class TestBake(unittest.TestCase):
+
+    def setUp(self):
+        self.cloudwatch = Mock()
+        self.boto_session = Mock()
+        self.boto_session.client.return_value = self.cloudwatch
+        self.clock = VirtualClock()
+
+    def bake(self, alarm_names, duration=600):
+        return Bake(
+            alarm_names, self.boto_session, duration, clock=self.clock
+        )
+
+    def test_passes_early_once_enough_clean_datapoints(self):
+        # Given
+        self.cloudwatch.describe_alarms.return_value = {
+            'MetricAlarms': [metric_alarm('5xx'), metric_alarm('latency')],
+            'CompositeAlarms': [],
+        }
+        self.cloudwatch.get_metric_data.side_effect = [
+            {'MetricDataResults': [
+                {'Id': 'm0', 'Values': []}, {'Id': 'm1', 'Values': []},
+            ]},
+            {'MetricDataResults': [
+                {'Id': 'm0', 'Values': [0, 2, 11]},
+                {'Id': 'm1', 'Values': [1, 1, 1]},
+            ]},
+            {'MetricDataResults': [
+                {'Id': 'm0', 'Values': [0, 2, 11, 3]},
+                {'Id': 'm1', 'Values': [1, 1, 1, 1]},
+            ]},
+        ]
+        bake = self.bake(['latency', '5xx'])
+
+        # When
+        with self.assertLogs('ecs_update_monitor.logger') as logs:
+            bake.wait()
+
+        # Then
+        assert self.clock.time() == 120
+        assert logs.output[-1] == 'INFO:ecs_update_monitor.logger:bake ' \
+            'passed after 120s (3 polls, 6 API calls)'
+        self.cloudwatch.describe_alarms.assert_called_with(
+            AlarmNames=['5xx', 'latency'],
+            AlarmTypes=['MetricAlarm', 'CompositeAlarm']
+        )
+        query = self.cloudwatch.get_metric_data.call_args[1][
+            'MetricDataQueries'
+        ][0]
+        assert query['MetricStat']['Stat'] == 'Sum'
+        assert query['MetricStat']['Metric']['MetricName'] == \
+            'HTTPCode_Target_5XX_Count'
+
+    def test_fails_when_an_alarm_fires(self):
+        # Given
+        self.cloudwatch.describe_alarms.side_effect = [
+            {'MetricAlarms': [metric_alarm('5xx')], 'CompositeAlarms': []},
+            {
+                'MetricAlarms': [metric_alarm('5xx', 'ALARM')],
+                'CompositeAlarms': [],
+            },
+        ]
+        self.cloudwatch.get_metric_data.return_value = {
+            'MetricDataResults': [{'Id': 'm0', 'Values': []}]
+        }
+
+        # When
+        with self.assertRaises(AlarmError) as error, \
+                self.assertLogs('ecs_update_monitor.logger'):
+            self.bake(['5xx']).wait()
+
+        # Then
+        assert str(error.exception) == 'Deployment failed - alarm(s) fired ' \
+            'during the bake: 5xx (Threshold Crossed)'
+        assert self.clock.time() == 60
+
+    def test_composite_alarms_baked_for_the_whole_duration(self):
+        self.cloudwatch.describe_alarms.return_value = {
+            'MetricAlarms': [],
+            'CompositeAlarms': [{'AlarmName': 'service', 'StateValue': 'OK'}],
+        }
+
+        with self.assertLogs('ecs_update_monitor.logger'):
+            self.bake(['service'], duration=150).wait()
+
+        assert self.clock.sleeps == [60, 60, 30]
+        self.cloudwatch.get_metric_data.assert_not_called()
+
+    def test_missing_alarm_rejected(self):
+        self.cloudwatch.describe_alarms.return_value = {
+            'MetricAlarms': [metric_alarm('5xx')], 'CompositeAlarms': [],
+        }
+
+        with self.assertRaises(UserFacingError) as error, \
+                self.assertLogs('ecs_update_monitor.logger'):
+            self.bake(['5xx', 'typo']).wait()
+
+        assert str(error.exception) == 'bake alarm(s) not found: typo'
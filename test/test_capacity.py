@@ -0,0 +1,186 @@
+import datetime
+import unittest
+
+from boto3 import Session
+from mock import MagicMock, Mock
+
+from ecs_update_monitor import ECSEventIterator
+from ecs_update_monitor.capacity import CapacityIndex, task_resources
+from ecs_update_monitor.clock import VirtualClock
+
+
+def container_instance(remaining_cpu, remaining_memory,
+                       registered_cpu=1024, registered_memory=4096):
+    return {
+        'remainingResources': [
+            {'name': 'CPU', 'type': 'INTEGER',
+             'integerValue': remaining_cpu},
+            {'name': 'MEMORY', 'type': 'INTEGER',
+             'integerValue': remaining_memory},
+            {'name': 'PORTS', 'type': 'STRINGSET',
+             'stringSetValue': ['22']},
+        ],
+        'registeredResources': [
+            {'name': 'CPU', 'type': 'INTEGER',
+             'integerValue': registered_cpu},
+            {'name': 'MEMORY', 'type': 'INTEGER',
+             'integerValue': registered_memory},
+        ],
+    }
+
+
+def ecs_client_with_instances(instances, cpu=256, memory=1024):
+    ecs_client = Mock()
+    arns = ['arn-{}'.format(i) for i in range(len(instances))]
+    by_arn = dict(zip(arns, instances))
+
+    def list_container_instances(**kwargs):
+        offset = int(kwargs.get('nextToken', 0))
+        page = arns[offset:offset + kwargs['maxResults']]
+        response = {'containerInstanceArns': page}
+        if offset + len(page) < len(arns):
+            response['nextToken'] = str(offset + len(page))
+        return response
+
+    ecs_client.list_container_instances.side_effect = \
+        list_container_instances
+    ecs_client.describe_container_instances.side_effect = \
+        lambda cluster, containerInstances: {
+            'containerInstances': [
+                by_arn[arn] for arn in containerInstances
+            ]
+        }
+    ecs_client.describe_task_definition.return_value = {
+        'taskDefinition': {
+            'containerDefinitions': [
+                {'name': 'app', 'cpu': cpu, 'memoryReservation': memory},
+            ],
+        }
+    }
+    return ecs_client
+
+
+class TestCapacityIndex(unittest.TestCase):
+
+    def test_container_instances_described_in_batches_of_100(self):
+        ecs_client = ecs_client_with_instances(
+            [container_instance(1024, 4096)] * 250
+        )
+        boto_session = Mock()
+        boto_session.client.return_value = ecs_client
+
+        instances = CapacityIndex(boto_session).instances('cluster')
+
+        assert len(instances) == 250
+        assert ecs_client.list_container_instances.call_count == 3
+        assert [
+            len(call[1]['containerInstances'])
+            for call in ecs_client.describe_container_instances.call_args_list
+        ] == [100, 100, 50]
+
+    def test_instances_cached_per_cluster_until_ttl_expires(self):
+        ecs_client = ecs_client_with_instances(
+            [container_instance(1024, 4096)]
+        )
+        boto_session = Mock()
+        boto_session.client.return_value = ecs_client
+        clock = VirtualClock(start=1000)
+        capacity_index = CapacityIndex(boto_session, clock=clock)
+
+        capacity_index.instances('cluster')
+        clock.advance(10)
+        capacity_index.instances('cluster')
+        capacity_index.instances('other-cluster')
+        clock.advance(21)
+        capacity_index.instances('cluster')
+
+        assert ecs_client.list_container_instances.call_count == 3
+
+    def test_forecast_reports_missing_instances(self):
+        ecs_client = ecs_client_with_instances([
+            container_instance(512, 8192),
+            container_instance(256, 512),
+        ])
+        boto_session = Mock()
+        boto_session.client.return_value = ecs_client
+
+        forecast = CapacityIndex(boto_session).forecast(
+            'cluster', 'taskdef', desired=6, maximum_percent=200,
+            placed=0, previous_running=0
+        )
+
+        assert forecast.tasks_to_place == 6
+        assert forecast.tasks_that_fit == 2
+        assert forecast.missing_instances == 1
+
+    def test_forecast_respects_maximum_percent(self):
+        ecs_client = ecs_client_with_instances([
+            container_instance(256, 1024),
+        ])
+        boto_session = Mock()
+        boto_session.client.return_value = ecs_client
+
+        forecast = CapacityIndex(boto_session).forecast(
+            'cluster', 'taskdef', desired=4, maximum_percent=125,
+            placed=0, previous_running=4
+        )
+
+        assert forecast.tasks_to_place == 1
+        assert forecast.missing_instances == 0
+
+    def test_task_level_resources_take_precedence(self):
+        assert task_resources({
+            'cpu': '512',
+            'memory': '2048',
+            'containerDefinitions': [{'cpu': 10, 'memory': 20}],
+        }) == (512, 2048)
+        assert task_resources({
+            'containerDefinitions': [
+                {'cpu': 10, 'memory': 20},
+                {'memoryReservation': 30, 'memory': 100},
+            ],
+        }) == (10, 50)
+
+
+class TestECSEventIteratorCapacity(unittest.TestCase):
+
+    def test_new_instance_signalled_before_first_placement_failure(self):
+        ecs_client = ecs_client_with_instances([
+            container_instance(256, 1024),
+        ])
+        ecs_client.describe_services.return_value = {
+            'services': [
+                {
+                    'deployments': [
+                        {
+                            'desiredCount': 3,
+                            'createdAt': datetime.datetime(2017, 1, 6),
+                            'id': 'ecs-svc/9223370553143707624',
+                            'runningCount': 0,
+                            'pendingCount': 0,
+                            'status': 'PRIMARY',
+                            'taskDefinition': 'taskdef',
+                        }
+                    ],
+                    'deploymentConfiguration': {'maximumPercent': 200},
+                    'status': 'ACTIVE',
+                }
+            ]
+        }
+        boto_session = MagicMock(spec=Session)
+        boto_session.client.return_value = ecs_client
+        events = ECSEventIterator(
+            'cluster', 'service', 'taskdef', boto_session,
+            capacity_index=CapacityIndex(boto_session)
+        )
+
+        first, second = next(events), next(events)
+
+        assert first.new_instance
+        assert first.messages == [
+            'capacity forecast: deployment needs to place 3 task(s) but '
+            'the cluster only has room for 1 - 1 container instance(s) '
+            'are missing'
+        ]
+        assert not second.new_instance
+        assert ecs_client.describe_task_definition.call_count == 1
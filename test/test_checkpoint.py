@@ -0,0 +1,146 @@
+import datetime
+import os
+
+from botocore.exceptions import ClientError
+from mock import Mock
+
+from ecs_update_monitor import ECSEventIterator, ECSMonitor, TimeoutError
+from ecs_update_monitor.checkpoint import Checkpoint
+from ecs_update_monitor.clock import VirtualClock
+from fakes import service, service_data, session_for, TempDirTestCase
+
+
+def draining(running, previous, event_ids):
+    return service_data(
+        service(
+            'service', 'taskdef', running, previous=previous, pending=0
+        ),
+        events=[
+            {
+                'id': event_id,
+                'createdAt': datetime.datetime(2017, 1, 6, 0, int(event_id)),
+                'message': 'event {}'.format(event_id),
+            }
+            for event_id in event_ids
+        ]
+    )
+
+
+class TestCheckpoint(TempDirTestCase):
+
+    def setUp(self):
+        super(TestCheckpoint, self).setUp()
+        self.now = 1000
+
+    def monitor(self, responses):
+        ecs_client = Mock()
+        ecs_client.describe_services.side_effect = responses
+        boto_session = session_for(ecs_client)
+        checkpoint = Checkpoint(
+            self.directory, 'cluster', 'service', 'taskdef',
+            now=lambda: self.now
+        )
+        clock = VirtualClock(start=5000)
+        return ECSMonitor(
+            ECSEventIterator(
+                'cluster', 'service', 'taskdef', boto_session, clock=clock,
+                checkpoint=checkpoint
+            ),
+            'cluster', boto_session, clock=clock, checkpoint=checkpoint
+        )
+
+    def test_interrupted_run_resumed(self):
+        # Given
+        interrupted = self.monitor([
+            draining(1, 2, ['1']),
+            draining(0, 2, ['2', '1']),
+            KeyboardInterrupt(),
+        ])
+        with self.assertRaises(KeyboardInterrupt):
+            interrupted.wait()
+        resumed = self.monitor([
+            draining(1, 2, ['2', '1']),
+            draining(2, 0, ['3', '2', '1']),
+        ])
+
+        self.now = 1100
+
+        # When
+        with self.assertLogs('ecs_update_monitor.logger') as logs:
+            resumed.wait()
+
+        # Then
+        messages = [record.getMessage() for record in logs.records]
+        assert 'resuming after 115s from checkpoint' in messages
+        assert 'event 3' in messages
+        assert 'event 1' not in messages and 'event 2' not in messages
+        assert resumed._failed_count == 1
+        assert os.listdir(self.directory) == []
+
+    def test_checkpoint_kept_after_unexpected_error(self):
+        # Given
+        error = ClientError(
+            {'Error': {'Code': 'AccessDeniedException', 'Message': 'no'}},
+            'DescribeServices'
+        )
+        monitor = self.monitor([draining(1, 2, ['1']), error])
+
+        # When
+        with self.assertLogs('ecs_update_monitor.logger'), \
+                self.assertRaises(ClientError):
+            monitor.wait()
+
+        # Then
+        assert len(os.listdir(self.directory)) == 1
+
+    def test_checkpoint_removed_after_deployment_fails(self):
+        # Given
+        monitor = self.monitor([draining(1, 2, ['1'])] * 100)
+        monitor._TIMEOUT = 60
+
+        # When
+        with self.assertLogs('ecs_update_monitor.logger'), \
+                self.assertRaises(TimeoutError):
+            monitor.wait()
+
+        # Then
+        assert os.listdir(self.directory) == []
+
+    def test_other_deployment_not_resumed(self):
+        checkpoint = Checkpoint(
+            self.directory, 'cluster', 'service', 'taskdef'
+        )
+        checkpoint.resume('ecs-svc/1')
+        checkpoint.update('monitor', {'elapsed': 100})
+        checkpoint.write()
+
+        other = Checkpoint(self.directory, 'cluster', 'service', 'taskdef')
+
+        assert other.resume('ecs-svc/2') == {}
+        assert not other.resumed
+
+    def test_corrupt_checkpoint_ignored(self):
+        # Given
+        checkpoint = Checkpoint(
+            self.directory, 'cluster', 'service', 'taskdef'
+        )
+        checkpoint.resume('ecs-svc/taskdef')
+        checkpoint.update('monitor', {'elapsed': 100})
+        checkpoint.write()
+        path, = os.listdir(self.directory)
+        with open(os.path.join(self.directory, path), 'r+') as f:
+            f.truncate(20)
+        monitor = self.monitor([draining(2, 0, ['1'])])
+
+        # When
+        with self.assertLogs('ecs_update_monitor.logger') as logs:
+            monitor.wait()
+
+        # Then
+        messages = [record.getMessage() for record in logs.records]
+        assert any(
+            message.startswith('ignoring unreadable checkpoint')
+            for message in messages
+        )
+        assert not any(message.startswith('resuming') for message in messages)
+        assert os.listdir(self.directory) == []
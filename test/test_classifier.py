@@ -0,0 +1,134 @@
+import unittest
+
+from mock import Mock
+
+from ecs_update_monitor import (
+    ECSMonitor, InProgressEvent, UnhealthyTasksError
+)
+from ecs_update_monitor.classifier import (
+    classifier, MessageClassifier, DRAINING, PATTERNS, PLACEMENT,
+    PLACEMENT_ATTRIBUTES, PLACEMENT_CPU, PLACEMENT_MEMORY, PLACEMENT_PORTS,
+    STEADY_STATE, TASK_START_FAILURE, UNHEALTHY_TARGET
+)
+
+
+PLACEMENT_FAILURE = (
+    '(service app) was unable to place a task because no container '
+    'instance met all of its requirements.'
+)
+
+
+class TestMessageClassifier(unittest.TestCase):
+
+    def test_known_messages_are_tagged(self):
+        messages = [
+            '(service app) has reached a steady state.',
+            PLACEMENT_FAILURE + ' The closest matching (container-instance '
+            'abc) has insufficient CPU units available.',
+            PLACEMENT_FAILURE + ' The closest matching (container-instance '
+            'abc) has insufficient memory available.',
+            PLACEMENT_FAILURE + ' The closest matching (container-instance '
+            'abc) is already using a port required by your task.',
+            PLACEMENT_FAILURE + ' The closest matching (container-instance '
+            'abc) is missing an attribute required by your task.',
+            PLACEMENT_FAILURE + ' Reason: No Container Instances were found '
+            'in your cluster.',
+            '(service app) (port 8000) is unhealthy in (target-group arn) '
+            'due to (reason Health checks failed).',
+            '(service app) is unable to consistently start tasks '
+            'successfully.',
+            '(service app) has begun draining connections on 1 tasks.',
+            '(service app) (task abc) failed container health checks.',
+            '(service app) deployment ecs-svc/1 deployment failed: tasks '
+            'failed to start.',
+            'something else entirely',
+            '(service app)',
+        ]
+
+        assert classifier.classify_all(messages) == [
+            STEADY_STATE, PLACEMENT_CPU, PLACEMENT_MEMORY, PLACEMENT_PORTS,
+            PLACEMENT_ATTRIBUTES, PLACEMENT, UNHEALTHY_TARGET,
+            TASK_START_FAILURE, DRAINING, UNHEALTHY_TARGET,
+            TASK_START_FAILURE, None, None,
+        ]
+
+    def test_cost_per_message_independent_of_other_patterns(self):
+        # Given
+        messages = [
+            '(service app) has reached a steady state.',
+            PLACEMENT_FAILURE,
+            '(service app) (port 8000) is unhealthy in (target-group arn).',
+            'something else entirely',
+        ]
+        dummies = [
+            ('dummy', r'dummy{} message'.format(i)) for i in range(1000)
+        ]
+
+        # When
+        larger = MessageClassifier(PATTERNS + dummies)
+
+        # Then
+        for message in messages:
+            assert larger.candidates(message) == \
+                classifier.candidates(message)
+        assert larger.classify_all(messages) == \
+            classifier.classify_all(messages)
+
+    def test_patterns_must_start_with_a_verb(self):
+        with self.assertRaises(ValueError):
+            MessageClassifier([('bad', r'(?:a|b) thing')])
+
+    def test_first_matching_pattern_in_table_wins(self):
+        custom = MessageClassifier([
+            ('specific', r'has started \d+ tasks: \(task'),
+            ('general', r'has started'),
+        ])
+
+        assert custom.classify(
+            '(service app) has started 1 tasks: (task abc).'
+        ) == 'specific'
+        assert custom.classify('(service app) has started') == 'general'
+
+
+class TestECSMonitorTags(unittest.TestCase):
+
+    def test_repeated_health_check_failures_fail_fast(self):
+        unhealthy = (
+            '(service app) (port 8000) is unhealthy in (target-group arn) '
+            'due to (reason Health checks failed).'
+        )
+        ecs_event_iterator = [
+            InProgressEvent(
+                1, 1, 2, 2, [unhealthy], classifier.classify_all([unhealthy])
+            )
+            for _ in range(5)
+        ]
+        ecs_monitor = ECSMonitor(ecs_event_iterator, 'dummy', Mock())
+        ecs_monitor._INTERVAL = 0
+
+        with self.assertRaises(UnhealthyTasksError) as error:
+            ecs_monitor.wait()
+
+        assert str(error.exception) == \
+            'Deployment failed - 3 health checks have failed'
+
+    def test_message_reports_configured_threshold(self):
+        unhealthy = (
+            '(service app) (task abc) failed ELB health checks in '
+            '(target-group arn).'
+        )
+        ecs_event_iterator = [
+            InProgressEvent(
+                1, 1, 2, 2, [unhealthy], classifier.classify_all([unhealthy])
+            )
+            for _ in range(5)
+        ]
+        ecs_monitor = ECSMonitor(ecs_event_iterator, 'dummy', Mock())
+        ecs_monitor._INTERVAL = 0
+        ecs_monitor._MAX_FAILURES = 5
+
+        with self.assertRaises(UnhealthyTasksError) as error:
+            ecs_monitor.wait()
+
+        assert str(error.exception) == \
+            'Deployment failed - 5 health checks have failed'
@@ -18,6 +18,7 @@ from hypothesis.strategies import text, fixed_dictionaries
 from ecs_update_monitor import (
     cli, ECSMonitor, InProgressEvent
 )
+from ecs_update_monitor.clock import VirtualClock
 
 
 IDENTIFIERS = ascii_letters + digits + '-_'
@@ -104,7 +105,14 @@ class TestECSMonitorCLI(unittest.TestCase):
             session.client.assert_called_once_with('sts')
             mock_sts.get_caller_identity.assert_called_once_with()
             run.assert_called_once_with(
-                cluster, service, taskdef, session
+                cluster, service, taskdef, session, check_capacity=False,
+                summary_file=None, task_startup=False,
+                taskdef_cache_dir=None, notify=None,
+                failure_logs=False, checkpoint_dir=None,
+                stall_timeout=None, wait_for_drain=True,
+                rollback=False, bake_alarms=None, bake_seconds=600,
+                bake_datapoints=3, completion_cache_dir=None,
+                completion_cache_ttl=86400, discovery_health=False
             )
 
     @given(fixed_dictionaries({
@@ -178,7 +186,14 @@ class TestECSMonitorCLI(unittest.TestCase):
                 aws_session_token=fixtures['token'],
             )
             run.assert_called_once_with(
-                ANY, ANY, ANY, assumed_session
+                ANY, ANY, ANY, assumed_session, check_capacity=False,
+                summary_file=None, task_startup=False,
+                taskdef_cache_dir=None, notify=None,
+                failure_logs=False, checkpoint_dir=None,
+                stall_timeout=None, wait_for_drain=True,
+                rollback=False, bake_alarms=None, bake_seconds=600,
+                bake_datapoints=3, completion_cache_dir=None,
+                completion_cache_ttl=86400, discovery_health=False
             )
 
     @patch('ecs_update_monitor.ECSMonitor')
@@ -289,9 +304,9 @@ class TestECSMonitorCLI(unittest.TestCase):
             InProgressEvent(0, 0, 2, 0, []),
             InProgressEvent(0, 0, 2, 0, []),
         ])
-        ecs_monitor = ECSMonitor(ecs_event_iterator, 'dummy', mock_session)
-        ecs_monitor._INTERVAL = 0.1
-        ecs_monitor._TIMEOUT = 0.1
+        ecs_monitor = ECSMonitor(
+            ecs_event_iterator, 'dummy', mock_session, clock=VirtualClock()
+        )
         mock_monitor.return_value = ecs_monitor
         # When
         with unittest.TestCase.assertLogs(
@@ -306,6 +321,6 @@ class TestECSMonitorCLI(unittest.TestCase):
         # Then
         assert logs.output == [(
             'ERROR:ecs_update_monitor.logger:Deployment timed out - '
-            'didn\'t complete within 0.1 seconds'
+            'didn\'t complete within 600 seconds'
         )]
         assert exit.exception.code != 0
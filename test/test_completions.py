@@ -0,0 +1,119 @@
+import os
+
+from mock import Mock, patch
+
+from ecs_update_monitor import ECSEventIterator, ECSMonitor, run
+from ecs_update_monitor.clock import VirtualClock
+from ecs_update_monitor.completions import CompletionCache
+from fakes import service, service_data, session_for, TempDirTestCase
+
+
+def settling(running):
+    return service_data(service('service', 'taskdef', running))
+
+
+class TestCompletionCache(TempDirTestCase):
+
+    def setUp(self):
+        super(TestCompletionCache, self).setUp()
+        self.now = 1000
+
+    def cache(self, taskdef='taskdef'):
+        return CompletionCache(
+            self.directory, 'cluster', 'service', taskdef, ttl=3600,
+            now=lambda: self.now
+        )
+
+    def monitor(self, responses):
+        self.ecs = Mock()
+        self.ecs.describe_services.side_effect = responses
+        boto_session = session_for(self.ecs)
+        self.clock = VirtualClock()
+        iterator = ECSEventIterator(
+            'cluster', 'service', 'taskdef', boto_session, clock=self.clock,
+            completions=self.cache()
+        )
+        return iterator, ECSMonitor(
+            iterator, 'cluster', boto_session, clock=self.clock
+        )
+
+    def test_completed_deployment_confirmed_with_one_poll(self):
+        # Given
+        self.cache().record('ecs-svc/taskdef')
+        iterator, monitor = self.monitor([settling(2)])
+
+        # When
+        with self.assertLogs('ecs_update_monitor.logger') as logs:
+            monitor.wait()
+
+        # Then
+        assert self.clock.time() == 0
+        assert self.ecs.describe_services.call_count == 1
+        assert iterator.completed_earlier
+        assert 'deployment ecs-svc/taskdef already completed and is still ' \
+            'settled' in [record.getMessage() for record in logs.records]
+
+    def test_unsettled_deployment_waited_on_again(self):
+        # Given
+        self.cache().record('ecs-svc/taskdef')
+        iterator, monitor = self.monitor(
+            [settling(1)] + [settling(2)] * 10
+        )
+
+        # When
+        with self.assertLogs('ecs_update_monitor.logger'):
+            monitor.wait()
+
+        # Then
+        assert not iterator.completed_earlier
+        assert self.clock.time() >= 60
+
+    def test_entries_expire_and_are_keyed_by_taskdef(self):
+        self.cache().record('ecs-svc/1')
+
+        assert not self.cache(taskdef='other').completed('ecs-svc/1')
+        assert not self.cache().completed('ecs-svc/2')
+        self.now += 3599
+        assert self.cache().completed('ecs-svc/1')
+        self.now += 1
+        assert not self.cache().completed('ecs-svc/1')
+        assert os.listdir(self.directory) == []
+
+    def test_corrupt_entry_is_a_miss_and_removed(self):
+        # Given
+        self.cache().record('ecs-svc/1')
+        path, = [
+            os.path.join(self.directory, name)
+            for name in os.listdir(self.directory)
+        ]
+        with open(path, 'w') as f:
+            f.write('{"completed_')
+
+        # When
+        completed = self.cache().completed('ecs-svc/1')
+
+        # Then
+        assert not completed
+        assert os.listdir(self.directory) == []
+
+    @patch('ecs_update_monitor.Bake')
+    def test_run_skips_bake_for_recorded_deployment(self, Bake):
+        # Given
+        CompletionCache(
+            self.directory, 'cluster', 'service', 'taskdef'
+        ).record('ecs-svc/taskdef')
+        ecs = Mock()
+        ecs.describe_services.return_value = settling(2)
+
+        # When
+        with self.assertLogs('ecs_update_monitor.logger'):
+            run(
+                'cluster', 'service', 'taskdef', session_for(ecs),
+                bake_alarms=['5xx'], completion_cache_dir=self.directory
+            )
+
+        # Then
+        Bake.return_value.wait.assert_not_called()
+        ecs.describe_services.assert_called_once_with(
+            cluster='cluster', services=['service']
+        )
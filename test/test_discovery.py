@@ -0,0 +1,159 @@
+import unittest
+
+from botocore.exceptions import ClientError
+from mock import Mock, patch
+
+from ecs_update_monitor import ECSEventIterator, run
+from ecs_update_monitor.clock import VirtualClock
+from ecs_update_monitor.discovery import (
+    DiscoveryHealth, UnhealthyRegistrationError
+)
+from fakes import service, service_data
+
+
+REGISTRY = 'arn:aws:servicediscovery:eu-west-1:1:service/srv-1'
+
+
+def registered(running, registries=(REGISTRY,)):
+    return service_data(
+        service('service', 'taskdef', running), serviceRegistries=[
+            {'registryArn': arn, 'containerName': 'app'}
+            for arn in registries
+        ]
+    )
+
+
+class TestDiscoveryHealth(unittest.TestCase):
+
+    def setUp(self):
+        self.ecs = Mock()
+        self.ecs.list_tasks.return_value = {
+            'taskArns': ['arn:aws:ecs:eu-west-1:1:task/cluster/a',
+                         'arn:aws:ecs:eu-west-1:1:task/cluster/b'],
+        }
+        self.servicediscovery = Mock()
+        self.boto_session = Mock()
+        self.boto_session.client.side_effect = lambda name: {
+            'ecs': self.ecs, 'servicediscovery': self.servicediscovery,
+        }[name]
+
+    def iterator(self, responses, clock):
+        self.ecs.describe_services.side_effect = responses
+        return ECSEventIterator(
+            'cluster', 'service', 'taskdef', self.boto_session, clock=clock,
+            discovery=DiscoveryHealth('cluster', self.boto_session)
+        )
+
+    def test_new_service_done_once_registrations_healthy(self):
+        # Given
+        self.servicediscovery.get_instances_health_status.side_effect = [
+            {'Status': {'a': 'UNKNOWN', 'b': 'UNKNOWN'}},
+            {'Status': {'a': 'HEALTHY', 'b': 'HEALTHY', 'c': 'UNHEALTHY'}},
+        ]
+        clock = VirtualClock()
+        events = self.iterator(
+            [registered(0), registered(2), registered(2)], clock
+        )
+
+        # When
+        event_list = []
+        for event in events:
+            event_list.append(event)
+            clock.advance(15)
+
+        # Then
+        assert [event.done for event in event_list] == [False, False, True]
+        assert event_list[2].messages == [
+            'task a: Cloud Map srv-1 health UNKNOWN -> HEALTHY',
+            'task b: Cloud Map srv-1 health UNKNOWN -> HEALTHY',
+        ]
+        assert clock.time() == 45
+
+    def test_registrations_paged_once_per_registry(self):
+        self.servicediscovery.get_instances_health_status.side_effect = [
+            {'Status': {'a': 'HEALTHY'}, 'NextToken': 'next'},
+            {'Status': {'b': 'HEALTHY'}},
+        ]
+        discovery = DiscoveryHealth('cluster', self.boto_session)
+
+        discovery.poll([REGISTRY, REGISTRY], 'ecs-svc/1')
+
+        assert discovery.healthy == 2
+        assert discovery.api_calls == {
+            'list_tasks': 1, 'get_instances_health_status': 2
+        }
+        self.servicediscovery.get_instances_health_status \
+            .assert_called_with(
+                ServiceId='srv-1', MaxResults=100, NextToken='next'
+            )
+
+    def test_persistently_unhealthy_registration_fails(self):
+        # Given
+        self.servicediscovery.get_instances_health_status.side_effect = [
+            {'Status': {'a': 'UNHEALTHY', 'b': 'HEALTHY'}},
+            {'Status': {'a': 'HEALTHY', 'b': 'UNHEALTHY'}},
+            {'Status': {'a': 'UNHEALTHY', 'b': 'UNHEALTHY'}},
+            {'Status': {'a': 'HEALTHY', 'b': 'UNHEALTHY'}},
+        ]
+        events = self.iterator([registered(2)] * 4, VirtualClock())
+
+        # When
+        with self.assertRaises(UnhealthyRegistrationError) as error:
+            list(events)
+
+        # Then
+        assert str(error.exception) == (
+            'Deployment failed - task b has been unhealthy in Cloud Map '
+            'service srv-1 for 3 polls'
+        )
+
+    def test_grace_period_used_when_access_denied(self):
+        # Given
+        self.servicediscovery.get_instances_health_status.side_effect = \
+            ClientError(
+                {'Error': {'Code': 'AccessDeniedException', 'Message': ''}},
+                'GetInstancesHealthStatus'
+            )
+        clock = VirtualClock()
+        events = self.iterator([registered(2)] * 6, clock)
+
+        # When
+        with self.assertLogs('ecs_update_monitor.logger', 'WARNING'):
+            event_list = []
+            for event in events:
+                event_list.append(event)
+                clock.advance(15)
+
+        # Then
+        assert clock.time() == 75
+        assert event_list[-1].done
+        assert self.servicediscovery.get_instances_health_status \
+            .call_count == 1
+
+    def test_disabled_when_tasks_cannot_be_listed(self):
+        self.ecs.list_tasks.side_effect = ClientError(
+            {'Error': {'Code': 'AccessDeniedException', 'Message': ''}},
+            'ListTasks'
+        )
+        discovery = DiscoveryHealth('cluster', self.boto_session)
+
+        with self.assertLogs('ecs_update_monitor.logger', 'WARNING'):
+            assert discovery.poll([REGISTRY], 'ecs-svc/1') == []
+        assert discovery.poll([REGISTRY], 'ecs-svc/1') == []
+
+        assert discovery.healthy is None
+        assert self.ecs.list_tasks.call_count == 1
+        self.servicediscovery.get_instances_health_status.assert_not_called()
+
+    @patch('ecs_update_monitor.ECSMonitor')
+    @patch('ecs_update_monitor.ECSEventIterator')
+    def test_only_checked_when_enabled(self, ECSEventIterator, _):
+        run('cluster', 'service', 'taskdef', self.boto_session)
+        run(
+            'cluster', 'service', 'taskdef', self.boto_session,
+            discovery_health=True
+        )
+
+        disabled, enabled = ECSEventIterator.call_args_list
+        assert disabled[1]['discovery'] is None
+        assert isinstance(enabled[1]['discovery'], DiscoveryHealth)
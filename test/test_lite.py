@@ -0,0 +1,261 @@
+import datetime
+import json
+import unittest
+from urllib.parse import parse_qsl
+
+from botocore.auth import SigV4Auth
+from botocore.awsrequest import AWSRequest
+from botocore.credentials import Credentials
+from mock import Mock, patch
+
+from ecs_update_monitor import cli, UserFacingError
+from ecs_update_monitor.lite import LiteClientError, LiteSession, sign
+from ecs_update_monitor.retry import is_retryable
+
+
+CREDENTIALS = ('AKIDEXAMPLE', 'secret', 'token')
+
+
+def response(status, body):
+    http_response = Mock(status=status)
+    http_response.read.return_value = body
+    return http_response
+
+
+class TestSigning(unittest.TestCase):
+
+    def test_signature_matches_botocore(self):
+        # Given
+        body = b'{"cluster": "cluster", "services": ["service"]}'
+        headers = {
+            'content-type': 'application/x-amz-json-1.1',
+            'x-amz-target':
+                'AmazonEC2ContainerServiceV20141113.DescribeServices',
+        }
+        request = AWSRequest(
+            method='POST', url='https://ecs.eu-west-1.amazonaws.com/',
+            data=body, headers=dict(headers)
+        )
+        SigV4Auth(
+            Credentials(*CREDENTIALS), 'ecs', 'eu-west-1'
+        ).add_auth(request)
+        now = datetime.datetime.strptime(
+            request.headers['X-Amz-Date'], '%Y%m%dT%H%M%SZ'
+        )
+
+        # When
+        signed = sign(
+            'POST', 'ecs.eu-west-1.amazonaws.com', '/', body, headers, 'ecs',
+            'eu-west-1', CREDENTIALS, now
+        )
+
+        # Then
+        assert signed['authorization'] == request.headers['Authorization']
+        assert signed['x-amz-security-token'] == 'token'
+
+
+class TestLiteClient(unittest.TestCase):
+
+    def setUp(self):
+        patcher = patch('ecs_update_monitor.lite.HTTPSConnection')
+        self.HTTPSConnection = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.connection = self.HTTPSConnection.return_value
+        self.session = LiteSession(
+            *CREDENTIALS, region_name='eu-west-1', environ={}
+        )
+
+    def test_describe_services_parsed_to_the_fields_used(self):
+        # Given
+        self.connection.getresponse.return_value = response(200, json.dumps({
+            'services': [{
+                'serviceName': 'app',
+                'deployments': [{
+                    'id': 'ecs-svc/1', 'status': 'PRIMARY',
+                    'taskDefinition': 'app:2', 'runningCount': 1,
+                    'pendingCount': 1, 'desiredCount': 2,
+                    'createdAt': 1483705815.0, 'unused': 'x' * 1000,
+                }],
+                'events': [{
+                    'id': 'e1', 'createdAt': 1483705815.5,
+                    'message': 'has started 1 tasks',
+                }],
+                'placementStrategy': [],
+            }],
+            'failures': [],
+        }).encode('utf-8'))
+        ecs = self.session.client('ecs')
+
+        # When
+        result = ecs.describe_services(cluster='cluster', services=['app'])
+        ecs.describe_services(cluster='cluster', services=['app'])
+
+        # Then
+        service = result['services'][0]
+        assert service['deployments'][0] == {
+            'id': 'ecs-svc/1', 'status': 'PRIMARY',
+            'taskDefinition': 'app:2', 'runningCount': 1, 'pendingCount': 1,
+            'desiredCount': 2,
+            'createdAt': datetime.datetime(
+                2017, 1, 6, 12, 30, 15, tzinfo=datetime.timezone.utc
+            ),
+        }
+        assert 'placementStrategy' not in service
+        assert service['events'][0]['message'] == 'has started 1 tasks'
+        self.HTTPSConnection.assert_called_once_with(
+            'ecs.eu-west-1.amazonaws.com', timeout=30
+        )
+        method, path, body, headers = self.connection.request.call_args[0]
+        assert json.loads(body.decode('utf-8')) == {
+            'cluster': 'cluster', 'services': ['app']
+        }
+        assert headers['x-amz-target'] == \
+            'AmazonEC2ContainerServiceV20141113.DescribeServices'
+
+    def test_query_protocol_for_sts_and_cloudwatch(self):
+        # Given
+        self.connection.getresponse.return_value = response(200, (
+            b'<GetCallerIdentityResponse xmlns="https://sts.amazonaws.com/'
+            b'doc/2011-06-15/"><GetCallerIdentityResult>'
+            b'<Arn>arn:aws:sts::1:assumed-role/r/s</Arn>'
+            b'<Account>1</Account></GetCallerIdentityResult>'
+            b'</GetCallerIdentityResponse>'
+        ))
+
+        # When
+        identity = self.session.client('sts').get_caller_identity()
+        self.session.client('cloudwatch').put_metric_data(
+            Namespace='Platform/ECS',
+            MetricData=[{
+                'MetricName': 'metric',
+                'Dimensions': [{'Name': 'EcsCluster', 'Value': 'cluster'}],
+                'Timestamp': datetime.datetime(2017, 1, 6, 12, 30, 15),
+                'Value': 1,
+            }]
+        )
+
+        # Then
+        assert identity == {
+            'Arn': 'arn:aws:sts::1:assumed-role/r/s', 'Account': '1'
+        }
+        body = self.connection.request.call_args[0][2].decode('utf-8')
+        assert dict(parse_qsl(body)) == {
+            'Action': 'PutMetricData',
+            'Version': '2010-08-01',
+            'Namespace': 'Platform/ECS',
+            'MetricData.member.1.MetricName': 'metric',
+            'MetricData.member.1.Dimensions.member.1.Name': 'EcsCluster',
+            'MetricData.member.1.Dimensions.member.1.Value': 'cluster',
+            'MetricData.member.1.Timestamp': '2017-01-06T12:30:15Z',
+            'MetricData.member.1.Value': '1',
+        }
+        self.HTTPSConnection.assert_called_with(
+            'monitoring.eu-west-1.amazonaws.com', timeout=30
+        )
+
+    def test_cloudwatch_alarms_and_metric_data_parsed(self):
+        # Given
+        self.connection.getresponse.side_effect = [response(200, (
+            b'<DescribeAlarmsResponse xmlns="http://monitoring.amazonaws.com/'
+            b'doc/2010-08-01/"><DescribeAlarmsResult><MetricAlarms><member>'
+            b'<AlarmName>5xx</AlarmName><StateValue>OK</StateValue>'
+            b'<Threshold>10.0</Threshold><Period>60</Period>'
+            b'<Dimensions><member><Name>LoadBalancer</Name>'
+            b'<Value>app/lb/1</Value></member></Dimensions>'
+            b'</member></MetricAlarms><CompositeAlarms/>'
+            b'</DescribeAlarmsResult></DescribeAlarmsResponse>'
+        )), response(200, (
+            b'<GetMetricDataResponse><GetMetricDataResult>'
+            b'<MetricDataResults><member><Id>m0</Id><Values>'
+            b'<member>1.0</member><member>2.5</member></Values></member>'
+            b'</MetricDataResults></GetMetricDataResult>'
+            b'</GetMetricDataResponse>'
+        ))]
+        cloudwatch = self.session.client('cloudwatch')
+
+        # When
+        alarms = cloudwatch.describe_alarms(AlarmNames=['5xx'])
+        metric_data = cloudwatch.get_metric_data(
+            MetricDataQueries=[{'Id': 'm0', 'ReturnData': True}],
+            StartTime=datetime.datetime(2017, 1, 6, 12, 30),
+            EndTime=datetime.datetime(2017, 1, 6, 12, 40)
+        )
+
+        # Then
+        assert alarms == {
+            'MetricAlarms': [{
+                'AlarmName': '5xx', 'StateValue': 'OK', 'Threshold': 10.0,
+                'Period': 60,
+                'Dimensions': [{'Name': 'LoadBalancer', 'Value': 'app/lb/1'}],
+            }],
+            'CompositeAlarms': [],
+            'NextToken': None,
+        }
+        assert metric_data == {
+            'MetricDataResults': [{'Id': 'm0', 'Values': [1.0, 2.5]}],
+            'NextToken': None,
+        }
+        body = self.connection.request.call_args[0][2].decode('utf-8')
+        assert dict(parse_qsl(body))[
+            'MetricDataQueries.member.1.ReturnData'
+        ] == 'true'
+
+    def test_error_responses_raised_like_botocore(self):
+        self.connection.getresponse.return_value = response(400, json.dumps({
+            '__type': 'com.amazonaws#ThrottlingException',
+            'message': 'Rate exceeded',
+        }).encode('utf-8'))
+
+        with self.assertRaises(LiteClientError) as error:
+            self.session.client('ecs').describe_services(services=['app'])
+
+        assert error.exception.response['Error']['Code'] == \
+            'ThrottlingException'
+        assert is_retryable(error.exception)
+
+    def test_unparseable_error_bodies_raised_with_their_status(self):
+        # Given
+        self.connection.getresponse.side_effect = [
+            response(503, b'<html><body>503 Service Unavailable</body>'),
+            response(502, b'<ErrorResponse><Error><Code>Thrott'),
+        ]
+
+        # When
+        with self.assertRaises(LiteClientError) as ecs_error:
+            self.session.client('ecs').describe_services(services=['app'])
+        with self.assertRaises(LiteClientError) as sts_error:
+            self.session.client('sts').get_caller_identity()
+
+        # Then
+        assert ecs_error.exception.response['Error']['Code'] == '503'
+        assert sts_error.exception.response['Error']['Code'] == '502'
+        assert is_retryable(ecs_error.exception)
+        assert is_retryable(sts_error.exception)
+
+    def test_unsupported_service_and_missing_credentials_rejected(self):
+        with self.assertRaises(UserFacingError):
+            self.session.client('s3')
+        with self.assertRaises(UserFacingError):
+            LiteSession(region_name='eu-west-1', environ={})
+
+
+class TestLiteClientCLI(unittest.TestCase):
+
+    def test_lite_client_selected(self):
+        with patch('ecs_update_monitor.cli.LiteSession') as LiteSession, \
+                patch('ecs_update_monitor.cli.Session') as Session, \
+                patch('ecs_update_monitor.cli.run') as run:
+            session = LiteSession.return_value
+            session.client.return_value.get_caller_identity.return_value = {
+                'Arn': 'caller'
+            }
+
+            cli.main([
+                '--cluster', 'cluster', '--service', 'service',
+                '--taskdef', 'taskdef', '--region', 'region',
+                '--caller-arn', 'caller', '--client', 'lite',
+            ])
+
+        LiteSession.assert_called_once_with(region_name='region')
+        assert not Session.called
+        assert run.call_args[0][3] is session
@@ -0,0 +1,139 @@
+import datetime
+import threading
+import unittest
+
+from mock import Mock
+
+from ecs_update_monitor import ECSMonitor, FailedTasksError, InProgressEvent
+from ecs_update_monitor.clock import VirtualClock
+from ecs_update_monitor.logs import FailureLogs
+
+
+TASKDEF = 'arn:aws:ecs:task-definition/app:2'
+
+
+def stopped_task(name, minute, taskdef=TASKDEF):
+    return {
+        'taskArn': 'arn:aws:ecs:task/cluster/{}'.format(name),
+        'taskDefinitionArn': taskdef,
+        'stoppedAt': datetime.datetime(2017, 1, 6, 12, minute),
+        'stoppedReason': 'Essential container in task exited',
+    }
+
+
+def container(name, prefix='app'):
+    options = {'awslogs-group': '/ecs/app', 'awslogs-region': 'eu-west-1'}
+    if prefix is not None:
+        options['awslogs-stream-prefix'] = prefix
+    return {
+        'name': name,
+        'logConfiguration': {'logDriver': 'awslogs', 'options': options},
+    }
+
+
+class TestFailureLogs(unittest.TestCase):
+
+    def setUp(self):
+        self.ecs = Mock()
+        self.ecs.list_tasks.return_value = {'taskArns': ['a', 'b', 'c', 'd']}
+        self.ecs.describe_tasks.return_value = {'tasks': [
+            stopped_task('old', 1),
+            stopped_task('newest', 4),
+            stopped_task('other-taskdef', 5, taskdef='other'),
+            stopped_task('newer', 3),
+            stopped_task('new', 2),
+        ]}
+        self.logs = Mock()
+        self.logs.get_log_events.side_effect = lambda **kwargs: {'events': [
+            {'message': '{} line 1\n'.format(kwargs['logStreamName'])},
+        ]}
+        self.boto_session = Mock()
+        self.boto_session.client.side_effect = lambda service, **kwargs: {
+            'ecs': self.ecs, 'logs': self.logs,
+        }[service]
+        self.taskdef_cache = Mock()
+        self.taskdef_cache.get.return_value = {'containerDefinitions': [
+            container('web'), container('sidecar', prefix=None),
+        ]}
+
+    def failure_logs(self):
+        return FailureLogs(
+            'cluster', 'service', TASKDEF, self.boto_session,
+            self.taskdef_cache
+        )
+
+    def test_newest_stopped_tasks_logs_fetched(self):
+        lines = self.failure_logs().lines()
+
+        assert lines == [
+            'task newest stopped: Essential container in task exited',
+            'task newer stopped: Essential container in task exited',
+            'task new stopped: Essential container in task exited',
+            'logs app/web/newest:',
+            '  app/web/newest line 1',
+            'logs app/web/newer:',
+            '  app/web/newer line 1',
+            'logs app/web/new:',
+            '  app/web/new line 1',
+        ]
+        self.logs.get_log_events.assert_any_call(
+            logGroupName='/ecs/app', logStreamName='app/web/newest',
+            limit=20, startFromHead=False
+        )
+        self.boto_session.client.assert_any_call(
+            'logs', region_name='eu-west-1'
+        )
+
+    def test_slow_streams_skipped_after_time_budget(self):
+        release = threading.Event()
+        self.logs.get_log_events.side_effect = \
+            lambda **kwargs: release.wait()
+        failure_logs = self.failure_logs()
+        failure_logs._TIME_BUDGET = 0.1
+
+        lines = failure_logs.lines()
+        release.set()
+
+        assert lines[-2:] == ['logs app/web/new:', '  (timed out)']
+
+    def test_output_limited_to_byte_budget(self):
+        failure_logs = self.failure_logs()
+        failure_logs._BYTE_BUDGET = 100
+
+        lines = failure_logs.lines()
+
+        assert lines == [
+            'task newest stopped: Essential container in task exited',
+            '... output truncated',
+        ]
+        self.logs.get_log_events.assert_not_called()
+
+    def test_fetching_stops_once_byte_budget_spent(self):
+        failure_logs = self.failure_logs()
+        failure_logs._BYTE_BUDGET = 200
+        failure_logs._WORKERS = 1
+
+        lines = failure_logs.lines()
+
+        assert lines[-1] == '... output truncated'
+        assert self.logs.get_log_events.call_count == 1
+
+    def test_logs_shown_when_deployment_fails(self):
+        # Given
+        failure_logs = Mock()
+        failure_logs.lines.return_value = ['task a stopped: OutOfMemory']
+        ecs_monitor = ECSMonitor(
+            [InProgressEvent(2, 0, 2, 0, []), InProgressEvent(0, 0, 2, 0, []),
+             InProgressEvent(2, 0, 2, 0, []), InProgressEvent(1, 0, 2, 0, [])],
+            'dummy', Mock(), clock=VirtualClock(), failure_logs=failure_logs
+        )
+
+        # When
+        with self.assertLogs('ecs_update_monitor.logger', 'ERROR') as logs, \
+                self.assertRaises(FailedTasksError):
+            ecs_monitor.wait()
+
+        # Then
+        assert logs.output == [
+            'ERROR:ecs_update_monitor.logger:task a stopped: OutOfMemory'
+        ]
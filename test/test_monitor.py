@@ -1,16 +1,18 @@
 import datetime
+import threading
 import unittest
 from itertools import cycle, islice
 
 from boto3 import Session
 from ecs_update_monitor import (
-    ECSEventIterator, ECSMonitor, TaskdefDoesNotMatchError,
-    InProgressEvent, TimeoutError, run
+    DoneEvent, ECSEventIterator, ECSMonitor, TaskdefDoesNotMatchError,
+    InProgressEvent, NewInstanceEvent, StalledError, TimeoutError, run
 )
+from ecs_update_monitor.clock import VirtualClock
 from dateutil.tz import tzlocal
 from string import ascii_letters, digits
 from hypothesis import given, assume
-from hypothesis.strategies import fixed_dictionaries, text
+from hypothesis.strategies import fixed_dictionaries, integers, text
 from mock import ANY, MagicMock, Mock, patch
 from p2assertlogs import AssertLogsContext
 
@@ -34,12 +36,84 @@ class TestECSMonitor(unittest.TestCase):
         ])
 
         boto_session = Mock()
-        ecs_monitor = ECSMonitor(ecs_event_iterator, 'dummy', boto_session)
-        ecs_monitor._INTERVAL = 0.1
-        ecs_monitor._TIMEOUT = 0.1
+        clock = VirtualClock()
+        ecs_monitor = ECSMonitor(
+            ecs_event_iterator, 'dummy', boto_session, clock=clock
+        )
 
         # Then
         self.assertRaises(TimeoutError, ecs_monitor.wait)
+        assert clock.time() == 600
+
+    @given(integers(min_value=0, max_value=80))
+    def test_timeout_in_simulated_time(self, polls_in_progress):
+        # Given
+        ecs_event_iterator = [
+            InProgressEvent(0, 2, 2, 0, []) for _ in range(polls_in_progress)
+        ] + [DoneEvent(2, 0, 2, 0, [])]
+        ecs_monitor = ECSMonitor(
+            ecs_event_iterator, 'dummy', Mock(), clock=VirtualClock()
+        )
+
+        # When
+        try:
+            ecs_monitor.wait()
+            timed_out = False
+        except TimeoutError:
+            timed_out = True
+
+        # Then
+        assert timed_out == ((polls_in_progress - 1) * 15 >= 600)
+
+    def test_polls_at_a_fixed_rate_despite_api_latency(self):
+        # Given
+        clock = VirtualClock()
+
+        def slow_events():
+            for event in [
+                InProgressEvent(0, 2, 2, 2, []),
+                InProgressEvent(1, 1, 2, 1, []),
+                InProgressEvent(2, 0, 2, 1, []),
+                DoneEvent(2, 0, 2, 0, []),
+            ]:
+                clock.advance(4)
+                yield event
+
+        ecs_monitor = ECSMonitor(slow_events(), 'dummy', Mock(), clock=clock)
+
+        # When
+        ecs_monitor.wait()
+
+        # Then
+        assert clock.sleeps == [11, 11, 11]
+
+    def test_metric_written_off_the_polling_loop(self):
+        # Given
+        release = threading.Event()
+        boto_session = Mock()
+        boto_session.client.return_value.put_metric_data.side_effect = \
+            lambda **kwargs: release.wait(5)
+        ecs_monitor = ECSMonitor(
+            [
+                NewInstanceEvent(0, 0, 2, 2, []),
+                InProgressEvent(1, 1, 2, 1, []),
+            ],
+            'dummy', boto_session, clock=VirtualClock()
+        )
+        boto_session.client.assert_called_once_with('cloudwatch')
+        ecs_monitor.begin()
+
+        # When
+        ecs_monitor.poll()
+        ecs_monitor.poll()
+        release.set()
+        ecs_monitor.finish('completed')
+
+        # Then
+        assert ecs_monitor.timeline.api_calls['put_metric_data'] == 1
+        assert boto_session.client.call_count == 1
+        assert ecs_monitor._retrier.stats['attempts'] == 0
+        assert ecs_monitor.timeline.retries == {'attempts': 1}
 
 
 class TestECSEventIterator(unittest.TestCase):
@@ -124,14 +198,14 @@ class TestECSEventIterator(unittest.TestCase):
         event_list = [e for e in events]
 
         # Then
-        assert len(event_list) == 5
+        assert len(event_list) == 1
         assert event_list[0].messages == [
             'has started 1 tasks',
             'registered 1 targets',
             'has reached a steady state.'
         ]
-        assert event_list[4].done
-        assert event_list[4].previous_running == 0
+        assert event_list[0].done
+        assert event_list[0].previous_running == 0
 
     def test_deployment_completed_after_reaching_desired_running_count(self):
         cluster = 'dummy-cluster'
@@ -292,6 +366,37 @@ class TestECSEventIterator(unittest.TestCase):
         assert event_list[2].pending == 0
         assert event_list[2].previous_running == 0
 
+    def test_deployment_completed_without_waiting_for_drain(self):
+        # Given
+        def deployment(status, running, pending):
+            return {
+                'id': 'ecs-svc/{}'.format(status), 'status': status,
+                'taskDefinition': 'dummy-taskdef', 'desiredCount': 2,
+                'runningCount': running, 'pendingCount': pending,
+                'createdAt': datetime.datetime(2017, 1, 6, 10, 58, 9),
+            }
+        mock_ecs_client = Mock()
+        mock_ecs_client.describe_services.side_effect = [
+            {'services': [{'deployments': [
+                deployment('PRIMARY', running, pending),
+                deployment('ACTIVE', 2, 0),
+            ], 'events': []}]}
+            for running, pending in [(1, 1), (2, 1), (2, 0), (2, 0)]
+        ]
+        boto_session = MagicMock(spec=Session)
+        boto_session.client.return_value = mock_ecs_client
+
+        # When
+        event_list = list(ECSEventIterator(
+            'dummy-cluster', 'dummy-service', 'dummy-taskdef', boto_session,
+            wait_for_drain=False
+        ))
+
+        # Then
+        assert [event.done for event in event_list] == [False, False, True]
+        assert event_list[1].pending == 1
+        assert event_list[2].previous_running == 2
+
     def test_deployment_does_not_complete_within_time(self):
         cluster = 'dummy-cluster'
         service = 'dummy-service'
@@ -460,10 +565,14 @@ class TestECSEventIterator(unittest.TestCase):
             describe_services_generator([0, 0, 1, 2, 2, 2, 2, 2])
 
         boto_session.client.return_value = mock_ecs_client
+        clock = VirtualClock()
         events = ECSEventIterator(
-            cluster, service, taskdef, boto_session
+            cluster, service, taskdef, boto_session, clock=clock
         )
-        event_list = [e for e in events]
+        event_list = []
+        for event in events:
+            event_list.append(event)
+            clock.sleep(15)
 
         assert len(event_list) == 8
 
@@ -574,11 +683,182 @@ class TestRunECSMonitor(unittest.TestCase):
 
             # Then
             ECSEventIterator.assert_called_once_with(
-                cluster, service, taskdef, boto_session
+                cluster, service, taskdef, boto_session, capacity_index=None,
+                retrier=ANY, taskdef_cache=ANY, task_tracker=None,
+                checkpoint=None, wait_for_drain=True, discovery=None,
+                completions=None, clock=ANY
             )
             ECSMonitor.assert_called_once_with(
                 event_iterator,
                 cluster,
-                boto_session
+                boto_session,
+                summary_file=None,
+                retrier=ANY,
+                clock=ANY,
+                notifier=None,
+                failure_logs=None,
+                checkpoint=None,
+                stall_timeout=None
             )
+            assert ECSMonitor.call_args[1]['clock'] is \
+                ECSEventIterator.call_args[1]['clock']
             ecs_monitor.wait.assert_called_once()
+
+
+class TestEventWindowOverflow(unittest.TestCase):
+
+    def _service_data(self, first_event, count):
+        return {
+            'services': [
+                {
+                    'deployments': [
+                        {
+                            'desiredCount': 50,
+                            'createdAt': datetime.datetime(2017, 1, 6),
+                            'id': 'ecs-svc/9223370553143707624',
+                            'runningCount': 10,
+                            'pendingCount': 40,
+                            'status': 'PRIMARY',
+                            'taskDefinition': 'taskdef',
+                        }
+                    ],
+                    'events': [
+                        {
+                            'createdAt': datetime.datetime(
+                                2017, 1, 7
+                            ) + datetime.timedelta(seconds=i),
+                            'id': 'event-{}'.format(i),
+                            'message': 'message {}'.format(i),
+                        }
+                        for i in reversed(
+                            range(first_event, first_event + count)
+                        )
+                    ],
+                }
+            ]
+        }
+
+    def _events(self, *service_data):
+        boto_session = MagicMock(spec=Session)
+        mock_ecs_client = Mock()
+        mock_ecs_client.describe_services.side_effect = service_data
+        boto_session.client.return_value = mock_ecs_client
+        return ECSEventIterator(
+            'cluster', 'service', 'taskdef', boto_session
+        )
+
+    def test_gap_reported_when_no_returned_event_was_seen_before(self):
+        events = self._events(
+            self._service_data(0, 10),
+            self._service_data(150, 100),
+        )
+
+        first, second = next(events), next(events)
+
+        assert not first.burst
+        assert second.burst
+        assert second.messages[0] == (
+            'event gap: more than 100 service events since the last poll - '
+            'earlier messages were missed'
+        )
+        assert second.messages[1:] == [
+            'message {}'.format(i) for i in range(150, 250)
+        ]
+
+    def test_no_gap_when_window_overlaps(self):
+        events = self._events(
+            self._service_data(0, 10),
+            self._service_data(9, 100),
+        )
+
+        next(events)
+        second = next(events)
+
+        assert second.burst
+        assert second.messages == [
+            'message {}'.format(i) for i in range(10, 109)
+        ]
+
+    def test_low_event_rate_is_not_a_burst(self):
+        events = self._events(
+            self._service_data(0, 100),
+            self._service_data(10, 100),
+        )
+
+        next(events)
+
+        assert not next(events).burst
+
+    def test_monitor_polls_faster_during_a_burst(self):
+        ecs_event_iterator = [
+            InProgressEvent(0, 2, 2, 0, [], burst=True),
+            InProgressEvent(1, 1, 2, 0, []),
+            DoneEvent(2, 0, 2, 0, []),
+        ]
+        clock = VirtualClock()
+        ecs_monitor = ECSMonitor(
+            ecs_event_iterator, 'dummy', Mock(), clock=clock
+        )
+
+        ecs_monitor.wait()
+
+        assert clock.sleeps == [5, 15]
+
+
+class TestStallDetection(unittest.TestCase):
+
+    def test_stuck_deployment_fails_before_timeout(self):
+        # Given
+        ecs_event_iterator = [
+            InProgressEvent(0, 4, 4, 4, ['has started 4 tasks']),
+            InProgressEvent(1, 3, 4, 4, []),
+        ] + [InProgressEvent(1, 3, 4, 4, []) for _ in range(20)]
+        clock = VirtualClock()
+        ecs_monitor = ECSMonitor(
+            ecs_event_iterator, 'dummy', Mock(), clock=clock,
+            stall_timeout=60
+        )
+
+        # When
+        with self.assertRaises(StalledError) as error:
+            ecs_monitor.wait()
+
+        # Then
+        assert clock.time() == 90
+        assert str(error.exception) == (
+            'Deployment stalled - no progress for 60 seconds (running 1, '
+            'pending 3, desired 4, previous deployment running 4)'
+        )
+
+    def test_service_events_and_draining_are_not_stalls(self):
+        ecs_event_iterator = [
+            InProgressEvent(1, 3, 4, 4, ['message {}'.format(i)])
+            for i in range(10)
+        ] + [
+            InProgressEvent(4, 0, 4, 4, []) for _ in range(10)
+        ] + [DoneEvent(4, 0, 4, 0, [])]
+        ecs_monitor = ECSMonitor(
+            ecs_event_iterator, 'dummy', Mock(), clock=VirtualClock(),
+            stall_timeout=30
+        )
+
+        ecs_monitor.wait()
+
+    def test_window_extended_by_health_check_grace_period(self):
+        ecs_event_iterator = Mock()
+        ecs_event_iterator.__iter__ = Mock(return_value=iter(
+            [InProgressEvent(1, 3, 4, 4, []) for _ in range(10)]
+        ))
+        ecs_event_iterator.health_check_grace_period = 60
+        ecs_event_iterator.api_calls = {}
+        ecs_event_iterator.task_startup = None
+        clock = VirtualClock()
+        ecs_monitor = ECSMonitor(
+            ecs_event_iterator, 'dummy', Mock(), clock=clock,
+            stall_timeout=30
+        )
+
+        with self.assertRaises(StalledError):
+            ecs_monitor.wait()
+
+        assert clock.time() == 105
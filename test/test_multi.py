@@ -0,0 +1,126 @@
+import os
+import unittest
+
+from mock import Mock, patch
+
+from ecs_update_monitor import cli, UserFacingError
+from ecs_update_monitor.clock import VirtualClock
+from ecs_update_monitor.multi import (
+    MultiServiceMonitor, read_manifest, ServicesFailedError
+)
+from fakes import FakeECS, service, session_for, TempDirTestCase
+
+
+class TimelineECS(FakeECS):
+    """Each service steps through its timeline, one entry per poll."""
+
+    def __init__(self, timelines):
+        super(TimelineECS, self).__init__()
+        self._timelines = timelines
+        self.polls = {name: 0 for name in timelines}
+
+    def describe(self, name):
+        timeline = self._timelines[name]
+        self.polls[name] += 1
+        return timeline[min(self.polls[name], len(timeline)) - 1]
+
+
+class TestMultiServiceMonitor(unittest.TestCase):
+
+    def test_services_polled_together_in_batches(self):
+        # Given
+        timelines = {
+            'service-{:02}'.format(i): [
+                service('service-{:02}'.format(i), 'taskdef', 1, previous=1),
+                service('service-{:02}'.format(i), 'taskdef', 2),
+            ]
+            for i in range(12)
+        }
+        timelines['slow'] = [
+            service('slow', 'taskdef', 0, previous=2),
+            service('slow', 'taskdef', 1, previous=1),
+            service('slow', 'taskdef', 2, previous=1),
+            service('slow', 'taskdef', 2),
+        ]
+        ecs = TimelineECS(timelines)
+        monitor = MultiServiceMonitor(
+            'cluster', [(name, 'taskdef') for name in sorted(timelines)],
+            session_for(ecs), clock=VirtualClock()
+        )
+
+        # When
+        monitor.wait()
+
+        # Then
+        assert [len(call) for call in ecs.describe_calls] == [
+            10, 3, 10, 3, 1, 1
+        ]
+        assert ecs.describe_calls[-1] == ['slow']
+        assert set(monitor.results.values()) == {None}
+
+    def test_per_service_failures_reported(self):
+        # Given
+        ecs = TimelineECS({
+            'good': [service('good', 'taskdef', 2)],
+            'wrong-taskdef': [service('wrong-taskdef', 'other', 2)],
+        })
+        monitor = MultiServiceMonitor(
+            'cluster', [('good', 'taskdef'), ('wrong-taskdef', 'taskdef')],
+            session_for(ecs), clock=VirtualClock()
+        )
+
+        # When
+        with self.assertRaises(ServicesFailedError) as error:
+            monitor.wait()
+
+        # Then
+        assert str(error.exception) == \
+            '1 of 2 service deployments failed: wrong-taskdef'
+        assert monitor.results['good'] is None
+        assert 'found primary deployment with taskdef other' in \
+            monitor.results['wrong-taskdef']
+
+
+class TestManifest(TempDirTestCase):
+
+    def setUp(self):
+        super(TestManifest, self).setUp()
+        self.manifest = os.path.join(self.directory, 'manifest')
+
+    def test_last_entry_for_a_service_wins(self):
+        with open(self.manifest, 'w') as f:
+            f.write('a taskdef-a:1\nb taskdef-b:1\n\na taskdef-a:2\n')
+
+        assert read_manifest(self.manifest) == [
+            ('b', 'taskdef-b:1'), ('a', 'taskdef-a:2')
+        ]
+
+    def test_invalid_line_rejected(self):
+        with open(self.manifest, 'w') as f:
+            f.write('just-a-service\n')
+
+        with self.assertRaises(UserFacingError):
+            read_manifest(self.manifest)
+
+    def test_cli_waits_for_services_in_manifest(self):
+        with open(self.manifest, 'w') as f:
+            f.write('a taskdef-a:1\nb taskdef-b:1\n')
+
+        with patch('ecs_update_monitor.cli.Session') as Session, \
+                patch('ecs_update_monitor.cli.MultiServiceMonitor') as Multi:
+            session = Mock()
+            Session.return_value = session
+            session.client.return_value.get_caller_identity.return_value = {
+                'Arn': 'caller'
+            }
+
+            cli.main([
+                'multi', '--cluster', 'cluster', '--region', 'region',
+                '--caller-arn', 'caller', '--manifest', self.manifest,
+            ])
+
+        Multi.assert_called_once_with(
+            'cluster', [('a', 'taskdef-a:1'), ('b', 'taskdef-b:1')], session,
+            check_capacity=False
+        )
+        Multi.return_value.wait.assert_called_once_with()
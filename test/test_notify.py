@@ -0,0 +1,148 @@
+import json
+import os
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+from mock import Mock
+
+from ecs_update_monitor import DoneEvent, ECSMonitor, InProgressEvent
+from ecs_update_monitor.clock import VirtualClock
+from ecs_update_monitor.notify import FileSink, Notifier, sink_for, WebhookSink
+from fakes import TempDirTestCase
+
+
+class RecordingHandler(BaseHTTPRequestHandler):
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers['Content-Length']))
+        self.server.received.append(json.loads(body.decode('utf-8')))
+        self.send_response(204)
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+class BlockingSink:
+
+    def __init__(self):
+        self.sending = threading.Event()
+        self.release = threading.Event()
+        self.batches = []
+
+    def send(self, notifications):
+        self.sending.set()
+        self.release.wait()
+        self.batches.append(notifications)
+
+
+class TestNotifier(unittest.TestCase):
+
+    def setUp(self):
+        self.server = HTTPServer(('127.0.0.1', 0), RecordingHandler)
+        self.server.received = []
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.start()
+        self.url = 'http://127.0.0.1:{}/hook'.format(self.server.server_port)
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+
+    def test_monitor_notifications_posted_to_webhook(self):
+        # Given
+        notifier = Notifier([WebhookSink(self.url)], service='app')
+        ecs_monitor = ECSMonitor(
+            [InProgressEvent(1, 1, 2, 0, ['started 1 task']),
+             DoneEvent(2, 0, 2, 0, [])],
+            'dummy', Mock(), clock=VirtualClock(), notifier=notifier
+        )
+
+        # When
+        ecs_monitor.wait()
+        notifier.close()
+
+        # Then
+        notifications = [
+            notification
+            for batch in self.server.received
+            for notification in batch['notifications']
+        ]
+        kinds = [n['kind'] for n in notifications]
+        assert kinds[0] == 'started' and kinds[-1] == 'completed'
+        assert set(kinds[1:-1]) == {'progress'}
+        assert notifications[-2]['running'] == 2
+        assert notifications[-1]['duration'] == 15
+        assert {n['service'] for n in notifications} == {'app'}
+
+    def test_slow_sink_does_not_block_and_progress_is_coalesced(self):
+        # Given
+        sink = BlockingSink()
+        notifier = Notifier([sink])
+        notifier.notify('started')
+        sink.sending.wait()
+
+        # When
+        for running in range(50):
+            notifier.notify(
+                'progress', running=running,
+                messages=['started task {}'.format(running)]
+            )
+        notifier.notify('completed')
+        sink.release.set()
+        notifier.close()
+
+        # Then
+        assert [
+            [(n['kind'], n.get('running')) for n in batch]
+            for batch in sink.batches
+        ] == [
+            [('started', None)], [('progress', 49), ('completed', None)]
+        ]
+        assert notifier.stats['coalesced'] == 49
+        assert sink.batches[1][0]['messages'] == [
+            'started task {}'.format(running) for running in range(50)
+        ]
+
+    def test_progress_dropped_when_buffer_is_full(self):
+        sink = BlockingSink()
+        notifier = Notifier([sink])
+        notifier._CAPACITY = 2
+        notifier.notify('started')
+        sink.sending.wait()
+        notifier.notify('progress')
+        notifier.notify('failed')
+
+        notifier.notify('progress')
+
+        assert notifier.stats['dropped'] == 1
+        sink.release.set()
+        notifier.close()
+
+    def test_failing_sink_counted_not_raised(self):
+        sink = Mock()
+        sink.send.side_effect = IOError('unreachable')
+        notifier = Notifier([sink])
+
+        notifier.notify('failed', error='boom')
+        notifier.close()
+
+        assert notifier.stats['failed'] == 1
+
+
+class TestFileSink(TempDirTestCase):
+
+    def test_notifications_appended_as_json_lines(self):
+        path = os.path.join(self.directory, 'notifications.jsonl')
+        sink = sink_for(path)
+
+        sink.send([{'kind': 'started'}])
+        sink.send([{'kind': 'completed'}])
+
+        assert isinstance(sink, FileSink)
+        with open(path) as f:
+            assert [json.loads(line)['kind'] for line in f] == [
+                'started', 'completed'
+            ]
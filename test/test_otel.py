@@ -0,0 +1,102 @@
+import datetime
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from mock import Mock, patch
+
+from ecs_update_monitor import run
+from ecs_update_monitor.tracer import Tracer
+
+try:
+    from opentelemetry.sdk.trace.export.in_memory_span_exporter import (
+        InMemorySpanExporter
+    )
+    from ecs_update_monitor.otel import exporter_for, OpenTelemetryBackend
+except ImportError:
+    InMemorySpanExporter = None
+
+
+TRACE_ID = '4bf92f3577b34da6a3ce929d0e0e4736'
+PARENT_SPAN_ID = '00f067aa0ba902b7'
+
+
+@unittest.skipIf(InMemorySpanExporter is None, 'opentelemetry-sdk missing')
+class TestOpenTelemetryTracing(unittest.TestCase):
+
+    def test_run_traced_under_callers_trace_context(self):
+        # Given
+        exporter = InMemorySpanExporter()
+        tracer = Tracer()
+        tracer.add_backend(OpenTelemetryBackend(exporter, environ={
+            'TRACEPARENT': '00-{}-{}-01'.format(TRACE_ID, PARENT_SPAN_ID),
+        }))
+        ecs_client = Mock()
+        ecs_client.describe_services.return_value = {
+            'services': [
+                {
+                    'deployments': [
+                        {
+                            'desiredCount': 1,
+                            'createdAt': datetime.datetime(2017, 1, 6),
+                            'id': 'ecs-svc/9223370553143707624',
+                            'runningCount': 1,
+                            'pendingCount': 0,
+                            'status': 'PRIMARY',
+                            'taskDefinition': 'taskdef',
+                        }
+                    ],
+                    'events': [
+                        {
+                            'createdAt': datetime.datetime(2017, 1, 7),
+                            'id': '71e1ea54-61bd-4d5f-b6ae-ba0ba4a3c270',
+                            'message': '(service app) has reached a steady '
+                                       'state.',
+                        },
+                    ],
+                }
+            ]
+        }
+        boto_session = Mock()
+        boto_session.client.return_value = ecs_client
+
+        # When
+        with patch('ecs_update_monitor.tracer', tracer):
+            run('cluster', 'service', 'taskdef', boto_session)
+        tracer.close()
+
+        # Then
+        spans = {span.name: span for span in exporter.get_finished_spans()}
+        assert set(spans) == {
+            'run', 'poll', 'describe_services', 'parse_events',
+            'classify_events'
+        }
+        root = spans['run']
+        assert format(root.context.trace_id, '032x') == TRACE_ID
+        assert format(root.parent.span_id, '016x') == PARENT_SPAN_ID
+        assert dict(root.attributes) == {
+            'cluster': 'cluster', 'service': 'service', 'taskdef': 'taskdef',
+        }
+        assert spans['poll'].parent.span_id == root.context.span_id
+        assert spans['describe_services'].parent.span_id == \
+            spans['poll'].context.span_id
+        assert [
+            (event.name, event.attributes['tag']) for event in root.events
+        ] == [('ecs_service_event', 'steady_state')]
+
+    def test_file_exporter_closed_on_shutdown(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, 'spans.jsonl')
+        exporter = exporter_for(path)
+        backend = OpenTelemetryBackend(exporter, environ={})
+
+        with backend.span('run', cluster='cluster'):
+            pass
+        backend.close()
+
+        assert exporter._file.closed
+        with open(path) as f:
+            assert [json.loads(line)['name'] for line in f] == ['run']
@@ -0,0 +1,144 @@
+import os
+import unittest
+
+from mock import patch
+
+from ecs_update_monitor import cli, UserFacingError
+from ecs_update_monitor.clock import VirtualClock
+from ecs_update_monitor.multi import ServicesFailedError
+from ecs_update_monitor.release import read_release, ReleaseMonitor
+from fakes import FakeECS, service, session_for, TempDirTestCase
+
+
+class ReleaseECS(FakeECS):
+    """Services take `polls` polls after being updated to complete.
+
+    Like ECS, the new deployment is not PRIMARY until some time after the
+    update.
+    """
+
+    def __init__(self, polls, wrong_taskdef=()):
+        super(ReleaseECS, self).__init__()
+        self._polls = polls
+        self._wrong_taskdef = wrong_taskdef
+        self.clock = None
+        self.polls = {}
+        self.updated_at = {}
+        self.updated = []
+
+    def update_service(self, cluster, service, taskDefinition):
+        self.updated.append(service)
+        self.updated_at[service] = self.clock.time()
+        self.polls[service] = 0
+
+    def describe(self, name):
+        taskdef = 'other' if name in self._wrong_taskdef or \
+            self.clock.time() == self.updated_at[name] else 'taskdef'
+        self.polls[name] += 1
+        if self.polls[name] >= self._polls[name]:
+            return service(name, taskdef, 2)
+        return service(name, taskdef, 1, previous=1)
+
+
+class TestReleaseMonitor(unittest.TestCase):
+
+    def release(self, ecs, dependencies):
+        self.clock = ecs.clock = VirtualClock()
+        return ReleaseMonitor(
+            'cluster', [(name, 'taskdef') for name in dependencies],
+            dependencies, session_for(ecs), clock=self.clock
+        )
+
+    def test_services_started_once_dependencies_complete(self):
+        # Given
+        ecs = ReleaseECS({'api': 3, 'worker': 2, 'cron': 4, 'reports': 2})
+        release = self.release(ecs, {
+            'api': [], 'cron': [], 'worker': ['api'], 'reports': ['worker'],
+        })
+
+        # When
+        with self.assertLogs('ecs_update_monitor.logger') as logs:
+            release.wait()
+
+        # Then
+        assert ecs.updated == ['api', 'cron', 'worker', 'reports']
+        assert self.clock.time() == 105
+        assert release.critical_path() == ['api', 'worker', 'reports']
+        messages = [record.getMessage() for record in logs.records]
+        assert 'release took 105s (165s if run in sequence), critical ' \
+            'path: api (0s-45s) -> worker (45s-75s) -> reports ' \
+            '(75s-105s)' in messages
+        assert 'worker: deployment completed after 30.0s (2 polls, 2 API ' \
+            'calls, 0 retries, 0 failed tasks)' in messages
+        assert 'worker:   first pending: 15.0s' in messages
+        assert '7 describe_services calls shared by 4 services' in messages
+        assert set(release.results.values()) == {None}
+
+    def test_dependents_of_a_failed_service_cancelled(self):
+        # Given
+        ecs = ReleaseECS(
+            {'api': 3, 'worker': 1, 'cron': 4}, wrong_taskdef=['api']
+        )
+        release = self.release(
+            ecs, {'api': [], 'worker': ['api'], 'cron': []}
+        )
+
+        # When
+        with self.assertRaises(ServicesFailedError) as error, \
+                self.assertLogs('ecs_update_monitor.logger'):
+            release.wait()
+
+        # Then
+        assert ecs.updated == ['api', 'cron']
+        assert release.results['worker'] == 'cancelled - api failed'
+        assert release.critical_path() == ['cron']
+        assert str(error.exception) == \
+            '2 of 3 service deployments failed: api, worker'
+
+
+class TestReleaseManifest(TempDirTestCase):
+
+    def setUp(self):
+        super(TestReleaseManifest, self).setUp()
+        self.manifest = os.path.join(self.directory, 'release')
+
+    def write(self, content):
+        with open(self.manifest, 'w') as f:
+            f.write(content)
+
+    def test_dependencies_read(self):
+        self.write('api taskdef-api:2\nworker taskdef-worker:3 api\n')
+
+        assert read_release(self.manifest) == (
+            [('api', 'taskdef-api:2'), ('worker', 'taskdef-worker:3')],
+            {'api': [], 'worker': ['api']}
+        )
+
+    def test_cycles_and_unknown_dependencies_rejected(self):
+        self.write('a taskdef-a:1 b\nb taskdef-b:1 a\nc taskdef-c:1\n')
+        with self.assertRaises(UserFacingError) as error:
+            read_release(self.manifest)
+        assert str(error.exception) == 'dependency cycle between: a, b'
+
+        self.write('a taskdef-a:1 missing\n')
+        with self.assertRaises(UserFacingError) as error:
+            read_release(self.manifest)
+        assert str(error.exception) == 'unknown dependencies: missing'
+
+    def test_cli_releases_services_in_manifest(self):
+        self.write('api taskdef-api:2\nworker taskdef-worker:3 api\n')
+
+        with patch('ecs_update_monitor.cli.create_session') as session, \
+                patch('ecs_update_monitor.cli.ReleaseMonitor') as Release:
+            cli.main([
+                'release', '--cluster', 'cluster', '--region', 'region',
+                '--manifest', self.manifest,
+            ])
+
+        Release.assert_called_once_with(
+            'cluster',
+            [('api', 'taskdef-api:2'), ('worker', 'taskdef-worker:3')],
+            {'api': [], 'worker': ['api']}, session.return_value,
+            check_capacity=False
+        )
+        Release.return_value.wait.assert_called_once_with()
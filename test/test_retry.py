@@ -0,0 +1,165 @@
+import unittest
+
+from botocore.exceptions import ClientError, EndpointConnectionError
+from mock import Mock, patch
+
+from ecs_update_monitor import DoneEvent, ECSMonitor
+from ecs_update_monitor.clock import VirtualClock
+from ecs_update_monitor.retry import CircuitOpenError, is_retryable, Retrier
+
+
+def client_error(code, status=400):
+    return ClientError({
+        'Error': {'Code': code, 'Message': code},
+        'ResponseMetadata': {'HTTPStatusCode': status},
+    }, 'DescribeServices')
+
+
+class Polls:
+    """Events from `describe`, called through the retrier like
+    ECSEventIterator does."""
+
+    def __init__(self, retrier, describe):
+        self._retrier = retrier
+        self._describe = describe
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return self._retrier.call(self._describe)
+
+
+class TestRetrier(unittest.TestCase):
+
+    def test_transient_errors_retried_until_success(self):
+        function = Mock(side_effect=[
+            client_error('ThrottlingException'),
+            EndpointConnectionError(endpoint_url='https://ecs'),
+            {'services': []},
+        ])
+        clock = VirtualClock()
+        retrier = Retrier(clock=clock)
+
+        result = retrier.call(function, cluster='cluster')
+
+        assert result == {'services': []}
+        assert function.call_count == 3
+        function.assert_called_with(cluster='cluster')
+        assert len(clock.sleeps) == 2
+        assert retrier.stats == {'attempts': 3, 'retries': 2}
+
+    def test_backoff_is_capped_exponential_with_jitter(self):
+        retrier = Retrier()
+
+        with patch('ecs_update_monitor.retry.random.uniform') as uniform:
+            uniform.side_effect = lambda low, high: high
+            delays = [retrier._delay(attempt) for attempt in range(5)]
+
+        assert delays == [0.5, 1, 2, 4, 8]
+        retrier._MAX_DELAY = 3
+        with patch('ecs_update_monitor.retry.random.uniform') as uniform:
+            uniform.side_effect = lambda low, high: high
+            assert retrier._delay(4) == 3
+
+    def test_non_retryable_errors_raised_immediately(self):
+        function = Mock(side_effect=client_error('AccessDeniedException'))
+        clock = VirtualClock()
+        retrier = Retrier(clock=clock)
+
+        with self.assertRaises(ClientError):
+            retrier.call(function)
+
+        assert function.call_count == 1
+        assert clock.sleeps == []
+
+    def test_never_retries_past_the_deadline(self):
+        function = Mock(side_effect=client_error('ServerException', 500))
+        clock = VirtualClock(start=99.9)
+        retrier = Retrier(deadline=100, clock=clock)
+
+        with patch('ecs_update_monitor.retry.random.uniform',
+                   return_value=0.5), \
+                self.assertRaises(ClientError):
+            retrier.call(function)
+
+        assert function.call_count == 1
+        assert clock.sleeps == []
+        assert retrier.stats['gave_up'] == 1
+
+    def test_circuit_opens_after_sustained_errors(self):
+        # Given
+        function = Mock(side_effect=client_error('ThrottlingException'))
+        clock = VirtualClock()
+        retrier = Retrier(clock=clock)
+        with self.assertRaises(ClientError):
+            retrier.call(function)
+        with self.assertRaises(ClientError):
+            retrier.call(function)
+
+        # When
+        with self.assertRaises(CircuitOpenError) as error:
+            retrier.call(function)
+
+        # Then
+        assert function.call_count == 10
+        assert 'not calling for 60s after 10 consecutive errors' in \
+            str(error.exception)
+
+    def test_single_trial_call_after_cool_down(self):
+        # Given
+        function = Mock(side_effect=client_error('ThrottlingException'))
+        clock = VirtualClock()
+        retrier = Retrier(clock=clock)
+        retrier._BREAKER_THRESHOLD = 2
+        with self.assertRaises(ClientError):
+            retrier.call(function)
+        clock.advance(60)
+
+        # When
+        with self.assertRaises(ClientError):
+            retrier.call(function)
+        with self.assertRaises(CircuitOpenError):
+            retrier.call(function)
+        clock.advance(60)
+        function.side_effect = None
+        function.return_value = 'ok'
+
+        # Then
+        assert function.call_count == 3
+        assert retrier.call(function) == 'ok'
+        assert retrier.call(function) == 'ok'
+        assert retrier.stats['rejected'] == 1
+
+    @patch.object(ECSMonitor, '_INTERVAL', 30)
+    @patch('ecs_update_monitor.retry.random.uniform', return_value=0)
+    def test_monitor_skips_polls_while_the_api_is_failing(self, _):
+        # Given
+        clock = VirtualClock()
+        retrier = Retrier(clock=clock)
+        describe = Mock(side_effect=[
+            client_error('ThrottlingException')
+        ] * 10 + [DoneEvent(2, 0, 2, 0, [])])
+        monitor = ECSMonitor(
+            Polls(retrier, describe), 'cluster', Mock(), retrier=retrier,
+            clock=clock
+        )
+
+        # When
+        with self.assertLogs('ecs_update_monitor.logger') as logs:
+            monitor.wait()
+
+        # Then
+        assert describe.call_count == 11
+        assert clock.time() == 90
+        assert [
+            record.getMessage().split(':')[0] for record in logs.records
+            if record.levelname == 'WARNING'
+        ] == ['poll failed, trying again at the next poll'] * 3
+        assert monitor.timeline.outcome == 'completed'
+
+    def test_retryable_errors(self):
+        assert is_retryable(client_error('ThrottlingException'))
+        assert is_retryable(client_error('SomethingUnexpected', 503))
+        assert not is_retryable(client_error('ClusterNotFoundException'))
+        assert not is_retryable(ValueError())
@@ -0,0 +1,149 @@
+import unittest
+
+from mock import Mock, patch
+
+from ecs_update_monitor import (
+    ECSMonitor, FailedTasksError, roll_back, RollbackFailedError,
+    RolledBackError, run
+)
+from ecs_update_monitor import cli
+from ecs_update_monitor.clock import VirtualClock
+from fakes import deployment, FakeECS, service, service_data, session_for
+
+
+def rolling(primary, running, active):
+    """`active` is a list of (taskdef, running count) pairs."""
+    data = service('service', primary, running, pending=0)
+    data['deployments'] += [
+        deployment(taskdef, previous_running, status='ACTIVE')
+        for taskdef, previous_running in active
+    ]
+    return service_data(data)
+
+
+@patch.object(ECSMonitor, '_INTERVAL', 0)
+class TestRollback(unittest.TestCase):
+
+    def boto_session(self, responses):
+        self.ecs = Mock()
+        self.ecs.describe_services.side_effect = responses
+        return session_for(self.ecs)
+
+    def test_failed_deployment_rolled_back(self):
+        # Given
+        boto_session = self.boto_session([
+            rolling('new', 2, [('older', 0), ('old', 2)]),
+            rolling('new', 0, [('older', 0), ('old', 2)]),
+            rolling('new', 2, [('older', 0), ('old', 2)]),
+            rolling('new', 0, [('older', 0), ('old', 2)]),
+            rolling('old', 2, [('new', 1)]),
+            rolling('old', 2, [('new', 0)]),
+        ])
+
+        # When
+        with self.assertRaises(RolledBackError) as error, \
+                self.assertLogs('ecs_update_monitor.logger'):
+            run('cluster', 'service', 'new', boto_session, rollback=True)
+
+        # Then
+        self.ecs.update_service.assert_called_once_with(
+            cluster='cluster', service='service', taskDefinition='old'
+        )
+        assert str(error.exception) == (
+            'Deployment failed - 3 new tasks have failed - rolled back to old'
+        )
+        assert error.exception.exit_status == 2
+
+    def test_failure_raised_without_rollback(self):
+        boto_session = self.boto_session([
+            rolling('new', 2, [('old', 2)]),
+            rolling('new', 0, [('old', 2)]),
+            rolling('new', 2, [('old', 2)]),
+            rolling('new', 0, [('old', 2)]),
+        ])
+
+        with self.assertRaises(FailedTasksError), \
+                self.assertLogs('ecs_update_monitor.logger'):
+            run('cluster', 'service', 'new', boto_session)
+
+        self.ecs.update_service.assert_not_called()
+
+    def test_new_service_cannot_be_rolled_back(self):
+        boto_session = self.boto_session([
+            rolling('new', 2, []),
+            rolling('new', 0, []),
+            rolling('new', 2, []),
+            rolling('new', 0, []),
+        ])
+
+        with self.assertRaises(RollbackFailedError) as error, \
+                self.assertLogs('ecs_update_monitor.logger'):
+            run('cluster', 'service', 'new', boto_session, rollback=True)
+
+        assert str(error.exception) == (
+            'Deployment failed - 3 new tasks have failed - rollback to None '
+            'failed: no previous task definition was seen'
+        )
+        self.ecs.update_service.assert_not_called()
+
+
+class LaggingECS(FakeECS):
+    """Like ECS, the rollback deployment is not PRIMARY until some time
+    after the update."""
+
+    def __init__(self, clock):
+        super(LaggingECS, self).__init__()
+        self.clock = clock
+        self.updated_at = None
+
+    def update_service(self, cluster, service, taskDefinition):
+        self.updated_at = self.clock.time()
+
+    def describe(self, name):
+        if self.clock.time() == self.updated_at:
+            data = service(name, 'new', 0, previous=2, previous_taskdef='old')
+        else:
+            draining = 1 if len(self.describe_calls) == 1 else 0
+            data = service(
+                name, 'old', 2, previous=draining, previous_taskdef='new'
+            )
+        return dict(data, events=[])
+
+
+class TestRollbackFirstPoll(unittest.TestCase):
+
+    def test_first_poll_an_interval_after_the_update(self):
+        # Given
+        clock = VirtualClock()
+        ecs = LaggingECS(clock)
+
+        # When
+        with self.assertRaises(RolledBackError), \
+                self.assertLogs('ecs_update_monitor.logger'):
+            roll_back(
+                'cluster', 'service', 'old', session_for(ecs),
+                FailedTasksError(), clock=clock
+            )
+
+        # Then
+        assert ecs.updated_at == 0
+        assert clock.sleeps[0] == ECSMonitor._INTERVAL
+        assert len(ecs.describe_calls) == 2
+
+
+class TestRollbackExitStatus(unittest.TestCase):
+
+    @patch('ecs_update_monitor.cli.create_session')
+    @patch('ecs_update_monitor.cli.run')
+    def test_rolled_back_exits_with_distinct_status(self, run, _):
+        run.side_effect = RolledBackError(FailedTasksError(), 'old')
+
+        with self.assertRaises(SystemExit) as exit, \
+                self.assertLogs('ecs_update_monitor.logger', 'ERROR'):
+            cli.main([
+                '--cluster', 'cluster', '--service', 'service',
+                '--taskdef', 'new', '--region', 'region', '--rollback',
+            ])
+
+        assert exit.exception.code == 2
+        assert run.call_args[1]['rollback'] is True
@@ -0,0 +1,172 @@
+import os
+import sqlite3
+import unittest
+
+from mock import patch
+
+from ecs_update_monitor import cli
+from ecs_update_monitor.clock import VirtualClock
+from ecs_update_monitor.shard import (
+    HashRing, ShardedWatcher, SQLiteCoordinator
+)
+from ecs_update_monitor.watch import DONE
+from fakes import FakeECS, service, session_for, TempDirTestCase
+
+
+KEYS = ['cluster-{}/service-{}'.format(i % 7, i) for i in range(5000)]
+
+
+class TestHashRing(unittest.TestCase):
+
+    def test_each_key_has_one_owner_and_load_is_spread(self):
+        ring = HashRing(['a', 'b', 'c', 'd'])
+
+        owners = [ring.owner(key) for key in KEYS]
+
+        for node in 'abcd':
+            assert 900 < owners.count(node) < 1600
+
+    def test_adding_a_node_only_moves_keys_to_it(self):
+        # Given
+        before = HashRing(['a', 'b', 'c', 'd'])
+
+        # When
+        after = HashRing(['a', 'b', 'c', 'd', 'e'])
+
+        # Then
+        moved = [key for key in KEYS if before.owner(key) != after.owner(key)]
+        assert set(after.owner(key) for key in moved) == {'e'}
+        assert 700 < len(moved) < 1300
+
+
+class TestShardedWatcher(TempDirTestCase):
+
+    def setUp(self):
+        super(TestShardedWatcher, self).setUp()
+        self.path = os.path.join(self.directory, 'shards.db')
+        self.now = 0
+        self.clock = VirtualClock()
+        self.ecs = FakeECS({
+            'service-{}'.format(i): service(
+                'service-{}'.format(i), 'taskdef:1', 2
+            )
+            for i in range(200)
+        })
+        self.boto_session = session_for(self.ecs)
+
+    def node(self, node_id):
+        coordinator = SQLiteCoordinator(
+            self.path, node_id, ttl=60, now=lambda: self.now
+        )
+        return ShardedWatcher(
+            ['cluster'], self.boto_session, coordinator, clock=self.clock
+        )
+
+    def watched(self, node):
+        return set(node.watchers['cluster'].states)
+
+    def assert_no_overlap(self, *nodes):
+        watched = [self.watched(node) for node in nodes]
+        assert sum(len(services) for services in watched) == \
+            len(set().union(*watched))
+
+    def test_nodes_split_services_without_overlap(self):
+        # Given
+        first = self.node('first')
+        first.tick()
+        assert len(self.watched(first)) == 200
+
+        # When
+        second = self.node('second')
+        with self.assertLogs('ecs_update_monitor.logger'):
+            second.tick()
+            self.assert_no_overlap(first, second)
+            first.tick()
+            self.assert_no_overlap(first, second)
+            self.ecs.describe_calls = []
+            self.ecs.list_calls = 0
+            second.tick()
+            first.tick()
+
+        # Then
+        self.assert_no_overlap(first, second)
+        assert len(self.watched(first) | self.watched(second)) == 200
+        assert 60 < len(self.watched(second)) < 140
+        assert sum(len(call) for call in self.ecs.describe_calls) == 200
+        assert self.ecs.list_calls == 2  # both pages, listed by one node
+        assert set(second.watchers['cluster'].states.values()) == {DONE}
+
+    def test_joiner_waits_for_slow_nodes_to_hand_over(self):
+        # Given
+        first = self.node('first')
+        first.tick()
+        second = self.node('second')
+
+        # When
+        with self.assertLogs('ecs_update_monitor.logger'):
+            second.tick()
+            second.tick()
+
+        # Then
+        assert self.watched(second) == set()
+        assert len(self.watched(first)) == 200
+        with self.assertLogs('ecs_update_monitor.logger'):
+            first.tick()
+        second.tick()
+        assert self.watched(second)
+        self.assert_no_overlap(first, second)
+
+    def test_services_of_a_stopped_node_taken_over(self):
+        # Given
+        first, second = self.node('first'), self.node('second')
+        with self.assertLogs('ecs_update_monitor.logger'):
+            first.tick()
+            second.tick()
+            first.tick()
+            second.tick()
+
+            # When
+            self.now = 61
+            first.tick()
+
+        # Then
+        assert len(self.watched(first)) == 200
+
+    def test_leaving_node_removed_from_coordinator(self):
+        first = self.node('first')
+        other = SQLiteCoordinator(self.path, 'other')
+        other.heartbeat()
+
+        with self.assertLogs('ecs_update_monitor.logger'):
+            first.watch(2)
+
+        assert self.clock.sleeps == [ShardedWatcher._INTERVAL]
+        assert other.heartbeat() == (['other'], [['other']])
+        with self.assertRaises(sqlite3.ProgrammingError):
+            first._coordinator.heartbeat()
+        other.leave()
+
+
+class TestShardedWatchCLI(unittest.TestCase):
+
+    def test_watch_command_with_coordinator(self):
+        with patch('ecs_update_monitor.cli.create_session') as session, \
+                patch('ecs_update_monitor.cli.ShardedWatcher') as Watcher, \
+                patch('ecs_update_monitor.cli.SQLiteCoordinator') as \
+                Coordinator:
+            cli.main([
+                'watch', '--cluster', 'a', '--cluster', 'b', '--region',
+                'region', '--coordinator', 'shards.db', '--node-id', 'node-1',
+            ])
+
+        Coordinator.assert_called_once_with('shards.db', 'node-1')
+        Watcher.assert_called_once_with(
+            ['a', 'b'], session.return_value, Coordinator.return_value
+        )
+        Watcher.return_value.watch.assert_called_once_with(None)
+
+    def test_several_clusters_require_coordinator(self):
+        with self.assertRaises(SystemExit):
+            cli.parse_watch_args([
+                '--cluster', 'a', '--cluster', 'b', '--region', 'region',
+            ])
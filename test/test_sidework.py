@@ -0,0 +1,66 @@
+import threading
+import unittest
+
+from ecs_update_monitor.sidework import SideWork
+
+
+class TestSideWork(unittest.TestCase):
+
+    def test_work_dropped_when_capacity_is_used(self):
+        # Given
+        release = threading.Event()
+        side_work = SideWork()
+        side_work._slots = threading.BoundedSemaphore(2)
+
+        # When
+        for _ in range(3):
+            side_work.submit('job', release.wait, timeout=5)
+        release.set()
+        side_work.close()
+
+        # Then
+        assert side_work.stats == {'dropped': 1, 'done': 2}
+
+    def test_failures_counted_not_raised(self):
+        side_work = SideWork()
+
+        side_work.submit('job', int, x='not a number')
+        side_work.close()
+
+        assert side_work.stats == {'failed': 1}
+
+    def test_workers_are_daemon_threads(self):
+        # Given
+        release = threading.Event()
+        side_work = SideWork()
+
+        # When
+        side_work.submit('job', release.wait, timeout=5)
+        workers = [
+            thread for thread in threading.enumerate()
+            if thread.name != threading.current_thread().name
+            and getattr(thread, '_target', None) == side_work._work
+        ]
+        release.set()
+        side_work.close()
+
+        # Then
+        assert len(workers) == SideWork._WORKERS
+        assert all(worker.daemon for worker in workers)
+
+    def test_close_gives_up_on_hung_work(self):
+        # Given
+        release = threading.Event()
+        side_work = SideWork()
+        side_work._CLOSE_TIMEOUT = 0.1
+        side_work._WORKERS = 1
+        side_work.submit('hung', release.wait, timeout=5)
+        side_work.submit('queued', release.wait, timeout=5)
+
+        # When
+        side_work.close()
+        release.set()
+
+        # Then
+        assert side_work._pending == 1
+        assert side_work._jobs is None
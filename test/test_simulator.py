@@ -0,0 +1,92 @@
+import random
+import unittest
+
+from ecs_update_monitor import cli
+from ecs_update_monitor.clock import VirtualClock
+from ecs_update_monitor.simulator import (
+    HEADINGS, Policy, Scenario, SimulatedService, run_deployment, simulate
+)
+
+
+class TestSimulatedService(unittest.TestCase):
+
+    def describe(self, scenario, at):
+        clock = VirtualClock()
+        service = SimulatedService(scenario, clock, random.Random(0))
+        clock.advance(at)
+        return service.describe_services(
+            cluster='cluster', services=['app']
+        )['services'][0]
+
+    def test_maximum_percent_limits_tasks_started(self):
+        service = self.describe(
+            Scenario('limited', desired=4, maximum_percent=150), 0
+        )
+
+        primary, active = service['deployments']
+        assert primary['pendingCount'] == 2
+        assert active['runningCount'] == 4
+
+    def test_old_tasks_drained_once_new_tasks_run(self):
+        service = self.describe(Scenario('healthy', start_median=10), 3600)
+
+        assert [
+            (deployment['status'], deployment['runningCount'])
+            for deployment in service['deployments']
+        ] == [('PRIMARY', 4)]
+        assert service['events'][0]['message'] == \
+            '(service app) has reached a steady state.'
+
+
+class TestSimulation(unittest.TestCase):
+
+    def test_healthy_deployment_reported_completed(self):
+        result = run_deployment(Scenario('healthy'), Policy('default'), 1)
+
+        assert result.outcome == 'completed'
+        assert 0 <= result.detected_at - result.completed_at <= 15
+        assert result.api_calls == result.detected_at // 15 + 1
+
+    def test_broken_deployment_reported_failed(self):
+        result = run_deployment(
+            Scenario('broken', crash_rate=1.0, crash_after=(1, 20)),
+            Policy('default'), 1
+        )
+
+        assert result.outcome == 'failed'
+        assert result.completed_at is None
+        assert result.detected_at < 600
+
+    def test_policies_compared_on_the_same_deployments(self):
+        # Given
+        scenario = Scenario('slow start', start_median=120, start_sigma=0.8)
+        policies = [Policy('default'), Policy('tolerant', timeout=900)]
+
+        # When
+        default, tolerant = simulate([scenario], policies, runs=50, seed=3)
+
+        # Then
+        assert tolerant.false_failures < default.false_failures
+        assert default.missed_failures == tolerant.missed_failures == 0
+        assert len(default.row()) == len(HEADINGS)
+        assert default.api_calls < tolerant.api_calls
+
+    def test_grace_period_changes_new_service_results(self):
+        # Given
+        scenario = Scenario('flaky new service', previous=0, crash_rate=0.1)
+        policies = [Policy('default'), Policy('short grace', grace_period=15)]
+
+        # When
+        default, short = simulate([scenario], policies, runs=50, seed=1)
+
+        # Then
+        assert short.missed_failures > default.missed_failures
+        assert sum(short.completion_lag) / len(short.completion_lag) < \
+            sum(default.completion_lag) / len(default.completion_lag)
+
+    def test_simulate_command(self):
+        with self.assertLogs('ecs_update_monitor.logger') as logs:
+            cli.main(['simulate', '--runs', '2'])
+
+        assert logs.records[0].getMessage().split('  ')[0] == 'scenario'
+        assert len(logs.records) == 41
@@ -0,0 +1,56 @@
+import datetime
+import os
+
+from mock import Mock
+
+from ecs_update_monitor.taskdefs import TaskdefCache
+from fakes import session_for, TempDirTestCase
+
+
+class TestTaskdefCache(TempDirTestCase):
+
+    def setUp(self):
+        super(TestTaskdefCache, self).setUp()
+        self.ecs_client = Mock()
+        self.ecs_client.describe_task_definition.return_value = {
+            'taskDefinition': {
+                'family': 'app',
+                'cpu': '256',
+                'registeredAt': datetime.datetime(2017, 1, 6),
+            }
+        }
+
+    def test_each_taskdef_described_once(self):
+        cache = TaskdefCache(session_for(self.ecs_client))
+
+        first = cache.get('arn:aws:ecs:task-definition/app:1')
+        second = cache.get('arn:aws:ecs:task-definition/app:1')
+
+        assert first is second
+        assert self.ecs_client.describe_task_definition.call_count == 1
+        assert cache.api_calls == {'describe_task_definition': 1}
+
+    def test_revisions_persisted_between_runs(self):
+        # Given
+        directory = os.path.join(self.directory, 'taskdefs')
+        TaskdefCache(
+            session_for(self.ecs_client), directory=directory
+        ).get('arn:aws:ecs:task-definition/app:1')
+        other_client = Mock()
+
+        # When
+        description = TaskdefCache(
+            session_for(other_client), directory=directory
+        ).get('arn:aws:ecs:task-definition/app:1')
+
+        # Then
+        assert description['cpu'] == '256'
+        assert description['registeredAt'] == '2017-01-06 00:00:00'
+        assert not other_client.describe_task_definition.called
+
+    def test_family_without_revision_not_persisted(self):
+        TaskdefCache(
+            session_for(self.ecs_client), directory=self.directory
+        ).get('app')
+
+        assert os.listdir(self.directory) == []
@@ -0,0 +1,104 @@
+import datetime
+import unittest
+
+from mock import Mock
+
+from ecs_update_monitor.tasks import TaskStartupTracker
+
+
+CREATED = datetime.datetime(2017, 1, 6, 12, 0, 0)
+
+
+def at(seconds):
+    return CREATED + datetime.timedelta(seconds=seconds)
+
+
+def task(name, **fields):
+    task = {
+        'taskArn': 'arn:aws:ecs:task/cluster/{}'.format(name),
+        'taskDefinitionArn': 'arn:aws:ecs:task-definition/app:1',
+        'createdAt': CREATED,
+        'lastStatus': 'PENDING',
+    }
+    task.update(fields)
+    return task
+
+
+class TestTaskStartupTracker(unittest.TestCase):
+
+    def setUp(self):
+        self.ecs_client = Mock()
+        self.ecs_client.list_tasks.return_value = {
+            'taskArns': ['arn:aws:ecs:task/cluster/a']
+        }
+        boto_session = Mock()
+        boto_session.client.return_value = self.ecs_client
+        taskdef_cache = Mock()
+        taskdef_cache.get.return_value = {
+            'containerDefinitions': [{'image': 'registry/app:1.2'}]
+        }
+        self.tracker = TaskStartupTracker(
+            'cluster', boto_session, taskdef_cache=taskdef_cache
+        )
+
+    def describe(self, *tasks):
+        self.ecs_client.describe_tasks.return_value = {'tasks': list(tasks)}
+
+    def test_pull_start_and_health_reported_once(self):
+        # Given
+        self.describe(task('a', healthStatus='UNKNOWN'))
+        first = self.tracker.poll('ecs-svc/1')
+        self.describe(task(
+            'a', pullStartedAt=at(2), pullStoppedAt=at(14.5),
+            startedAt=at(16), lastStatus='RUNNING', healthStatus='UNKNOWN'
+        ))
+        second = self.tracker.poll('ecs-svc/1')
+
+        # When
+        self.describe(task(
+            'a', pullStartedAt=at(2), pullStoppedAt=at(14.5),
+            startedAt=at(16), lastStatus='RUNNING', healthStatus='HEALTHY'
+        ))
+        third = self.tracker.poll('ecs-svc/1')
+
+        # Then
+        assert first == []
+        assert second == [
+            'task a: image pull took 12.5s (registry/app:1.2)',
+            'task a: started 16.0s after it was created',
+        ]
+        assert third == ['task a: health UNKNOWN -> HEALTHY']
+        self.ecs_client.list_tasks.assert_called_with(
+            cluster='cluster', startedBy='ecs-svc/1', maxResults=100
+        )
+        assert self.tracker.summary() == {
+            'tasks': 1, 'max_pull_seconds': 12.5, 'max_start_seconds': 16.0,
+        }
+
+    def test_healthy_tasks_no_longer_described(self):
+        self.describe(task('a', healthStatus='HEALTHY'))
+        self.tracker.poll('ecs-svc/1')
+
+        self.tracker.poll('ecs-svc/1')
+
+        assert self.ecs_client.describe_tasks.call_count == 1
+        assert self.tracker.api_calls == {
+            'list_tasks': 2, 'describe_tasks': 1
+        }
+
+    def test_tasks_described_in_batches(self):
+        self.ecs_client.list_tasks.side_effect = [
+            {
+                'taskArns': ['task-{}'.format(i) for i in range(100)],
+                'nextToken': 'next',
+            },
+            {'taskArns': ['task-{}'.format(i) for i in range(100, 150)]},
+        ]
+        self.describe()
+
+        self.tracker.poll('ecs-svc/1')
+
+        assert [
+            len(call[1]['tasks'])
+            for call in self.ecs_client.describe_tasks.call_args_list
+        ] == [100, 50]
@@ -0,0 +1,109 @@
+import json
+import os
+
+from mock import Mock
+
+from ecs_update_monitor import (
+    DoneEvent, ECSMonitor, FailedTasksError, InProgressEvent,
+    NewInstanceEvent
+)
+from ecs_update_monitor.clock import VirtualClock
+from fakes import TempDirTestCase
+
+
+class TestDeploymentTimeline(TempDirTestCase):
+
+    def setUp(self):
+        super(TestDeploymentTimeline, self).setUp()
+        self.summary_file = os.path.join(self.directory, 'summary.json')
+
+    def test_phases_reported_when_deployment_completes(self):
+        # Given
+        ecs_event_iterator = [
+            # running, pending, desired, previous
+            InProgressEvent(0, 0, 2, 2, []),
+            NewInstanceEvent(0, 2, 2, 2, []),
+            InProgressEvent(1, 1, 2, 2, []),
+            InProgressEvent(2, 0, 2, 1, []),
+            DoneEvent(2, 0, 2, 0, []),
+        ]
+
+        ecs_monitor = ECSMonitor(
+            ecs_event_iterator, 'dummy', Mock(),
+            summary_file=self.summary_file, clock=VirtualClock()
+        )
+
+        # When
+        with self.assertLogs('ecs_update_monitor.logger') as logs:
+            ecs_monitor.wait()
+
+        # Then
+        with open(self.summary_file) as f:
+            summary = json.load(f)
+        assert summary == {
+            'outcome': 'completed',
+            'error': None,
+            'duration': 60,
+            'phases': {
+                'first_pending': 15,
+                'first_running': 30,
+                'reached_desired': 45,
+                'previous_drained': 60,
+            },
+            'polls': 5,
+            'api_calls': {'put_metric_data': 1},
+            'failed_tasks': 0,
+            'retries': {'attempts': 1},
+        }
+        assert logs.output[-5:] == [
+            'INFO:ecs_update_monitor.logger:deployment completed after 60.0s '
+            '(5 polls, 1 API calls, 0 retries, 0 failed tasks)',
+            'INFO:ecs_update_monitor.logger:  first pending: 15.0s',
+            'INFO:ecs_update_monitor.logger:  first running: 30.0s',
+            'INFO:ecs_update_monitor.logger:  reached desired: 45.0s',
+            'INFO:ecs_update_monitor.logger:  previous drained: 60.0s',
+        ]
+
+    def test_summary_written_when_deployment_fails(self):
+        # Given
+        ecs_event_iterator = [
+            InProgressEvent(2, 0, 2, 2, []),
+            InProgressEvent(0, 0, 2, 2, []),
+            InProgressEvent(2, 0, 2, 2, []),
+            InProgressEvent(0, 0, 2, 2, []),
+        ]
+        ecs_monitor = ECSMonitor(
+            ecs_event_iterator, 'dummy', Mock(),
+            summary_file=self.summary_file
+        )
+        ecs_monitor._INTERVAL = 0
+
+        # When
+        with self.assertRaises(FailedTasksError):
+            ecs_monitor.wait()
+
+        # Then
+        with open(self.summary_file) as f:
+            summary = json.load(f)
+        assert summary['outcome'] == 'failed'
+        assert summary['error'] == \
+            'Deployment failed - 3 new tasks have failed'
+        assert summary['failed_tasks'] == 4
+        assert summary['phases']['previous_drained'] is None
+
+    def test_tasks_still_draining_reported(self):
+        ecs_monitor = ECSMonitor(
+            [InProgressEvent(1, 1, 2, 2, []), DoneEvent(2, 0, 2, 2, [])],
+            'dummy', Mock(), summary_file=self.summary_file,
+            clock=VirtualClock()
+        )
+
+        with self.assertLogs('ecs_update_monitor.logger') as logs:
+            ecs_monitor.wait()
+
+        with open(self.summary_file) as f:
+            summary = json.load(f)
+        assert summary['still_draining'] == 2
+        assert summary['phases']['previous_drained'] is None
+        assert logs.output[-1] == 'INFO:ecs_update_monitor.logger:  2 ' \
+            'task(s) of the previous deployment still draining'
@@ -0,0 +1,108 @@
+import json
+import os
+import pstats
+
+from mock import Mock, patch
+
+from ecs_update_monitor import cli, ECSEventIterator
+from ecs_update_monitor.tracer import Tracer
+from fakes import service, service_data, session_for, TempDirTestCase
+
+
+class TestTracer(TempDirTestCase):
+
+    def test_disabled_tracer_records_nothing(self):
+        tracer = Tracer()
+        trace_file = os.path.join(self.directory, 'trace.json')
+
+        with tracer.span('describe_services'):
+            pass
+        tracer.write(trace_file)
+
+        assert not tracer.enabled
+        assert not os.path.exists(trace_file)
+
+    def test_spans_written_as_chrome_trace_events(self):
+        tracer = Tracer()
+        tracer.enable()
+        trace_file = os.path.join(self.directory, 'trace.json')
+
+        with tracer.span('describe_services', service='my-service'):
+            with tracer.span('parse_events', cpu=True):
+                pass
+        tracer.write(trace_file)
+
+        with open(trace_file) as f:
+            trace = json.load(f)
+        assert [e['name'] for e in trace['traceEvents']] == [
+            'parse_events', 'describe_services'
+        ]
+        outer = trace['traceEvents'][1]
+        assert outer['ph'] == 'X'
+        assert outer['args'] == {'service': 'my-service'}
+        assert outer['dur'] >= trace['traceEvents'][0]['dur']
+
+    def test_cpu_spans_profiled(self):
+        tracer = Tracer()
+        tracer.enable(profile=True)
+        profile_file = os.path.join(self.directory, 'monitor.prof')
+
+        with tracer.span('parse_events', cpu=True):
+            sorted(range(1000))
+        tracer.write(profile_file=profile_file)
+
+        stats = pstats.Stats(profile_file)
+        assert any(
+            function_name == '<built-in method builtins.sorted>'
+            for _, _, function_name in stats.stats
+        )
+
+    def test_aws_calls_not_profiled_as_event_processing(self):
+        # Given
+        tracer = Tracer()
+        tracer.enable(profile=True)
+        profile_file = os.path.join(self.directory, 'monitor.prof')
+        ecs = Mock()
+        ecs.describe_services.return_value = service_data(
+            service('service', 'taskdef', 1, previous=1)
+        )
+        task_tracker = Mock()
+        task_tracker.poll.return_value = []
+        iterator = ECSEventIterator(
+            'cluster', 'service', 'taskdef', session_for(ecs),
+            task_tracker=task_tracker
+        )
+
+        # When
+        with patch('ecs_update_monitor.tracer', tracer):
+            next(iterator)
+        tracer.write(profile_file=profile_file)
+
+        # Then
+        task_tracker.poll.assert_called_once_with('ecs-svc/taskdef')
+        profiled = [filename for filename, _, _ in pstats.Stats(
+            profile_file
+        ).stats]
+        assert any(name.endswith('classifier.py') for name in profiled)
+        assert not any('mock' in name for name in profiled)
+
+    def test_cli_writes_trace_file(self):
+        trace_file = os.path.join(self.directory, 'trace.json')
+        with patch('ecs_update_monitor.cli.Session') as Session, \
+                patch('ecs_update_monitor.cli.run'), \
+                patch('ecs_update_monitor.cli.tracer', Tracer()):
+            sts = Mock()
+            sts.get_caller_identity.return_value = {'Arn': 'caller'}
+            Session.return_value.client.return_value = sts
+
+            cli.main([
+                '--cluster', 'cluster', '--service', 'service',
+                '--taskdef', 'taskdef', '--region', 'region',
+                '--caller-arn', 'caller', '--trace-file', trace_file,
+            ])
+
+        with open(trace_file) as f:
+            trace = json.load(f)
+        assert [e['name'] for e in trace['traceEvents']] == [
+            'get_caller_identity'
+        ]
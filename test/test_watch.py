@@ -0,0 +1,142 @@
+import unittest
+
+from mock import Mock, patch
+
+from ecs_update_monitor import cli
+from ecs_update_monitor.clock import VirtualClock
+from ecs_update_monitor.watch import (
+    ClusterWatcher, DONE, FAILING, FLAPPING, IN_PROGRESS, Report,
+    ServiceTable, STUCK, TASKDEF_DRIFT
+)
+from fakes import FakeECS, service, session_for
+
+
+def watcher_for(ecs):
+    return ClusterWatcher('cluster', session_for(ecs))
+
+
+class TestClusterWatcher(unittest.TestCase):
+
+    def test_services_listed_and_described_in_batches(self):
+        ecs = FakeECS()
+        for i in range(125):
+            ecs.services['service-{:03}'.format(i)] = service(
+                'service-{:03}'.format(i), 'taskdef:1', 2, 2
+            )
+        watcher = watcher_for(ecs)
+
+        assert watcher.tick() == []
+
+        assert [len(call) for call in ecs.describe_calls] == [10] * 12 + [5]
+        assert len(watcher.states) == 125
+        assert set(watcher.states.values()) == {DONE}
+
+    def test_in_progress_and_flapping_services_reported(self):
+        ecs = FakeECS()
+        ecs.services['settled'] = service('settled', 'taskdef:1', 2)
+        ecs.services['rolling'] = service(
+            'rolling', 'taskdef:1', 1, previous=2
+        )
+        ecs.services['flapping'] = service(
+            'flapping', 'taskdef:1', 3, 3, previous=1
+        )
+        watcher = watcher_for(ecs)
+        watcher.tick()
+
+        ecs.services['flapping'] = service(
+            'flapping', 'taskdef:1', 0, 3, previous=1
+        )
+        reports = watcher.tick()
+
+        assert watcher.states == {
+            'settled': DONE, 'rolling': IN_PROGRESS, 'flapping': FAILING,
+        }
+        assert reports == [Report('flapping', FLAPPING, '3 tasks failed')]
+        assert watcher.tick() == []
+
+    def test_stuck_deployment_reported_once(self):
+        ecs = FakeECS()
+        ecs.services['stuck'] = service('stuck', 'taskdef:1', 1, 4)
+        watcher = watcher_for(ecs)
+        watcher._INTERVAL = 300
+
+        reports = [watcher.tick() for _ in range(4)]
+
+        assert reports[:2] == [[], []]
+        assert reports[2] == [Report(
+            'stuck', STUCK,
+            'in progress for 3 ticks - running: 1 desired: 4 previous: 0'
+        )]
+        assert reports[3] == []
+
+    def test_taskdef_drift_reported(self):
+        ecs = FakeECS()
+        ecs.services['app'] = service('app', 'taskdef:1', 2, 2)
+        watcher = watcher_for(ecs)
+        watcher.tick()
+
+        ecs.services['app'] = service('app', 'taskdef:2', 0, 2)
+
+        assert watcher.tick() == [
+            Report('app', TASKDEF_DRIFT, 'taskdef:1 -> taskdef:2')
+        ]
+
+    def test_slots_of_removed_services_are_reused(self):
+        ecs = FakeECS()
+        watcher = watcher_for(ecs)
+        for generation in range(5):
+            ecs.services = {
+                'service-{}-{}'.format(generation, i): service(
+                    'service-{}-{}'.format(generation, i), 'taskdef:1', 1, 1
+                )
+                for i in range(20)
+            }
+            watcher.tick()
+
+        assert len(watcher._table) == 20
+        assert len(watcher._table.names) == 20
+        assert all(
+            len(column) == 20 for column in watcher._table.columns.values()
+        )
+
+    def test_ticks_spaced_by_the_clock(self):
+        ecs = FakeECS({'settled': service('settled', 'taskdef:1', 2)})
+        clock = VirtualClock()
+        watcher = ClusterWatcher('cluster', session_for(ecs), clock=clock)
+
+        watcher.watch(3)
+
+        assert clock.sleeps == [ClusterWatcher._INTERVAL] * 2
+        assert len(ecs.describe_calls) == 3
+
+
+class TestServiceTable(unittest.TestCase):
+
+    def test_released_slots_are_reset(self):
+        table = ServiceTable()
+        slot = table.slot('a', 'taskdef')
+        table.update(slot, 3, 0, 3, 0)
+        table.release('a')
+
+        assert table.slot('b', 'taskdef') == slot
+        assert table.columns['running'][slot] == 0
+
+
+class TestWatchCLI(unittest.TestCase):
+
+    def test_watch_command(self):
+        with patch('ecs_update_monitor.cli.Session') as Session, \
+                patch('ecs_update_monitor.cli.ClusterWatcher') as Watcher:
+            session = Mock()
+            Session.return_value = session
+            session.client.return_value.get_caller_identity.return_value = {
+                'Arn': 'caller'
+            }
+
+            cli.main([
+                'watch', '--cluster', 'cluster', '--region', 'region',
+                '--caller-arn', 'caller', '--ticks', '3',
+            ])
+
+        Watcher.assert_called_once_with('cluster', session)
+        Watcher.return_value.watch.assert_called_once_with(3)